@@ -0,0 +1,157 @@
+"""
+records/cache 序列化与缓存 key 的微基准
+
+运行：
+    pytest benchmarks/bench_cache.py --benchmark-group-by=group
+    pytest benchmarks/bench_cache.py --benchmark-autosave          # 保存结果
+    pytest benchmarks/bench_cache.py --benchmark-compare           # 与上次保存的结果比较
+
+记录规模按 raw_inputs 数量（1/10/100）和 content 大小（small/large）组合。
+"""
+
+import datetime
+import json
+import pickle
+
+import pytest
+from bson import ObjectId, json_util
+
+from records.cache.keys import categories_list_key, record_key, records_list_key
+from records.cache.utils import deserialize_dict, serialize_model
+from records.models import RawInput, Record
+
+RAW_INPUT_COUNTS = [1, 10, 100]
+CONTENT_SIZES = {
+    'small': 5,
+    'large': 500,
+}
+
+
+def build_record(raw_input_count: int, content_fields: int) -> Record:
+    """构造一条不落库的记录，字段分布接近线上数据"""
+    now = datetime.datetime(2025, 1, 1, 12, 0, 0)
+    raw_inputs = [
+        RawInput(
+            type='text' if i % 3 else 'image',
+            content='今天中午吃了一碗牛肉面，花了28元。' * 4,
+            file_path=f'uploads/2025/01/01/{i}.jpg',
+            file_size=204800,
+            uploaded_at=now,
+        )
+        for i in range(raw_input_count)
+    ]
+    content = {f'field_{i}': ('示例文本' * 8 if i % 2 else i * 1.5) for i in range(content_fields)}
+    content['tags'] = [str(ObjectId()) for _ in range(3)]
+    return Record(
+        id=ObjectId(),
+        user=ObjectId(),
+        title='基准测试记录',
+        category=ObjectId(),
+        type='expense',
+        raw_inputs=raw_inputs,
+        content=content,
+        is_processed=True,
+        processed_at=now,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+@pytest.fixture(
+    params=[(n, size) for n in RAW_INPUT_COUNTS for size in CONTENT_SIZES],
+    ids=lambda p: f'inputs={p[0]}-content={p[1]}',
+)
+def record(request):
+    raw_input_count, size = request.param
+    return build_record(raw_input_count, CONTENT_SIZES[size])
+
+
+def test_serialize_model(benchmark, record):
+    benchmark.group = 'serialize_model'
+    benchmark(serialize_model, record)
+
+
+def test_deserialize_dict(benchmark, record):
+    benchmark.group = 'deserialize_dict'
+    payload = serialize_model(record)
+    benchmark(deserialize_dict, payload, Record)
+
+
+# ---- 编解码方案对比：同一份 to_mongo() 数据 ----
+
+def _orjson():
+    orjson = pytest.importorskip('orjson')
+    return (
+        lambda data: orjson.dumps(data, default=str),
+        orjson.loads,
+    )
+
+
+def _msgpack():
+    msgpack = pytest.importorskip('msgpack')
+    return (
+        lambda data: msgpack.packb(data, default=str, use_bin_type=True),
+        lambda raw: msgpack.unpackb(raw, raw=False),
+    )
+
+
+CODECS = {
+    'json': lambda: (lambda data: json.dumps(data, default=str), json.loads),
+    'bson_json_util': lambda: (json_util.dumps, json_util.loads),
+    'pickle': lambda: (
+        lambda data: pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL),
+        pickle.loads,
+    ),
+    'orjson': _orjson,
+    'msgpack': _msgpack,
+}
+
+
+@pytest.fixture(params=list(CODECS))
+def codec(request):
+    dumps, loads = CODECS[request.param]()
+    return request.param, dumps, loads
+
+
+def test_codec_encode(benchmark, record, codec):
+    name, dumps, _ = codec
+    benchmark.group = 'codec encode'
+    data = record.to_mongo().to_dict()
+    result = benchmark(dumps, data)
+    benchmark.extra_info['codec'] = name
+    benchmark.extra_info['bytes'] = len(result.encode() if isinstance(result, str) else result)
+
+
+def test_codec_decode(benchmark, record, codec):
+    name, dumps, loads = codec
+    benchmark.group = 'codec decode'
+    payload = dumps(record.to_mongo().to_dict())
+    benchmark(loads, payload)
+    benchmark.extra_info['codec'] = name
+
+
+# ---- 缓存 key ----
+
+LIST_FILTERS = {
+    'user': str(ObjectId()),
+    'category': str(ObjectId()),
+    'type': 'expense',
+    'page': 1,
+    'page_size': 20,
+    'tag': None,
+}
+
+
+def test_record_key(benchmark):
+    benchmark.group = 'cache keys'
+    benchmark(record_key, str(ObjectId()))
+
+
+def test_records_list_key(benchmark):
+    benchmark.group = 'cache keys'
+    benchmark(records_list_key, LIST_FILTERS)
+
+
+def test_categories_list_key(benchmark):
+    benchmark.group = 'cache keys'
+    benchmark(categories_list_key, LIST_FILTERS)
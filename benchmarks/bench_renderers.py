@@ -0,0 +1,95 @@
+"""
+API 响应渲染的微基准：DRF 的 JSONRenderer 与基于 orjson 的 ORJSONRenderer
+
+运行：
+    pytest benchmarks/bench_renderers.py --benchmark-group-by=group
+    pytest benchmarks/bench_renderers.py --benchmark-autosave
+
+载荷与列表接口的分页响应相同，分两种：
+- serialized：RecordListSerializer 的输出，日期已是字符串
+- raw：未经序列化的 to_mongo() 数据，含 ObjectId 和 datetime（如 processing_result 中的 content）
+test_same_output 校验两个渲染器输出的字节完全一致。
+"""
+
+import io
+import json
+
+import pytest
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from common.utils.renderers import ORJSONParser, ORJSONRenderer
+from records.serializers import RecordListSerializer
+
+from .bench_serializers import build_record, raw_rows
+
+pytest.importorskip('orjson')
+
+ROW_COUNTS = [10, 100, 1000]
+RENDERERS = {
+    'json': JSONRenderer(),
+    'orjson': ORJSONRenderer(),
+}
+
+
+def page(data, count):
+    return {
+        'success': True,
+        'data': data,
+        'pagination': {'page': 1, 'page_size': count, 'total_count': count, 'total_pages': 1},
+    }
+
+
+def serialized_payload(count):
+    return page(RecordListSerializer(raw_rows(build_record, count), many=True).data, count)
+
+
+def raw_payload(count):
+    # 标准库 JSONEncoder 不认识 ObjectId，预先转为字符串，datetime 保持原样
+    rows = raw_rows(build_record, count)
+    for row in rows:
+        for key in ('_id', 'user', 'category'):
+            row[key] = str(row[key])
+    return page(rows, count)
+
+
+PAYLOADS = {
+    'serialized': serialized_payload,
+    'raw': raw_payload,
+}
+
+
+@pytest.mark.parametrize('payload', list(PAYLOADS))
+def test_same_output(payload):
+    data = PAYLOADS[payload](3)
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_object_id():
+    row = build_record().to_mongo().to_dict()
+    rendered = json.loads(ORJSONRenderer().render(row))
+    assert rendered['_id'] == str(row['_id'])
+
+
+def test_indent_falls_back():
+    data = serialized_payload(1)
+    accepted = 'application/json; indent=4'
+    assert ORJSONRenderer().render(data, accepted) == JSONRenderer().render(data, accepted)
+
+
+@pytest.mark.parametrize('count', ROW_COUNTS)
+@pytest.mark.parametrize('payload', list(PAYLOADS))
+@pytest.mark.parametrize('renderer', list(RENDERERS))
+def test_render(benchmark, renderer, payload, count):
+    benchmark.group = f'render {payload} x{count}'
+    data = PAYLOADS[payload](count)
+    benchmark(RENDERERS[renderer].render, data)
+
+
+@pytest.mark.parametrize('count', ROW_COUNTS)
+@pytest.mark.parametrize('parser', ['json', 'orjson'])
+def test_parse(benchmark, parser, count):
+    benchmark.group = f'parse x{count}'
+    body = JSONRenderer().render(serialized_payload(count))
+    parser_instance = ORJSONParser() if parser == 'orjson' else JSONParser()
+    benchmark(lambda: parser_instance.parse(io.BytesIO(body)))
@@ -0,0 +1,123 @@
+"""
+列表接口序列化的微基准：DocumentSerializer 与只读快速序列化
+
+运行：
+    pytest benchmarks/bench_serializers.py --benchmark-group-by=group
+    pytest benchmarks/bench_serializers.py --benchmark-autosave
+
+两条路径都从 as_pymongo() 形式的原始文档出发：
+DocumentSerializer 路径先 _from_son 构造 Document（与 QuerySet 迭代时相同）再序列化，
+快速路径直接按预编译的字段表转换。test_same_output 校验两者渲染出的 JSON 一致。
+"""
+
+import datetime
+import json
+
+import pytest
+from bson import ObjectId
+from rest_framework.utils.encoders import JSONEncoder
+
+from common.models.upload_model import UploadedFile
+from common.serializers import UploadedFileListSerializer, UploadedFileSerializer
+from records.models import Category, FieldSpec, RawInput, Record, Tag
+from records.serializers import (
+    CategoryListSerializer,
+    CategorySerializer,
+    RecordListSerializer,
+    RecordSerializer,
+    TagListSerializer,
+    TagSerializer,
+)
+
+ROW_COUNTS = [10, 100, 1000]
+NOW = datetime.datetime(2025, 1, 1, 12, 0, 0)
+
+
+def build_record() -> Record:
+    return Record(
+        id=ObjectId(),
+        user=ObjectId(),
+        title='基准测试记录',
+        category=ObjectId(),
+        type='expense',
+        raw_inputs=[
+            RawInput(type='text', content='今天中午吃了一碗牛肉面，花了28元。', file_path='', file_size=0, uploaded_at=NOW),
+            RawInput(type='image', file_path='image/20250101_1.jpg', file_size=204800, uploaded_at=NOW,
+                     extracted_text='牛肉面 28.00', engine_version='rapidocr/side=1600/gray=0/v1'),
+        ],
+        content={'amount': 28.0, 'merchant': '面馆', 'paid_at': NOW, 'tags': ['餐饮', '午饭']},
+        raw_text='今天中午吃了一碗牛肉面，花了28元。',
+        is_processed=True,
+        processed_at=NOW,
+        created_at=NOW,
+        updated_at=NOW,
+    )
+
+
+def build_tag() -> Tag:
+    return Tag(id=ObjectId(), name='餐饮', category=ObjectId(), user=ObjectId(),
+               description='暂无描述,按语义理解', system_created=True, created_at=NOW, updated_at=NOW)
+
+
+def build_category() -> Category:
+    specs = [FieldSpec(name=f'field_{i}', field_type='number' if i % 2 else 'string', description='字段')
+             for i in range(8)]
+    return Category(id=ObjectId(), name='账单', description='日常消费', user=ObjectId(),
+                    field_specs=specs, created_at=NOW, updated_at=NOW)
+
+
+def build_file() -> UploadedFile:
+    return UploadedFile(id=ObjectId(), file_path='image/20250101_1.jpg', file_name='20250101_1.jpg',
+                        original_filename='IMG_0001.jpg', file_size=204800, file_type='image',
+                        mime_type='image/jpeg', uploaded_at=NOW, user_id=ObjectId(), expires_at=NOW)
+
+
+# 名称 -> (模型, 构造函数, DocumentSerializer, 快速序列化)
+CASES = {
+    'record': (Record, build_record, RecordSerializer, RecordListSerializer),
+    'tag': (Tag, build_tag, TagSerializer, TagListSerializer),
+    'category': (Category, build_category, CategorySerializer, CategoryListSerializer),
+    'file': (UploadedFile, build_file, UploadedFileSerializer, UploadedFileListSerializer),
+}
+
+
+def raw_rows(build, count):
+    """与 QuerySet.as_pymongo() 返回的结构相同"""
+    return [build().to_mongo().to_dict() for _ in range(count)]
+
+
+def document_path(document, serializer_class, rows):
+    return serializer_class([document._from_son(row) for row in rows], many=True).data
+
+
+def fast_path(serializer_class, rows):
+    return serializer_class(rows, many=True).data
+
+
+def render(data):
+    return json.loads(json.dumps(data, cls=JSONEncoder))
+
+
+@pytest.mark.parametrize('case', list(CASES))
+def test_same_output(case):
+    document, build, serializer_class, fast_class = CASES[case]
+    rows = raw_rows(build, 3)
+    assert render(fast_path(fast_class, rows)) == render(document_path(document, serializer_class, rows))
+
+
+@pytest.mark.parametrize('count', ROW_COUNTS)
+@pytest.mark.parametrize('case', list(CASES))
+def test_document_serializer(benchmark, case, count):
+    document, build, serializer_class, _ = CASES[case]
+    benchmark.group = f'{case} x{count}'
+    rows = raw_rows(build, count)
+    benchmark(document_path, document, serializer_class, rows)
+
+
+@pytest.mark.parametrize('count', ROW_COUNTS)
+@pytest.mark.parametrize('case', list(CASES))
+def test_fast_serializer(benchmark, case, count):
+    _, build, _, fast_class = CASES[case]
+    benchmark.group = f'{case} x{count}'
+    rows = raw_rows(build, count)
+    benchmark(fast_path, fast_class, rows)
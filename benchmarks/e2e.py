@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+记录接口端到端压测
+
+启动本地 LLM 桩服务，按指定并发驱动 RecordViewSet 的 create / list / retrieve，
+统计每个接口和每个流水线阶段的 p50/p95/p99 及吞吐量，并可与基线文件比较以发现性能回退。
+
+示例：
+    # 使用本地 MongoDB/Redis
+    python -m benchmarks.e2e --requests 200 --concurrency 8
+
+    # 不依赖外部服务（需要安装 mongomock）
+    python -m benchmarks.e2e --mongo mongomock --cache locmem --output result.json
+
+    # 与基线比较，任一指标 p95 变慢超过 20% 时退出码为 1
+    python -m benchmarks.e2e --baseline benchmarks/baseline.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_llm import start_server
+
+SAMPLE_TEXT = '今天中午在公司楼下吃了一碗牛肉面，花了28元，味道不错。'
+
+CATEGORY_FIELD_SPECS = [
+    {'name': 'amount', 'field_type': 'number', 'description': '金额'},
+    {'name': 'item', 'field_type': 'string', 'description': '消费项目'},
+    {'name': 'place', 'field_type': 'string', 'description': '地点'},
+]
+
+
+def percentile(values: list, pct: float) -> float:
+    """线性插值计算百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = (len(ordered) - 1) * pct / 100
+    low = int(index)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (index - low)
+
+
+def summarize(durations: list, elapsed: float = None) -> dict:
+    """汇总一组耗时（毫秒）"""
+    summary = {
+        'count': len(durations),
+        'p50_ms': round(percentile(durations, 50), 2),
+        'p95_ms': round(percentile(durations, 95), 2),
+        'p99_ms': round(percentile(durations, 99), 2),
+        'max_ms': round(max(durations), 2) if durations else 0.0,
+    }
+    if elapsed:
+        summary['rps'] = round(len(durations) / elapsed, 2)
+    return summary
+
+
+class StageCollector(logging.Handler):
+    """收集 pipeline 日志中的阶段耗时"""
+
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.lock = threading.Lock()
+        self.durations = defaultdict(list)
+
+    def emit(self, record):
+        try:
+            event = json.loads(record.getMessage())
+        except (TypeError, ValueError):
+            return
+        with self.lock:
+            self.durations[event['stage']].append(event['duration_ms'])
+
+
+def configure(args, llm_base_urls: list):
+    """指向 LLM 桩服务并初始化 Django，按需替换数据库和缓存"""
+    os.environ['OPENAI_API_BASE'] = llm_base_urls[0]
+    os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+    if len(llm_base_urls) > 1:
+        # 多个桩服务时每个作为一个后端，验证按耗时的负载均衡
+        os.environ['LLM_BACKENDS'] = json.dumps([
+            {'name': f'stub-{index}', 'base_url': url, 'model': 'stub', 'weight': 1}
+            for index, url in enumerate(llm_base_urls)
+        ])
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sovo.settings')
+
+    import django
+
+    django.setup()
+
+    if args.cache == 'locmem':
+        from django.test.utils import override_settings
+        # override_settings 会触发 setting_changed 信号，重建缓存连接
+        override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        }).enable()
+
+    if args.mongo == 'mongomock':
+        import mongomock
+        from mongoengine import connect, disconnect
+
+        disconnect(alias='default')
+        connect('sovo_benchmark', host='mongodb://localhost', alias='default',
+                mongo_client_class=mongomock.MongoClient)
+
+
+def seed(run_id: str):
+    """创建压测用户和分类"""
+    from accounts.models import User
+    from records.models import Category, FieldSpec
+
+    user = User(username=f'benchmark-{run_id}', password='benchmark').save()
+    category = Category(
+        name='消费',
+        description='日常消费记录',
+        user=user,
+        field_specs=[FieldSpec(**spec) for spec in CATEGORY_FIELD_SPECS],
+    ).save()
+    return user, category
+
+
+def cleanup(user):
+    from records.models import Category, Record, Tag
+
+    Record.objects(user=user).delete()
+    Tag.objects(user=user).delete()
+    Category.objects(user=user).delete()
+    user.delete()
+
+
+def run_phase(name: str, total: int, concurrency: int, call) -> tuple:
+    """按并发执行 total 次 call，返回 (接口汇总, 每次调用的返回值)"""
+    durations = []
+    results = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(index):
+        nonlocal errors
+        start = time.perf_counter()
+        response = call(index)
+        duration = (time.perf_counter() - start) * 1000
+        with lock:
+            durations.append(duration)
+            results.append(response)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(total)))
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(durations, elapsed)
+    summary['errors'] = errors
+    print(f"{name:<10} {summary['count']:>6} {summary['p50_ms']:>10} {summary['p95_ms']:>10} "
+          f"{summary['p99_ms']:>10} {summary['rps']:>8} {errors:>6}")
+    return summary, results
+
+
+def run(args) -> dict:
+    from rest_framework.test import APIRequestFactory, force_authenticate
+    from records.views import RecordViewSet
+
+    user, category = seed(str(int(time.time() * 1000)))
+    factory = APIRequestFactory()
+    create_view = RecordViewSet.as_view({'post': 'create'})
+    list_view = RecordViewSet.as_view({'get': 'list'})
+    retrieve_view = RecordViewSet.as_view({'get': 'retrieve'})
+
+    def create(index):
+        request = factory.post('/api/records/', {
+            'title': f'压测记录 {index}',
+            'raw_inputs': json.dumps([{'type': 'text', 'content': SAMPLE_TEXT}], ensure_ascii=False),
+            'category_id': str(category.id),
+        }, format='multipart')
+        force_authenticate(request, user=user)
+        return create_view(request)
+
+    def list_records(index):
+        request = factory.get('/api/records/')
+        force_authenticate(request, user=user)
+        return list_view(request)
+
+    record_ids = []
+
+    def retrieve(index):
+        request = factory.get(f'/api/records/{record_ids[index % len(record_ids)]}/')
+        force_authenticate(request, user=user)
+        return retrieve_view(request, pk=record_ids[index % len(record_ids)])
+
+    collector = StageCollector()
+    logging.getLogger('pipeline').addHandler(collector)
+    endpoints = {}
+    try:
+        print(f"{'endpoint':<10} {'count':>6} {'p50(ms)':>10} {'p95(ms)':>10} {'p99(ms)':>10} {'rps':>8} {'errors':>6}")
+        endpoints['create'], responses = run_phase('create', args.requests, args.concurrency, create)
+        record_ids = [r.data['data']['id'] for r in responses if r.status_code == 201]
+        endpoints['list'], _ = run_phase('list', args.list_requests, args.concurrency, list_records)
+        if record_ids:
+            endpoints['retrieve'], _ = run_phase('retrieve', args.requests, args.concurrency, retrieve)
+    finally:
+        logging.getLogger('pipeline').removeHandler(collector)
+        if not args.keep_data:
+            cleanup(user)
+
+    stages = {stage: summarize(durations) for stage, durations in sorted(collector.durations.items())}
+    print(f"\n{'stage':<20} {'count':>6} {'p50(ms)':>10} {'p95(ms)':>10} {'p99(ms)':>10}")
+    for stage, summary in stages.items():
+        print(f"{stage:<20} {summary['count']:>6} {summary['p50_ms']:>10} {summary['p95_ms']:>10} {summary['p99_ms']:>10}")
+
+    return {
+        'config': {
+            'requests': args.requests,
+            'list_requests': args.list_requests,
+            'concurrency': args.concurrency,
+            'llm_latency_ms': args.llm_latency_ms,
+            'backend_latencies': args.backend_latencies,
+            'mongo': args.mongo,
+            'cache': args.cache,
+        },
+        'endpoints': endpoints,
+        'stages': stages,
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """与基线比较 p95，返回回退项列表"""
+    regressions = []
+    for section in ('endpoints', 'stages'):
+        for name, current in result.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name)
+            if not previous or not previous.get('p95_ms'):
+                continue
+            ratio = current['p95_ms'] / previous['p95_ms']
+            if ratio > 1 + tolerance:
+                regressions.append(
+                    f"{section}.{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms (+{(ratio - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='记录接口端到端压测')
+    parser.add_argument('--requests', type=int, default=50, help='create / retrieve 请求数')
+    parser.add_argument('--list-requests', type=int, default=50, help='list 请求数')
+    parser.add_argument('--concurrency', type=int, default=4, help='并发数')
+    parser.add_argument('--llm-latency-ms', type=float, default=300, help='LLM 桩服务每次调用的延迟')
+    parser.add_argument('--llm-jitter-ms', type=float, default=50, help='LLM 桩服务延迟抖动')
+    parser.add_argument('--backend-latencies', help='启动多个 LLM 桩服务作为不同后端，逗号分隔各自的延迟，如 200,800')
+    parser.add_argument('--mongo', choices=['settings', 'mongomock'], default='settings',
+                        help='settings: 使用 settings 中配置的 MongoDB；mongomock: 内存数据库')
+    parser.add_argument('--cache', choices=['settings', 'locmem'], default='settings',
+                        help='settings: 使用 settings 中配置的 Redis；locmem: 进程内缓存')
+    parser.add_argument('--output', help='结果写入的 JSON 文件')
+    parser.add_argument('--baseline', help='用于比较的基线 JSON 文件')
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果写入 --baseline 指定的文件')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许的 p95 退化比例')
+    parser.add_argument('--keep-data', action='store_true', help='压测结束后保留生成的数据')
+    args = parser.parse_args()
+
+    latencies = [float(v) for v in args.backend_latencies.split(',')] if args.backend_latencies else [args.llm_latency_ms]
+    servers = [start_server(latency_ms=latency, jitter_ms=args.llm_jitter_ms) for latency in latencies]
+    try:
+        configure(args, [base_url for _, base_url in servers])
+        result = run(args)
+    finally:
+        for server, _ in servers:
+            server.shutdown()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n基线已保存到 {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        if regressions:
+            print('\n发现性能回退:')
+            for item in regressions:
+                print(f'  {item}')
+            sys.exit(1)
+        print('\n与基线相比未发现性能回退')
+
+
+if __name__ == '__main__':
+    main()
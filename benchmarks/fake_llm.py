@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地的 OpenAI 兼容 LLM 桩服务，用于压测时替代 DeepSeek
+
+- 类型检测请求：从系统提示中取第一个"类型名称"返回
+- 信息提取请求：按系统提示中的"字段定义"生成固定的 JSON
+- 支持配置固定延迟和抖动，模拟真实的模型耗时
+
+单独运行：
+    python -m benchmarks.fake_llm --port 18080 --latency-ms 300
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TYPE_NAME_PATTERN = re.compile(r'类型名称:([^,，。]+)')
+FIELD_SPEC_PATTERN = re.compile(r'字段定义：(\{.*?\})\n', re.DOTALL)
+
+# 按字段类型生成的示例值
+SAMPLE_VALUES = {
+    'number': 12.5,
+    'integer': 1,
+    'boolean': True,
+    'array': ['示例'],
+    'string': '示例',
+}
+
+
+def build_reply(messages: list) -> str:
+    """根据请求的系统提示生成固定回复"""
+    system = next((m.get('content', '') for m in messages if m.get('role') == 'system'), '')
+
+    if '类型分类器' in system:
+        match = TYPE_NAME_PATTERN.search(system)
+        return match.group(1).strip() if match else 'note'
+
+    match = FIELD_SPEC_PATTERN.search(system)
+    fields = json.loads(match.group(1)) if match else {}
+    reply = {name: SAMPLE_VALUES.get(info.get('type'), None) for name, info in fields.items()}
+    reply['raw_text'] = ''
+    reply['tags'] = '压测'
+    return json.dumps(reply, ensure_ascii=False)
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    latency_ms = 0
+    jitter_ms = 0
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        messages = body.get('messages', [])
+
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        content = build_reply(messages)
+        prompt_tokens = sum(len(m.get('content', '')) for m in messages)
+        payload = {
+            'id': f'chatcmpl-{uuid.uuid4().hex}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'fake'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': len(content),
+                'total_tokens': prompt_tokens + len(content),
+            },
+        }
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # 压测时不输出访问日志
+        pass
+
+
+def start_server(host: str = '127.0.0.1', port: int = 0, latency_ms: float = 0, jitter_ms: float = 0):
+    """在后台线程中启动桩服务，返回 (server, base_url)"""
+    handler = type('ConfiguredFakeLLMHandler', (FakeLLMHandler,), {
+        'latency_ms': latency_ms,
+        'jitter_ms': jitter_ms,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://{host}:{server.server_address[1]}/v1'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='OpenAI 兼容的 LLM 桩服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--latency-ms', type=float, default=300, help='每次请求的固定延迟')
+    parser.add_argument('--jitter-ms', type=float, default=50, help='延迟抖动范围')
+    args = parser.parse_args()
+
+    server, base_url = start_server(args.host, args.port, args.latency_ms, args.jitter_ms)
+    print(f'LLM 桩服务已启动: {base_url}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,30 @@
+import json
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from common.services.cleanup_service import CHECKPOINT_KEY, OrphanFileCleaner
+
+
+class Command(BaseCommand):
+    help = '删除上传目录中已不被上传记录或记录引用的孤儿文件；单次运行超时后下次从检查点继续'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='只统计，不删除文件')
+        parser.add_argument('--grace', type=int, help='该秒数内修改过的文件不清理，默认 UPLOAD_CLEANUP_GRACE_SECONDS')
+        parser.add_argument('--max-seconds', type=int, help='运行时间上限，0 表示不限，默认 UPLOAD_CLEANUP_MAX_SECONDS')
+        parser.add_argument('--reset', action='store_true', help='忽略检查点，从头扫描')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            cache.delete(CHECKPOINT_KEY)
+
+        cleaner = OrphanFileCleaner(grace_seconds=options['grace'], max_seconds=options['max_seconds'],
+                                    dry_run=options['dry_run'])
+        try:
+            stats = cleaner.run()
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        label = '试运行完成（未删除文件）' if options['dry_run'] else '清理完成'
+        self.stdout.write(self.style.SUCCESS(f"{label}: {json.dumps(stats, ensure_ascii=False)}"))
@@ -0,0 +1,109 @@
+import datetime
+
+from bson import ObjectId
+from django.core.management.base import BaseCommand
+
+from accounts.models.user_model import User
+from common.models.upload_model import UploadedFile
+from records.models import Category, DailyRollup, Record, Tag
+
+MODELS = [Record, Tag, Category, DailyRollup, UploadedFile, User]
+
+# 线上的高频查询形态：(模型, 查询条件, 排序)，用 explain 检查是否会全表扫描
+_user, _category = ObjectId(), ObjectId()
+_since = datetime.datetime.now() - datetime.timedelta(days=30)
+HOT_QUERIES = [
+    ('记录列表', Record, {'user': _user}, [('created_at', -1)]),
+    ('按分类的记录', Record, {'user': _user, 'category': _category}, [('created_at', -1)]),
+    ('按时间的记录', Record, {'user': _user, 'created_at': {'$gte': _since}}, [('created_at', -1)]),
+    ('失败记录重试', Record, {'status': 'failed', 'user': _user}, None),
+    ('按分类重建汇总', Record, {'category': _category, 'is_processed': True}, None),
+    ('分析快照增量', Record, {'updated_at': {'$gte': _since}}, None),
+    ('提取时取标签', Tag, {'category': _category, 'user': _user}, None),
+    ('标签列表', Tag, {'user': _user}, None),
+    ('用户分类', Category, {'$or': [{'user': _user}, {'is_default': True}]}, None),
+    ('按名称取分类', Category, {'name': '账单', 'is_active': True}, None),
+    ('统计汇总', DailyRollup, {'user': _user, 'tag': None, 'day': {'$gte': _since}}, None),
+    ('文件列表', UploadedFile, {'user_id': _user}, [('uploaded_at', -1)]),
+    ('清理文件按路径归并', UploadedFile, {}, [('file_path', 1)]),
+    ('清理文件复查记录引用', Record, {'raw_inputs.file_path': {'$in': ['image/a.jpg']}}, None),
+]
+
+
+def declared_index_names(document) -> set:
+    """模型 meta 中声明的索引名（未指定 name 时与 pymongo 生成规则一致）"""
+    names = set()
+    for spec in document._meta.get('index_specs', []):
+        names.add(spec.get('name') or '_'.join(f'{field}_{direction}' for field, direction in spec['fields']))
+    return names
+
+
+def has_collscan(plan: dict) -> bool:
+    if plan.get('stage') == 'COLLSCAN':
+        return True
+    children = [plan.get('inputStage')] + plan.get('inputStages', [])
+    return any(has_collscan(child) for child in children if child)
+
+
+class Command(BaseCommand):
+    help = '按模型声明创建索引，报告库中多余的索引、$indexStats 中未被使用的索引，并检查高频查询是否全表扫描'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='只报告，不创建索引')
+        parser.add_argument('--drop-undeclared', action='store_true',
+                            help='删除库中存在但模型未声明的索引（_id 索引除外）')
+        parser.add_argument('--explain', action='store_true', help='用 explain 检查高频查询的执行计划')
+
+    def handle(self, *args, **options):
+        for document in MODELS:
+            collection = document._get_collection()
+            self.stdout.write(f"\n[{collection.name}]")
+
+            if not options['dry_run']:
+                document.ensure_indexes()
+
+            declared = declared_index_names(document)
+            existing = collection.index_information()
+            for name in sorted(declared - set(existing)):
+                self.stdout.write(self.style.WARNING(f"  缺少索引: {name}"))
+
+            for name in sorted(set(existing) - declared - {'_id_'}):
+                if options['drop_undeclared'] and not options['dry_run']:
+                    collection.drop_index(name)
+                    self.stdout.write(self.style.WARNING(f"  已删除未声明的索引: {name}"))
+                else:
+                    self.stdout.write(self.style.WARNING(f"  未声明的索引: {name}"))
+
+            self._report_usage(collection)
+
+        if options['explain']:
+            self._explain_hot_queries()
+
+    def _report_usage(self, collection):
+        """$indexStats 的计数从 mongod 启动（或索引创建）时开始，需要在运行一段时间后再看"""
+        try:
+            stats = list(collection.aggregate([{'$indexStats': {}}]))
+        except Exception as e:
+            self.stdout.write(f"  无法读取 $indexStats: {e}")
+            return
+
+        for stat in sorted(stats, key=lambda item: item['name']):
+            ops = stat['accesses']['ops']
+            since = stat['accesses']['since'].strftime('%Y-%m-%d %H:%M')
+            line = f"  {stat['name']}: {ops} 次（自 {since}）"
+            if ops == 0 and stat['name'] != '_id_':
+                self.stdout.write(self.style.WARNING(line + ' 未使用'))
+            else:
+                self.stdout.write(line)
+
+    def _explain_hot_queries(self):
+        self.stdout.write("\n[高频查询执行计划]")
+        for label, document, query, sort in HOT_QUERIES:
+            cursor = document._get_collection().find(query).limit(20)
+            if sort:
+                cursor = cursor.sort(sort)
+            plan = cursor.explain()['queryPlanner']['winningPlan']
+            if has_collscan(plan):
+                self.stdout.write(self.style.ERROR(f"  {label}: COLLSCAN"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"  {label}: 使用索引"))
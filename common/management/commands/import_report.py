@@ -0,0 +1,103 @@
+import json
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# 只在推理时才应该被导入的重量级依赖
+HEAVY_MODULES = [
+    'rapidocr',
+    'faster_whisper',
+    'ctranslate2',
+    'onnxruntime',
+    'opencc',
+    'cv2',
+    'numpy',
+    'PIL',
+]
+
+# python -X importtime 输出格式: import time: self [us] | cumulative | imported package
+IMPORTTIME_PATTERN = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+PROBE_SCRIPT = """
+import importlib, json, os, sys, time
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sovo.settings')
+start = time.perf_counter()
+import django
+django.setup()
+for name in {modules!r}:
+    importlib.import_module(name)
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{
+    'elapsed_ms': round(elapsed, 2),
+    'heavy_loaded': [m for m in {heavy!r} if m in sys.modules],
+    'module_count': len(sys.modules),
+}}))
+"""
+
+
+class Command(BaseCommand):
+    help = '在子进程中以 python -X importtime 方式启动项目，报告启动耗时和被提前导入的重量级依赖'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--module',
+            action='append',
+            dest='modules',
+            help='启动后额外导入的模块，可多次指定（默认导入 ROOT_URLCONF，模拟 web 进程）',
+        )
+        parser.add_argument('--top', type=int, default=20, help='按累计耗时列出前 N 个模块')
+        parser.add_argument('--json', action='store_true', help='以 JSON 格式输出')
+
+    def handle(self, *args, **options):
+        modules = options['modules'] or [settings.ROOT_URLCONF]
+        script = PROBE_SCRIPT.format(modules=modules, heavy=HEAVY_MODULES)
+
+        # 在干净的子进程中测量，避免当前进程已导入的模块干扰结果
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', script],
+            capture_output=True,
+            text=True,
+            cwd=str(settings.BASE_DIR),
+        )
+        if proc.returncode != 0:
+            self.stderr.write(self.style.ERROR('启动探测失败:'))
+            self.stderr.write(proc.stderr[-4000:])
+            return
+
+        summary = json.loads(proc.stdout.strip().splitlines()[-1])
+        timings = []
+        for line in proc.stderr.splitlines():
+            match = IMPORTTIME_PATTERN.match(line)
+            if match:
+                self_us, cumulative_us, indent, name = match.groups()
+                # 只统计顶层导入，避免子模块重复计入
+                if len(indent) <= 1:
+                    timings.append((name, int(self_us), int(cumulative_us)))
+        timings.sort(key=lambda item: item[2], reverse=True)
+        top = timings[:options['top']]
+
+        if options['json']:
+            summary['modules'] = modules
+            summary['top'] = [
+                {'module': name, 'self_us': self_us, 'cumulative_us': cumulative_us}
+                for name, self_us, cumulative_us in top
+            ]
+            self.stdout.write(json.dumps(summary, ensure_ascii=False, indent=2))
+            return
+
+        self.stdout.write(f"导入模块: {', '.join(modules)}")
+        self.stdout.write(f"启动耗时: {summary['elapsed_ms']} ms，已加载模块数: {summary['module_count']}")
+        self.stdout.write(f"\n按累计耗时排序的前 {len(top)} 个顶层导入:")
+        self.stdout.write(f"{'cumulative(ms)':>15} {'self(ms)':>10}  module")
+        for name, self_us, cumulative_us in top:
+            self.stdout.write(f"{cumulative_us / 1000:>15.1f} {self_us / 1000:>10.1f}  {name}")
+
+        if summary['heavy_loaded']:
+            self.stdout.write(self.style.WARNING(
+                f"\n启动阶段已导入重量级依赖: {', '.join(summary['heavy_loaded'])}"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('\n启动阶段未导入任何重量级推理依赖'))
@@ -0,0 +1,56 @@
+import json
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from common.utils.instrumentation import MONGO_N_PLUS_ONE, MONGO_REQUEST_QUERIES
+from common.utils.query_profiler import profile_queries
+
+logger = logging.getLogger('query_profiler')
+
+
+class QueryProfilerMiddleware:
+    """
+    按请求统计 MongoDB 查询
+
+    每个请求记录命令数、耗时和返回的文档数，同一形态的查询重复达到
+    QUERY_PROFILER_N_PLUS_ONE_THRESHOLD 次时记为 N+1（常见于序列化时逐条解引用 ReferenceField）。
+    QUERY_PROFILER_HEADERS 开启时（默认跟随 DEBUG）写入 X-Mongo-* 响应头，生产环境只导出 Prometheus 指标。
+    流式响应在视图返回后才迭代，只统计到返回响应为止的查询。
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_PROFILER_ENABLED', True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'QUERY_PROFILER_N_PLUS_ONE_THRESHOLD', 5)
+        self.headers = getattr(settings, 'QUERY_PROFILER_HEADERS', settings.DEBUG)
+
+    def __call__(self, request):
+        with profile_queries(self.threshold) as profile:
+            response = self.get_response(request)
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        view = resolver_match.view_name if resolver_match else 'unresolved'
+        MONGO_REQUEST_QUERIES.labels(view=view).observe(profile.count)
+
+        suspects = profile.n_plus_one()
+        for suspect in suspects:
+            MONGO_N_PLUS_ONE.labels(view=view, collection=suspect['shape'].split(' ')[1]).inc()
+        if suspects:
+            logger.warning(json.dumps({
+                'view': view,
+                'path': request.path,
+                **profile.summary(),
+            }, ensure_ascii=False))
+
+        if self.headers:
+            response['X-Mongo-Query-Count'] = str(profile.count)
+            response['X-Mongo-Query-Time-Ms'] = f"{profile.duration_ms:.2f}"
+            response['X-Mongo-Docs-Returned'] = str(profile.documents)
+            if suspects:
+                response['X-Mongo-N-Plus-One'] = '; '.join(
+                    f"{suspect['shape']} x{suspect['count']}" for suspect in suspects[:3]
+                )
+        return response
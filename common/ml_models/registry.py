@@ -0,0 +1,54 @@
+
+import time
+import threading
+from typing import Any, Callable, Dict
+
+
+class ModelRegistry:
+    """
+    推理引擎注册表
+
+    只登记加载函数，首次 get() 时才导入重量级依赖并创建实例，
+    从不做推理的进程（manage.py 命令、Celery beat、普通 web 请求）不再付出导入和加载模型的成本。
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._load_times: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        """登记引擎的加载函数（重复登记以最后一次为准）"""
+        self._loaders[name] = loader
+
+    def get(self, name: str) -> Any:
+        """获取引擎实例，首次调用时加载"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                if name not in self._loaders:
+                    raise KeyError(f"未注册的推理引擎: {name}")
+                start = time.perf_counter()
+                instance = self._loaders[name]()
+                self._load_times[name] = round((time.perf_counter() - start) * 1000, 2)
+                self._instances[name] = instance
+        return instance
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def loaded(self) -> Dict[str, float]:
+        """已加载的引擎及其加载耗时（毫秒）"""
+        return dict(self._load_times)
+
+    def registered(self):
+        return list(self._loaders)
+
+
+# 全局注册表
+model_registry = ModelRegistry()
@@ -0,0 +1,41 @@
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# 子进程内的模型实例，由 _init_worker 在进程启动时加载一次
+_worker_model = None
+# 主进程内的进程池单例
+_executor = None
+
+
+def _init_worker(model_path, compute_type, cpu_threads):
+    """子进程初始化：加载 whisper 模型"""
+    global _worker_model
+    from faster_whisper import WhisperModel
+    _worker_model = WhisperModel(model_path, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+
+
+def transcribe_chunk(audio, options: dict) -> str:
+    """在子进程中转写一段音频（16kHz float32 数组）"""
+    segments, _ = _worker_model.transcribe(audio, **options)
+    return ''.join(segment.text for segment in segments)
+
+
+def get_executor(model_path: str, workers: int, compute_type: str = "int8") -> ProcessPoolExecutor:
+    """
+    获取转写进程池（懒创建）
+
+    使用 spawn 启动子进程，避免 fork 继承主进程中 ctranslate2/OpenMP 的线程状态；
+    CPU 线程按 worker 数平分，防止多个进程争抢同一批核心。
+    """
+    global _executor
+    if _executor is None:
+        cpu_threads = max(1, (os.cpu_count() or 1) // workers)
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_path, compute_type, cpu_threads),
+        )
+    return _executor
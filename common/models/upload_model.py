@@ -28,7 +28,6 @@ class UploadedFile(Document):
         'collection': 'uploaded_files',
         'indexes': [
             {'fields': ['file_type'], 'name': 'file_type_idx'},
-            {'fields': ['user_id'], 'name': 'user_id_idx'},
             {
                 'fields': ['uploaded_at'], 
                 'name': 'uploaded_at_ttl',
@@ -39,11 +38,13 @@ class UploadedFile(Document):
                 'name': 'expires_at_ttl',
                 'expireAfterSeconds': 0  # 使用 expires_at 字段的值作为过期时间
             },
-            # 复合索引示例
+            # 用户的文件列表（默认按上传时间倒序），也覆盖只按 user_id 的查询
             {
                 'fields': ['user_id', 'uploaded_at'],
                 'name': 'user_upload_time_idx'
-            }
+            },
+            # 清理孤儿文件时按路径顺序归并、删除前按路径复查
+            {'fields': ['file_path'], 'name': 'file_path_idx'}
         ],
         'ordering': ['-uploaded_at']
     }
@@ -1,5 +1,10 @@
-from .upload_serializer import UploadedFileSerializer, FileUploadSerializer 
+from .upload_serializer import UploadedFileSerializer, FileUploadSerializer, UploadedFileListSerializer
+from .fields import ReferenceIdField, ReferenceExpansionMixin, parse_expand
 __all__ = [
     'UploadedFileSerializer',
     'FileUploadSerializer',
+    'UploadedFileListSerializer',
+    'ReferenceIdField',
+    'ReferenceExpansionMixin',
+    'parse_expand',
 ]
\ No newline at end of file
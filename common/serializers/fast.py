@@ -0,0 +1,123 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from bson import DBRef, ObjectId
+from mongoengine import fields as me_fields
+from rest_framework import serializers
+
+from common.utils.references import reference_id
+
+# DateTimeField 的输出受 DATETIME_FORMAT、USE_TZ 影响，直接复用 DRF 的实现保证与 DocumentSerializer 一致
+_datetime_field = serializers.DateTimeField()
+
+
+def represent_datetime(value):
+    return _datetime_field.to_representation(value) if value is not None else None
+
+
+def represent_reference(value):
+    pk = reference_id(value)
+    return str(pk) if pk is not None else None
+
+
+def represent_generic(value):
+    """DictField / DynamicField 中的任意值：递归处理 dict、list，ObjectId、日期转字符串"""
+    if isinstance(value, dict):
+        return {key: represent_generic(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [represent_generic(item) for item in value]
+    if isinstance(value, (ObjectId, DBRef)):
+        return represent_reference(value)
+    if hasattr(value, 'isoformat') and hasattr(value, 'hour'):
+        return represent_datetime(value)
+    return value
+
+
+def _identity(value):
+    return value
+
+
+def compile_fields(document, fields: Optional[Iterable[str]] = None,
+                   exclude: Iterable[str] = ()) -> List[Tuple[str, str, Callable, object]]:
+    """
+    预先为 Document 的每个字段生成 (输出名, 库中字段名, 转换函数, 默认值)
+
+    只在类第一次使用时执行一次，之后每行数据只做字典取值和转换，不再反射模型字段。
+    """
+    names = list(fields) if fields is not None else list(document._fields_ordered)
+    compiled = []
+    for name in names:
+        if name in exclude:
+            continue
+        field = document._fields[name]
+        compiled.append((name, field.db_field, _converter(field), field.default))
+    return compiled
+
+
+def _converter(field) -> Callable:
+    if isinstance(field, me_fields.ObjectIdField):
+        return lambda value: str(value) if value is not None else None
+    if isinstance(field, (me_fields.ReferenceField, me_fields.LazyReferenceField)):
+        return represent_reference
+    if isinstance(field, me_fields.DateTimeField):
+        return represent_datetime
+    if isinstance(field, me_fields.EmbeddedDocumentField):
+        mapper = compile_fields(field.document_type)
+        return lambda value: map_document(mapper, value) if value is not None else None
+    if isinstance(field, me_fields.ListField):
+        inner = _converter(field.field) if field.field is not None else represent_generic
+        return lambda value: [inner(item) for item in value] if value is not None else None
+    if isinstance(field, (me_fields.DictField, me_fields.DynamicField)):
+        return represent_generic
+    return _identity
+
+
+def map_document(mapper, raw: Dict) -> Dict:
+    """按预编译的字段表把 as_pymongo() 的原始文档转换为输出字典，缺失字段使用模型默认值"""
+    data = {}
+    for name, db_field, convert, default in mapper:
+        if db_field in raw:
+            value = raw[db_field]
+        else:
+            value = default() if callable(default) else default
+        data[name] = convert(value) if value is not None else None
+    return data
+
+
+class FastDocumentSerializer:
+    """
+    只读的快速序列化
+
+    用于高频列表接口，输入为 QuerySet.as_pymongo() 返回的原始文档，
+    输出与对应的 DocumentSerializer 相同的 JSON 结构，但不构造 Document 对象、
+    不逐行实例化字段对象。子类声明 document、fields/exclude，并可重写 extra() 补充计算字段。
+    """
+
+    document = None
+    fields = None
+    exclude = ()
+
+    _mapper = None
+
+    def __init__(self, instance=None, many=False, context=None):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+
+    @classmethod
+    def mapper(cls):
+        # 每个子类单独缓存，不能继承父类已编译的字段表
+        if cls.__dict__.get('_mapper') is None:
+            cls._mapper = compile_fields(cls.document, cls.fields, cls.exclude)
+        return cls._mapper
+
+    def extra(self, raw: Dict, data: Dict) -> Dict:
+        return data
+
+    def to_representation(self, raw: Dict) -> Dict:
+        return self.extra(raw, map_document(self.mapper(), raw))
+
+    @property
+    def data(self):
+        if self.many:
+            return [self.to_representation(raw) for raw in self.instance]
+        return self.to_representation(self.instance)
@@ -0,0 +1,52 @@
+from rest_framework_mongoengine.fields import ReferenceField
+from mongoengine import Document
+
+from common.utils.references import reference_id
+
+
+class ReferenceIdField(ReferenceField):
+    """
+    只输出引用ID、不解引用的 ReferenceField
+
+    输出时直接读取文档 _data 中保存的 DBRef/ObjectId，不会为每一行查询被引用的文档；
+    写入时与 rest_framework_mongoengine 的 ReferenceField 相同。
+    """
+
+    def get_attribute(self, instance):
+        data = getattr(instance, '_data', None)
+        if data is not None and len(self.source_attrs) == 1 and self.source in data:
+            return data[self.source]
+        return super().get_attribute(instance)
+
+    def to_representation(self, value):
+        pk = reference_id(value)
+        return str(pk) if pk is not None else None
+
+
+class ReferenceExpansionMixin:
+    """
+    按需展开引用
+
+    默认引用字段只输出ID；context['expand'] 中列出的字段（须在 expandable_fields 中声明）
+    输出为 {'id': ..., 字段: ...}。调用方应先用 ReferenceResolver 批量解析，
+    否则展开时会逐条解引用。
+    """
+
+    # 字段名 -> 展开时输出的被引用文档字段
+    expandable_fields = {}
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        for name in self.context.get('expand') or ():
+            attributes = self.expandable_fields.get(name)
+            if attributes is None:
+                continue
+            document = getattr(instance, name, None)
+            if isinstance(document, Document):
+                data[name] = {'id': str(document.id), **{key: getattr(document, key, None) for key in attributes}}
+        return data
+
+
+def parse_expand(params, allowed) -> list:
+    """解析 ?expand=category,user，只保留允许展开的字段"""
+    return [name.strip() for name in (params.get('expand') or '').split(',') if name.strip() in allowed]
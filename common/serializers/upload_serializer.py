@@ -4,6 +4,7 @@ from ..models import UploadedFile
 from django.conf import settings
 import os
 from rest_framework_mongoengine.serializers import DocumentSerializer
+from .fast import FastDocumentSerializer
 
 class FileUploadSerializer(serializers.Serializer):
     """文件上传序列化器"""
@@ -83,4 +84,40 @@ class UploadedFileSerializer(DocumentSerializer):
     
     def get_processing_status_display(self, obj):
         """获取处理状态显示名称"""
-        return dict(UploadedFile.processing_status.choices).get(obj.processing_status, '未知')
\ No newline at end of file
+        return dict(UploadedFile.processing_status.choices).get(obj.processing_status, '未知')
+
+class UploadedFileListSerializer(FastDocumentSerializer):
+    """文件列表的只读序列化，输出与 UploadedFileSerializer 相同"""
+    document = UploadedFile
+    fields = [
+        'id', 'file_name', 'original_filename', 'file_size', 'file_type', 'mime_type',
+        'uploaded_at', 'user_id', 'processing_status', 'expires_at',
+    ]
+
+    FILE_TYPE_DISPLAY = dict(UploadedFile.file_type.choices)
+    PROCESSING_STATUS_DISPLAY = dict(UploadedFile.processing_status.choices)
+
+    def extra(self, raw, data):
+        file_path = raw.get('file_path')
+        download_url = None
+        if file_path:
+            request = self.context.get('request')
+            download_url = settings.MEDIA_URL + file_path
+            if request:
+                download_url = request.build_absolute_uri(download_url)
+
+        return {
+            'id': data['id'],
+            'file_name': data['file_name'],
+            'original_filename': data['original_filename'],
+            'file_size': data['file_size'],
+            'file_type': data['file_type'],
+            'file_type_display': self.FILE_TYPE_DISPLAY.get(data['file_type'], '未知'),
+            'mime_type': data['mime_type'],
+            'uploaded_at': data['uploaded_at'],
+            'user_id': data['user_id'],
+            'download_url': download_url,
+            'processing_status': data['processing_status'],
+            'processing_status_display': self.PROCESSING_STATUS_DISPLAY.get(data['processing_status'], '未知'),
+            'expires_at': data['expires_at'],
+        }
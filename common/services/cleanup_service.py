@@ -0,0 +1,192 @@
+import heapq
+import os
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from common.models.upload_model import UploadedFile
+
+CHECKPOINT_KEY = 'a:uploads:cleanup:checkpoint'
+LOCK_KEY = 'a:uploads:cleanup:lock'
+LOCK_TIMEOUT = 3600
+
+
+def scan_files(root: str, after: str = '', prefix: str = '') -> Iterator[Tuple[str, os.DirEntry]]:
+    """
+    用 os.scandir 逐层遍历目录，按相对路径的字符串顺序产出 (相对路径, DirEntry)
+
+    同一目录下目录按 "名称/" 与文件名一起排序，这样整棵树的输出顺序与字符串排序（也就是 MongoDB 对
+    file_path 的排序）一致，可以和库中的路径做归并。只读取当前目录的条目，不会一次性列出整棵树。
+    after 为检查点：不大于它的路径跳过，全部路径都不大于它的子目录整个跳过。
+    """
+    try:
+        with os.scandir(os.path.join(root, prefix) if prefix else root) as iterator:
+            entries = []
+            for entry in iterator:
+                if entry.is_dir(follow_symlinks=False):
+                    entries.append((f'{prefix}{entry.name}/', entry))
+                elif entry.is_file(follow_symlinks=False):
+                    entries.append((f'{prefix}{entry.name}', entry))
+    except OSError as e:
+        print(f"读取目录{prefix or root}失败: {e}")
+        return
+
+    entries.sort(key=lambda item: item[0])
+    for path, entry in entries:
+        if path.endswith('/'):
+            # 子目录下的路径都以 path 开头，检查点不在其中且排在 path 之后时，整个子目录都已处理过
+            if after and not after.startswith(path) and path < after:
+                continue
+            yield from scan_files(root, after, path)
+        elif path > after:
+            yield path, entry
+
+
+def normalize_path(path: str, root: str) -> str:
+    """库中的路径统一为相对 MEDIA_ROOT、以 / 分隔的形式"""
+    path = (path or '').replace('\\', '/')
+    root = root.replace('\\', '/').rstrip('/') + '/'
+    if path.startswith(root):
+        path = path[len(root):]
+    while path.startswith('./'):
+        path = path[2:]
+    return path.lstrip('/')
+
+
+class OrphanFileCleaner:
+    """
+    清理上传目录中没有被引用的文件
+
+    UploadedFile 的 TTL 索引只删除库中的文档，文件会一直留在磁盘上。这里把 MEDIA_ROOT 下的文件与
+    仍被引用的路径（UploadedFile.file_path、记录 raw_inputs 中的 file_path）做有序归并：
+    磁盘一侧用 os.scandir 按路径顺序遍历，库的一侧按 file_path 排序的游标读取，两边都是流式的，
+    内存占用与文件数无关。没有被引用、且最近 grace_seconds 内没有修改过的文件为孤儿文件，
+    攒满一批后删除前再按路径精确查一次库，避免误删刚被引用的文件。
+
+    单次运行超过 max_seconds 时把最后处理的路径记为检查点，下次从检查点之后继续。
+    """
+
+    def __init__(self, root: Optional[str] = None, grace_seconds: Optional[int] = None,
+                 batch_size: Optional[int] = None, max_seconds: Optional[float] = None, dry_run: bool = False):
+        self.root = root or settings.MEDIA_ROOT
+        self.grace_seconds = grace_seconds if grace_seconds is not None else getattr(
+            settings, 'UPLOAD_CLEANUP_GRACE_SECONDS', 86400)
+        self.batch_size = batch_size or getattr(settings, 'UPLOAD_CLEANUP_BATCH_SIZE', 500)
+        self.max_seconds = max_seconds if max_seconds is not None else getattr(
+            settings, 'UPLOAD_CLEANUP_MAX_SECONDS', 600)
+        self.dry_run = dry_run
+        self.stats = {'scanned': 0, 'referenced': 0, 'recent': 0, 'deleted': 0, 'freed_bytes': 0,
+                      'errors': 0, 'checkpoint': None, 'finished': False}
+
+    # ---- 库中仍被引用的路径 ----
+
+    def _uploaded_paths(self, after: str) -> Iterator[str]:
+        query = {'file_path': {'$gt': after}} if after else {}
+        cursor = UploadedFile._get_collection().find(query, {'file_path': 1, '_id': 0}).sort('file_path', 1)
+        for document in cursor.batch_size(1000):
+            if document.get('file_path'):
+                yield document['file_path']
+
+    def _record_paths(self, after: str) -> Iterator[str]:
+        from records.models import Record
+
+        match = {'raw_inputs.file_path': {'$gt': after or ''}}
+        pipeline = [
+            {'$match': match},
+            {'$unwind': '$raw_inputs'},
+            {'$match': match},
+            {'$group': {'_id': '$raw_inputs.file_path'}},
+            {'$sort': {'_id': 1}},
+        ]
+        for document in Record._get_collection().aggregate(pipeline, allowDiskUse=True, batchSize=1000):
+            yield document['_id']
+
+    def referenced_paths(self, after: str = '') -> Iterator[str]:
+        """两个集合中按顺序归并出的被引用路径"""
+        for path in heapq.merge(self._uploaded_paths(after), self._record_paths(after)):
+            yield normalize_path(path, self.root)
+
+    def still_referenced(self, paths: List[str]) -> set:
+        """删除前的精确复查：库中按相对路径或绝对路径保存的引用都算"""
+        from records.models import Record
+
+        candidates = paths + [os.path.join(self.root, path) for path in paths]
+        referenced = set()
+        for document in UploadedFile._get_collection().find({'file_path': {'$in': candidates}}, {'file_path': 1}):
+            referenced.add(normalize_path(document['file_path'], self.root))
+        for document in Record._get_collection().find(
+                {'raw_inputs.file_path': {'$in': candidates}}, {'raw_inputs.file_path': 1}):
+            for raw_input in document.get('raw_inputs') or []:
+                if raw_input.get('file_path'):
+                    referenced.add(normalize_path(raw_input['file_path'], self.root))
+        return referenced
+
+    # ---- 清理 ----
+
+    def run(self, resume: bool = True) -> Dict:
+        if not cache.add(LOCK_KEY, 1, timeout=LOCK_TIMEOUT):
+            raise RuntimeError('已有清理任务在运行')
+        try:
+            return self._run(cache.get(CHECKPOINT_KEY) or '' if resume else '')
+        finally:
+            cache.delete(LOCK_KEY)
+
+    def _run(self, after: str) -> Dict:
+        start = time.monotonic()
+        cutoff = time.time() - self.grace_seconds
+        referenced = self.referenced_paths(after)
+        current = next(referenced, None)
+        batch: List[Tuple[str, os.DirEntry]] = []
+        last_path = after
+
+        for path, entry in scan_files(self.root, after):
+            self.stats['scanned'] += 1
+            last_path = path
+
+            # 归并：跳过所有排在当前文件之前的引用路径
+            while current is not None and current < path:
+                current = next(referenced, None)
+            if current == path:
+                self.stats['referenced'] += 1
+                continue
+
+            try:
+                if entry.stat(follow_symlinks=False).st_mtime > cutoff:
+                    self.stats['recent'] += 1
+                    continue
+            except OSError:
+                continue
+
+            batch.append((path, entry))
+            if len(batch) >= self.batch_size:
+                self._delete(batch)
+                batch = []
+                if self.max_seconds and time.monotonic() - start > self.max_seconds:
+                    self.stats['checkpoint'] = last_path
+                    cache.set(CHECKPOINT_KEY, last_path, timeout=None)
+                    return self.stats
+
+        if batch:
+            self._delete(batch)
+        cache.delete(CHECKPOINT_KEY)
+        self.stats['finished'] = True
+        return self.stats
+
+    def _delete(self, batch: List[Tuple[str, os.DirEntry]]):
+        referenced = self.still_referenced([path for path, _ in batch])
+        for path, entry in batch:
+            if path in referenced:
+                self.stats['referenced'] += 1
+                continue
+            try:
+                size = entry.stat(follow_symlinks=False).st_size
+                if not self.dry_run:
+                    os.remove(entry.path)
+            except OSError as e:
+                print(f"删除文件{path}失败: {e}")
+                self.stats['errors'] += 1
+                continue
+            self.stats['deleted'] += 1
+            self.stats['freed_bytes'] += size
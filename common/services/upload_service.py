@@ -5,11 +5,13 @@ from typing import Dict, List
 from ..models import UploadedFile
 from mongoengine.queryset.visitor import Q 
 from pydantic import Field, BaseModel
+from common.utils.instrumentation import traced
 
 class UploadFileService:
     """文件上传服务类"""
     
     
+    @traced('upload')
     def upload_file(self, file_list: list, user, ) -> List[UploadedFile]:
         """上传文件"""
         uploaded_files = []
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import time
+
+import mongomock
+from django.test import SimpleTestCase, override_settings
+from mongoengine import connect, disconnect
+
+from common.models.upload_model import UploadedFile
+from common.services.cleanup_service import OrphanFileCleaner, normalize_path, scan_files
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class UploadTreeMixin:
+    """在临时目录中创建上传文件，mtime 早于宽限期"""
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        super().tearDown()
+
+    def create(self, *paths, age=7 * 86400):
+        mtime = time.time() - age
+        for path in paths:
+            full_path = os.path.join(self.root, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, 'w') as f:
+                f.write(path)
+            os.utime(full_path, (mtime, mtime))
+
+    def remaining(self):
+        return [path for path, _ in scan_files(self.root)]
+
+
+class ScanFilesTests(UploadTreeMixin, SimpleTestCase):
+    paths = ['b', 'a/x', 'a.txt', 'a-b', 'a/c/d', 'image/2025/1.jpg', 'image/20250101.jpg']
+
+    def test_string_order_across_directories(self):
+        self.create(*self.paths)
+        # "a-b" < "a.txt" < "a/..."：目录按 "名称/" 参与排序，与 MongoDB 对 file_path 的排序一致
+        self.assertEqual(self.remaining(), sorted(self.paths))
+
+    def test_resumes_after_checkpoint(self):
+        self.create(*self.paths)
+        for after in sorted(self.paths):
+            with self.subTest(after=after):
+                self.assertEqual([path for path, _ in scan_files(self.root, after)],
+                                 [path for path in sorted(self.paths) if path > after])
+
+    def test_missing_root(self):
+        self.assertEqual(list(scan_files(os.path.join(self.root, 'missing'))), [])
+
+    def test_normalize_path(self):
+        self.assertEqual(normalize_path(os.path.join(self.root, 'image', '1.jpg'), self.root), 'image/1.jpg')
+        self.assertEqual(normalize_path('./image\\1.jpg', self.root), 'image/1.jpg')
+        self.assertEqual(normalize_path('/image/1.jpg', '/media'), 'image/1.jpg')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class OrphanFileCleanerTests(UploadTreeMixin, SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        disconnect(alias='default')
+        connect('sovo_test', host='mongodb://localhost', alias='default',
+                mongo_client_class=mongomock.MongoClient)
+
+    @classmethod
+    def tearDownClass(cls):
+        disconnect(alias='default')
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        from records.models import Record
+
+        self.records = Record._get_collection()
+        self.records.drop()
+        UploadedFile.drop_collection()
+
+    def reference(self, uploaded=(), recorded=()):
+        for path in uploaded:
+            UploadedFile._get_collection().insert_one({'file_path': path})
+        if recorded:
+            self.records.insert_one({'raw_inputs': [{'type': 'image', 'file_path': path} for path in recorded]})
+
+    def test_referenced_paths_are_merged_in_order(self):
+        self.reference(uploaded=['image/3.jpg', 'audio/1.wav'], recorded=['image/2.jpg', 'audio/0.wav'])
+        self.reference(recorded=['image/1.jpg', 'image/2.jpg'])
+        cleaner = OrphanFileCleaner(root=self.root)
+        # 两个集合各自按 file_path 有序，归并后整体有序，同一路径在记录中多次引用只出现一次
+        self.assertEqual(list(cleaner.referenced_paths()),
+                         ['audio/0.wav', 'audio/1.wav', 'image/1.jpg', 'image/2.jpg', 'image/3.jpg'])
+        self.assertEqual(list(cleaner.referenced_paths('audio/1.wav')),
+                         ['image/1.jpg', 'image/2.jpg', 'image/3.jpg'])
+
+    def test_deletes_only_old_unreferenced_files(self):
+        self.create('audio/0.wav', 'audio/1.wav', 'image/1.jpg', 'image/2.jpg', 'image/3.jpg')
+        self.create('image/4.jpg', age=0)
+        # 按绝对路径保存的引用不在归并顺序中，由删除前的复查保留
+        self.reference(uploaded=['audio/1.wav'], recorded=[os.path.join(self.root, 'image', '2.jpg')])
+
+        stats = OrphanFileCleaner(root=self.root, grace_seconds=86400, batch_size=2).run()
+
+        self.assertTrue(stats['finished'])
+        self.assertEqual(stats['scanned'], 6)
+        self.assertEqual(stats['referenced'], 2)
+        self.assertEqual(stats['recent'], 1)
+        self.assertEqual(stats['deleted'], 3)
+        self.assertEqual(self.remaining(), ['audio/1.wav', 'image/2.jpg', 'image/4.jpg'])
+
+    def test_dry_run_keeps_files(self):
+        self.create('image/1.jpg', 'image/2.jpg')
+        stats = OrphanFileCleaner(root=self.root, grace_seconds=0, dry_run=True).run()
+        self.assertEqual(stats['deleted'], 2)
+        self.assertEqual(self.remaining(), ['image/1.jpg', 'image/2.jpg'])
@@ -0,0 +1,191 @@
+import json
+import time
+import logging
+import functools
+from contextlib import contextmanager, nullcontext
+
+from django.conf import settings
+from prometheus_client import Counter, Gauge, Histogram
+
+# 结构化的阶段耗时日志
+pipeline_logger = logging.getLogger('pipeline')
+
+STAGE_LATENCY = Histogram(
+    'floatnote_stage_duration_seconds',
+    '记录处理流水线各阶段耗时',
+    ['stage', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+LLM_TOKENS = Counter(
+    'floatnote_llm_tokens_total',
+    'LLM 调用消耗的 token 数',
+    ['stage', 'kind'],
+)
+
+PROMPT_TOKENS = Histogram(
+    'floatnote_prompt_tokens',
+    '发送给 LLM 的提示词 token 数（估算）',
+    ['stage'],
+    buckets=(100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000, 8000),
+)
+
+LLM_REQUESTS = Counter(
+    'floatnote_llm_requests_total',
+    'LLM 服务调用次数（success/error/timeout/rejected；invalid 为输出解析失败等不计入熔断的错误）',
+    ['provider', 'outcome'],
+)
+
+LLM_REQUEST_LATENCY = Histogram(
+    'floatnote_llm_request_duration_seconds',
+    'LLM 服务单次调用耗时',
+    ['provider'],
+    buckets=(0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 45, 60),
+)
+
+LLM_CIRCUIT_STATE = Gauge(
+    'floatnote_llm_circuit_state',
+    'LLM 服务熔断器状态：0 关闭，1 半开，2 打开',
+    ['provider'],
+    multiprocess_mode='livemax',
+)
+
+LLM_HEDGED_REQUESTS = Counter(
+    'floatnote_llm_hedged_requests_total',
+    '超过 p95 延迟后发出的对冲请求数',
+    ['provider'],
+)
+
+CACHE_REQUESTS = Counter(
+    'floatnote_cache_requests_total',
+    '缓存读取次数（按是否命中）',
+    ['stage', 'result'],
+)
+
+MONGO_COMMAND_LATENCY = Histogram(
+    'floatnote_mongo_command_duration_seconds',
+    'MongoDB 命令耗时',
+    ['command', 'collection'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+MONGO_REQUEST_QUERIES = Histogram(
+    'floatnote_mongo_queries_per_request',
+    '每个请求发出的 MongoDB 命令数',
+    ['view'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+
+MONGO_N_PLUS_ONE = Counter(
+    'floatnote_mongo_n_plus_one_total',
+    '检测到 N+1 查询（同一形态的查询在一个请求中重复多次）的次数',
+    ['view', 'collection'],
+)
+
+
+def _get_tracer():
+    """开启 OTEL_TRACING_ENABLED 且安装了 opentelemetry 时返回 tracer，否则返回 None"""
+    if not getattr(settings, 'OTEL_TRACING_ENABLED', False):
+        return None
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return None
+    # 导出器由 opentelemetry-instrument / OTEL_* 环境变量配置
+    return trace.get_tracer('floatnote')
+
+
+class StageSpan:
+    """一个阶段的耗时区间，可附加属性（token 数、缓存命中等）"""
+
+    def __init__(self, name: str, attributes: dict):
+        self.name = name
+        self.attributes = {}
+        self.status = 'ok'
+        self._otel_span = None
+        for key, value in attributes.items():
+            self.set(key, value)
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+        if self._otel_span is not None and value is not None:
+            # OpenTelemetry 属性只接受基础类型
+            if not isinstance(value, (str, bool, int, float)):
+                value = str(value)
+            self._otel_span.set_attribute(key, value)
+
+    def record_llm_usage(self, usage: dict):
+        """记录一次 LLM 调用的 token 用量（兼容 DeepSeek 的 prompt 缓存字段）"""
+        if not usage:
+            return
+        for kind in ('prompt_tokens', 'completion_tokens', 'total_tokens'):
+            count = usage.get(kind) or 0
+            self.set(kind, self.attributes.get(kind, 0) + count)
+            if count:
+                LLM_TOKENS.labels(stage=self.name, kind=kind).inc(count)
+
+        cache_hit_tokens = usage.get('prompt_cache_hit_tokens') or 0
+        self.set('cache_hit_tokens', self.attributes.get('cache_hit_tokens', 0) + cache_hit_tokens)
+        self.set('cache_hit', self.attributes['cache_hit_tokens'] > 0)
+        if cache_hit_tokens:
+            LLM_TOKENS.labels(stage=self.name, kind='prompt_cache_hit_tokens').inc(cache_hit_tokens)
+
+    def record_cache(self, hit: bool):
+        """记录缓存是否命中"""
+        self.set('cache_hit', hit)
+        CACHE_REQUESTS.labels(stage=self.name, result='hit' if hit else 'miss').inc()
+
+
+@contextmanager
+def stage_span(name: str, **attributes):
+    """
+    统计一个阶段的耗时
+
+    导出为 Prometheus 直方图、写一条 DEBUG 级别的结构化日志，开启时同时生成 OpenTelemetry span。
+    属性会原样写入日志，不要放用户数据（如缓存键、输入文本）。
+    """
+    span = StageSpan(name, {})
+    tracer = _get_tracer()
+    otel_context = tracer.start_as_current_span(name) if tracer else nullcontext()
+    start = time.perf_counter()
+
+    with otel_context as otel_span:
+        span._otel_span = otel_span
+        for key, value in attributes.items():
+            span.set(key, value)
+        try:
+            yield span
+        except Exception as e:
+            span.status = 'error'
+            span.set('error', str(e))
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            STAGE_LATENCY.labels(stage=name, status=span.status).observe(duration)
+            pipeline_logger.debug(json.dumps({
+                'stage': name,
+                'status': span.status,
+                'duration_ms': round(duration * 1000, 2),
+                **span.attributes,
+            }, ensure_ascii=False, default=str))
+
+
+def traced(name: str, **attributes):
+    """
+    stage_span 的装饰器形式
+
+    被装饰函数返回 HTTP 响应时，状态码 >= 400 记为 error。
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_span(name, **attributes) as span:
+                result = func(*args, **kwargs)
+                status_code = getattr(result, 'status_code', None)
+                if isinstance(status_code, int):
+                    span.set('http_status', status_code)
+                    if status_code >= 400:
+                        span.status = 'error'
+                return result
+        return wrapper
+    return decorator
@@ -0,0 +1,175 @@
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from pymongo import monitoring
+
+from .instrumentation import MONGO_COMMAND_LATENCY
+
+# 不是独立查询的命令：getMore 属于上一次 find/aggregate 的游标，其余是连接维护命令
+_IGNORED_SHAPE_COMMANDS = {'getMore', 'killCursors'}
+_IGNORED_COMMANDS = {'isMaster', 'ismaster', 'hello', 'ping', 'saslStart', 'saslContinue',
+                     'buildInfo', 'endSessions', 'getLastError'}
+
+_current_profile: ContextVar[Optional['QueryProfile']] = ContextVar('mongo_query_profile', default=None)
+
+
+def _filter_shape(query) -> str:
+    """查询条件的形态：只保留字段名和操作符，去掉具体的值"""
+    if not isinstance(query, dict):
+        return ''
+    parts = []
+    for key in sorted(query):
+        value = query[key]
+        if isinstance(value, dict) and value and all(str(op).startswith('$') for op in value):
+            parts.append(f"{key}:{','.join(sorted(value))}")
+        else:
+            parts.append(key)
+    return '{' + ','.join(parts) + '}'
+
+
+def command_shape(name: str, command: dict) -> str:
+    """命令的形态，如 find records {_id}；形态相同的查询在一个请求里重复出现即视为 N+1"""
+    collection = command.get(name)
+    if name == 'find':
+        query = command.get('filter')
+    elif name == 'aggregate':
+        pipeline = command.get('pipeline') or [{}]
+        query = pipeline[0].get('$match') if pipeline else None
+    elif name in ('count', 'distinct'):
+        query = command.get('query')
+    elif name == 'findAndModify':
+        query = command.get('query')
+    elif name in ('update', 'delete'):
+        statements = command.get('updates') or command.get('deletes') or [{}]
+        query = statements[0].get('q')
+    else:
+        query = None
+    return f"{name} {collection} {_filter_shape(query)}".strip()
+
+
+def _documents_returned(name: str, reply: dict) -> int:
+    cursor = reply.get('cursor')
+    if isinstance(cursor, dict):
+        return len(cursor.get('firstBatch') or cursor.get('nextBatch') or [])
+    if name == 'findAndModify':
+        return 1 if reply.get('value') else 0
+    if name == 'count':
+        return 1
+    return 0
+
+
+class QueryProfile:
+    """一次请求（或一段代码）内的 MongoDB 命令统计"""
+
+    def __init__(self, n_plus_one_threshold: int = 5):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.count = 0
+        self.duration_ms = 0.0
+        self.documents = 0
+        self.errors = 0
+        self.shapes = Counter()
+        self.wall_ms = 0.0
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        shape = None
+        if event.command_name not in _IGNORED_SHAPE_COMMANDS:
+            shape = command_shape(event.command_name, event.command)
+        with self._lock:
+            self._pending[event.request_id] = shape
+
+    def finished(self, event, reply: Optional[dict] = None):
+        with self._lock:
+            shape = self._pending.pop(event.request_id, None)
+            self.count += 1
+            self.duration_ms += event.duration_micros / 1000
+            if reply is None:
+                self.errors += 1
+            else:
+                self.documents += _documents_returned(event.command_name, reply)
+            if shape:
+                self.shapes[shape] += 1
+
+    def n_plus_one(self) -> List[Dict]:
+        """重复次数达到阈值的查询形态"""
+        return [
+            {'shape': shape, 'count': count}
+            for shape, count in self.shapes.most_common()
+            if count >= self.n_plus_one_threshold
+        ]
+
+    def summary(self) -> Dict:
+        return {
+            'queries': self.count,
+            'duration_ms': round(self.duration_ms, 2),
+            'documents': self.documents,
+            'errors': self.errors,
+            'n_plus_one': self.n_plus_one(),
+        }
+
+
+class QueryProfilerListener(monitoring.CommandListener):
+    """
+    pymongo 命令监听器
+
+    在 connect() 时通过 event_listeners 注册，导出每条命令的耗时指标；
+    当前上下文有 QueryProfile 时（请求中由 QueryProfilerMiddleware 开启）同时计入该请求的统计。
+    监听器在执行命令的线程里同步调用，ContextVar 可以找到发起查询的请求。
+    """
+
+    def __init__(self):
+        # request_id -> 集合名，成功/失败事件里没有原始命令
+        self._collections = {}
+
+    def started(self, event):
+        if event.command_name in _IGNORED_COMMANDS:
+            return
+        command = event.command
+        collection = command.get('collection') if event.command_name == 'getMore' else command.get(event.command_name)
+        self._collections[event.request_id] = collection if isinstance(collection, str) else '-'
+
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.started(event)
+
+    def succeeded(self, event):
+        self._finished(event, event.reply)
+
+    def failed(self, event):
+        self._finished(event, None)
+
+    def _finished(self, event, reply):
+        if event.command_name in _IGNORED_COMMANDS:
+            return
+        MONGO_COMMAND_LATENCY.labels(
+            command=event.command_name,
+            collection=self._collections.pop(event.request_id, '-'),
+        ).observe(event.duration_micros / 1_000_000)
+
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.finished(event, reply)
+
+
+@contextmanager
+def profile_queries(n_plus_one_threshold: int = 5):
+    """
+    统计代码块内的 MongoDB 命令
+
+        with profile_queries() as profile:
+            RecordSerializer(records, many=True).data
+        print(profile.summary())
+    """
+    profile = QueryProfile(n_plus_one_threshold)
+    token = _current_profile.set(profile)
+    start = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+        profile.wall_ms = (time.perf_counter() - start) * 1000
@@ -0,0 +1,66 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+from bson import DBRef, ObjectId
+from mongoengine import Document
+
+
+def reference_id(value):
+    """ReferenceField 中保存的值（DBRef / ObjectId / 已解引用的文档）对应的ID"""
+    if value is None:
+        return None
+    if isinstance(value, (Document, DBRef)):
+        return value.id
+    return value
+
+
+class ReferenceResolver:
+    """
+    批量解析 ReferenceField
+
+    MongoEngine 访问 ReferenceField 时会逐个查询被引用的文档，序列化列表时就是 N+1。
+    这里先收集一批文档里所有的引用ID，每个被引用的集合只用一次 $in 查询取回，
+    再写回文档的 _data，之后访问该字段不会再触发查询。
+    同一个ID只取一次、对应同一个对象（identity map），同一个 resolver 可以跨批次复用。
+    """
+
+    def __init__(self):
+        # (文档类, ID) -> 文档；不存在的引用也记下，避免重复查询
+        self._identity_map: Dict[tuple, Document] = {}
+
+    def resolve(self, documents: Iterable[Document], field_names: Iterable[str]) -> List[Document]:
+        documents = list(documents)
+        field_names = list(field_names)
+
+        pending = defaultdict(set)
+        targets = {}
+        for name in field_names:
+            field = documents[0]._fields.get(name) if documents else None
+            if field is None or not hasattr(field, 'document_type'):
+                continue
+            targets[name] = field.document_type
+            for document in documents:
+                pk = reference_id(document._data.get(name))
+                if pk is not None and (field.document_type, pk) not in self._identity_map:
+                    pending[field.document_type].add(pk)
+
+        for document_type, ids in pending.items():
+            found = document_type.objects.in_bulk(list(ids))
+            for pk in ids:
+                self._identity_map[(document_type, pk)] = found.get(pk)
+
+        for name, document_type in targets.items():
+            for document in documents:
+                value = document._data.get(name)
+                if isinstance(value, Document):
+                    continue
+                pk = reference_id(value)
+                resolved = self._identity_map.get((document_type, pk)) if pk is not None else None
+                if resolved is not None:
+                    document._data[name] = resolved
+        return documents
+
+    def get(self, document_type, pk):
+        if isinstance(pk, str) and ObjectId.is_valid(pk):
+            pk = ObjectId(pk)
+        return self._identity_map.get((document_type, pk))
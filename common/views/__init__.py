@@ -1,7 +1,9 @@
 from .upload_view  import FileUploadView, FileListView, FileDownloadView, FileDeleteView
+from .metrics_view import metrics_view
 __all__ = [
     'FileUploadView',
     'FileListView',
     'FileDownloadView',
-    'FileDeleteView'
+    'FileDeleteView',
+    'metrics_view'
 ]
\ No newline at end of file
@@ -0,0 +1,33 @@
+import hmac
+import os
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, REGISTRY, generate_latest
+
+
+def _authorized(request) -> bool:
+    """携带正确的 Bearer Token，或来源 IP 在白名单中（未配置 Token 时只看白名单）"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if header.startswith('Bearer ') and hmac.compare_digest(header[len('Bearer '):], token):
+            return True
+    # 直接取 REMOTE_ADDR，不信任可伪造的 X-Forwarded-For
+    return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', [])
+
+
+def metrics_view(request):
+    """Prometheus 指标抓取端点，未开启 METRICS_ENABLED 时返回 404"""
+    if not getattr(settings, 'METRICS_ENABLED', False):
+        raise Http404()
+    if not _authorized(request):
+        return HttpResponseForbidden()
+
+    registry = REGISTRY
+    # gunicorn 等多进程部署时，需设置 PROMETHEUS_MULTIPROC_DIR 汇总各进程指标
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -14,6 +14,7 @@ from ..models import UploadedFile
 from ..serializers import (
     FileUploadSerializer, 
     UploadedFileSerializer,
+    UploadedFileListSerializer,
 )
 
 
@@ -216,9 +217,10 @@ class FileListView(APIView):
             skip = (page - 1) * page_size
             
             total_count = queryset.count()
-            files = list(queryset.skip(skip).limit(page_size))
+            # 只读列表直接取原始文档，用预编译的字段表序列化，不构造 Document
+            files = list(queryset.skip(skip).limit(page_size).as_pymongo())
             
-            serializer = UploadedFileSerializer(
+            serializer = UploadedFileListSerializer(
                 files, 
                 many=True, 
                 context={'request': request}
@@ -4,6 +4,7 @@ from bson import json_util
 from bson.objectid import ObjectId
 from contextlib import suppress
 from .exceptions import CacheError
+from common.utils.instrumentation import stage_span
 
 # 默认 TTL：5 分钟
 DEFAULT_TIMEOUT = 300
@@ -160,6 +161,10 @@ def safe_delete(key: str):
     with suppress(Exception):
         cache.delete(key)
 
+def key_prefix(key: str) -> str:
+    """缓存键去掉最后一段（ID 或参数哈希），如 a:record:<id> -> a:record，用作日志和指标的标签"""
+    return key.rsplit(':', 1)[0] if ':' in key else key
+
 def get_cached_or_fetch(
     key: str,
     fetch_func,
@@ -171,41 +176,45 @@ def get_cached_or_fetch(
     缓存核心：先读缓存，未命中则回源
     支持自定义序列化（如模型对象）
     """
-    # 1. 尝试从缓存读取
-    cached = safe_get(key)
+    with stage_span('cache', key_prefix=key_prefix(key)) as span:
+        # 1. 尝试从缓存读取
+        cached = safe_get(key)
 
     
-    # 如果缓存数据存在且不是字符串类型，直接返回
-    if cached is not None and not isinstance(cached, (str, bytes)):
-        print(f'缓存数据不是字符串类型，直接返回: {type(cached)}')
-        return cached
+        # 如果缓存数据存在且不是字符串类型，直接返回
+        if cached is not None and not isinstance(cached, (str, bytes)):
+            print(f'缓存数据不是字符串类型，直接返回: {type(cached)}')
+            span.record_cache(True)
+            return cached
     
-    # 如果有反序列化函数且缓存数据是字符串，尝试反序列化
-    if cached is not None and deserializer and isinstance(cached, (str, bytes)):
-        try:
-            # 尝试反序列化
-            deserialized = deserializer(cached)
+        # 如果有反序列化函数且缓存数据是字符串，尝试反序列化
+        if cached is not None and deserializer and isinstance(cached, (str, bytes)):
+            try:
+                # 尝试反序列化
+                deserialized = deserializer(cached)
             
-            # 验证反序列化结果
-            if deserialized is not None and not isinstance(deserialized, str):
-                return deserialized
-            else:
-                print(f'反序列化结果无效或为字符串，继续回源')
-        except CacheError:
-            print('捕获到CacheError，继续回源')
-        except Exception as e:
-            print(f'反序列化过程中出现其他异常: {e}')
+                # 验证反序列化结果
+                if deserialized is not None and not isinstance(deserialized, str):
+                    span.record_cache(True)
+                    return deserialized
+                else:
+                    print(f'反序列化结果无效或为字符串，继续回源')
+            except CacheError:
+                print('捕获到CacheError，继续回源')
+            except Exception as e:
+                print(f'反序列化过程中出现其他异常: {e}')
     
-    # 如果缓存不存在、反序列化失败或结果无效，继续回源查询（不返回缓存数据）
+        # 如果缓存不存在、反序列化失败或结果无效，继续回源查询（不返回缓存数据）
 
-    # 2. 缓存未命中，回源查询
-    try:
-        data = fetch_func()
-        # 3. 写入缓存
-        save_data = serializer(data) if serializer else data
-        safe_set(key, save_data, timeout)
-        return data
-    except Exception as e:
-        # 即使数据库出错，也不应让缓存问题雪崩
-        print(f"[Cache] 回源失败: {e}")
-        raise
\ No newline at end of file
+        # 2. 缓存未命中，回源查询
+        span.record_cache(False)
+        try:
+            data = fetch_func()
+            # 3. 写入缓存
+            save_data = serializer(data) if serializer else data
+            safe_set(key, save_data, timeout)
+            return data
+        except Exception as e:
+            # 即使数据库出错，也不应让缓存问题雪崩
+            print(f"[Cache] 回源失败: {e}")
+            raise
\ No newline at end of file
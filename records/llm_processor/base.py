@@ -1,17 +1,30 @@
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Iterator, Optional
+from django.conf import settings
 from .chains import LLMChainFactory
 from .parsers import MultiTypeOutputParser, TypeDetector
-from .utils import MultiModalPreprocessor
+from .utils import MultiModalPreprocessor, PreprocessCancelled
 from .schemas import RecordType
+from .callbacks import TokenUsageHandler
+from .streaming import IncrementalJSONParser, MalformedOutputError, validate_field
+from .gateway import LLMUnavailableError
+from .router import TASK_CLASSIFICATION, TASK_EXTRACTION
 from ..models import Tag
 from accounts.models import User
+from common.utils.instrumentation import PROMPT_TOKENS, stage_span, traced
 
 
+import contextvars
+import queue
+import threading
 import time
 import json
 from langchain_openai import ChatOpenAI
 from langchain.schema import HumanMessage, SystemMessage
 
+# 后台预处理结束的标记
+_PREPROCESS_DONE = object()
+
+
 class LLMProcessor:
     """LLM处理器主类"""
     
@@ -21,11 +34,13 @@ class LLMProcessor:
         self.type_detector = TypeDetector()
         self.preprocessor = MultiModalPreprocessor()
     
-    def process_inputs(self, raw_inputs: list, category_schema: Dict[str, any], user: User) -> Dict[str, Any]:
-        """处理多模态输入"""
+    @traced('llm.process')
+    def process_inputs(self, raw_inputs: list, category_schema: Dict[str, any], user: User,
+                       on_partial: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """处理多模态输入，on_partial 接收语音识别过程中的部分文本"""
    
         # 1. 预处理多模态输入
-        combined_text = self.preprocessor.preprocess_inputs(raw_inputs)
+        combined_text = self.preprocessor.preprocess_inputs(raw_inputs, on_partial=on_partial)
 
         
         if not combined_text.strip():
@@ -51,27 +66,116 @@ class LLMProcessor:
             'category': category_schema['category_types'][record_type],
         }
     
+    def process_inputs_stream(self, raw_inputs: list, category_schema: Dict[str, any],
+                              user: User) -> Iterator[Dict[str, Any]]:
+        """
+        流式处理多模态输入
+
+        依次产出事件 {'event': ..., 'data': ...}：
+        text(语音识别过程中为 {'partial_text': 目前为止的识别文本}，预处理完成后为 {'raw_text': 预处理后的文本})、
+        type(检测到的类型)、field(校验通过的字段)、field_error(字段校验失败)、
+        retry(输出格式错误，重新生成)，最后是 result(与 process_inputs 返回值相同)。
+        """
+        combined_text = yield from self._stream_preprocess(raw_inputs)
+
+        if not combined_text.strip():
+            yield {'event': 'result', 'data': self._create_default_response("输入内容为空")}
+            return
+        yield {'event': 'text', 'data': {'raw_text': combined_text}}
+
+        record_type = self._detect_record_type(combined_text, category_schema)
+        yield {'event': 'type', 'data': {'type': record_type}}
+
+        tags = self._get_tags(record_type, category_schema, user)
+        result = yield from self._stream_extraction(
+            record_type, combined_text, category_schema['record_field_specs'], tags
+        )
+
+        format_tags = self._get_new_tags(result, tags, category_schema['category_types'][record_type], user)
+        result['tags'] = format_tags
+
+        yield {'event': 'result', 'data': {
+            'type': record_type,
+            'content': result,
+            'raw_text': combined_text,
+            'category': category_schema['category_types'][record_type],
+        }}
+
+    def _stream_preprocess(self, raw_inputs: list):
+        """
+        在后台线程中预处理输入，语音识别的部分文本作为 text 事件实时产出，返回预处理后的文本
+
+        OCR/ASR 是阻塞调用，只能通过回调拿到中间结果，所以由后台线程执行、经队列交给当前生成器。
+        生成器被提前关闭（客户端断开）时设置 stop，后台线程在下一次回调时抛出 PreprocessCancelled 中止识别。
+        """
+        events = queue.Queue()
+        outcome = {}
+        stop = threading.Event()
+
+        def on_partial(text):
+            if stop.is_set():
+                raise PreprocessCancelled()
+            events.put(text)
+
+        def run():
+            try:
+                outcome['text'] = self.preprocessor.preprocess_inputs(raw_inputs, on_partial=on_partial)
+            except BaseException as e:
+                outcome['error'] = e
+            finally:
+                events.put(_PREPROCESS_DONE)
+
+        # 复制当前上下文，链路追踪的父 span 在线程中仍然有效
+        worker = threading.Thread(target=contextvars.copy_context().run, args=(run,), daemon=True)
+        worker.start()
+        try:
+            while True:
+                text = events.get()
+                if text is _PREPROCESS_DONE:
+                    break
+                yield {'event': 'text', 'data': {'partial_text': text}}
+        finally:
+            stop.set()
+        worker.join()
+
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['text']
+
     def _detect_record_type(self, text: str, category_schema: Dict[str, any]) -> str:
         """检测记录类型"""
-        try:
-            # 使用LLM进行精确类型检测
-            chain = self.chain_factory.create_type_detection_chain(record_types_description=category_schema['record_types_description'])
-            response = chain.invoke({"input": text})
-            # 大模型的类型检测结果
-            detected_type = response.content.strip().lower()
-            
-            if detected_type in category_schema['record_types']:
-                return detected_type
+        with stage_span('type_detection') as span:
+            try:
+                # 使用LLM进行精确类型检测
+                def build_chain(backend):
+                    span.set('backend', backend.name)
+                    return self.chain_factory.create_type_detection_chain(
+                        record_types_description=category_schema['record_types_description'], llm=backend.llm
+                    )
 
-            raise ValueError(f"类型检测失败: 大模型检测到的类型{detected_type}不在可选类型列表中")
+                response = self.chain_factory.router.invoke(
+                    TASK_CLASSIFICATION, build_chain, {"input": text},
+                    config={'callbacks': [TokenUsageHandler(span)]}
+                )
+                # 大模型的类型检测结果
+                detected_type = response.content.strip().lower()
+                
+                if detected_type in category_schema['record_types']:
+                    span.set('fallback', False)
+                    return detected_type
 
-            # 如果LLM检测失败，使用关键词检测
-            #return self.type_detector.detect_type(text)
-            
-        except Exception as e:
-            print(f"类型检测失败: {e}")
-            return self.type_detector.detect_type(text)
+                raise ValueError(f"类型检测失败: 大模型检测到的类型{detected_type}不在可选类型列表中")
+
+                # 如果LLM检测失败，使用关键词检测
+                #return self.type_detector.detect_type(text)
+                
+            except Exception as e:
+                print(f"类型检测失败: {e}")
+                span.set('fallback', True)
+                span.set('llm_unavailable', isinstance(e, LLMUnavailableError))
+                return self.type_detector.detect_category(text, category_schema['record_types'])
 
+    @traced('tag_lookup')
     def _get_tags(self, record_type: str, category_schema: Dict[str, any], user: User) -> list:
         """根据分类拿到tags"""
  
@@ -82,6 +186,7 @@ class LLMProcessor:
         else:
             return []
     
+    @traced('tag_upsert')
     def _get_new_tags(self, result: Dict[str, Any], tags: list, category_id: any, user: User) -> list:
         """
         从提取结果中获取新生成的tags
@@ -138,21 +243,89 @@ class LLMProcessor:
         Returns:
             提取到的结构化信息
         """
-        try:
-            chain = self.chain_factory.create_extraction_chain(record_type, record_field_specs, tags)
-            result = chain.invoke({"input": text})
-            return result.dict()
-        except Exception as e:
-            print(f"信息提取失败: {e}")
-            # 使用备用链
-            return ValueError(f"信息提取失败: {e}")
-            # return self._fallback_extraction(text)
+        with stage_span('extraction', record_type=record_type) as span:
+            try:
+                prompt_stats = {}
+
+                def build_chain(backend):
+                    span.set('backend', backend.name)
+                    return self.chain_factory.create_extraction_chain(
+                        record_type, record_field_specs, tags, text=text, prompt_stats=prompt_stats, llm=backend.llm
+                    )
+
+                result = self.chain_factory.router.invoke(
+                    TASK_EXTRACTION, build_chain, {"input": text},
+                    config={'callbacks': [TokenUsageHandler(span)]}
+                )
+                self._record_prompt_stats(span, prompt_stats)
+                return result.dict()
+            except Exception as e:
+                print(f"信息提取失败: {e}")
+                span.status = 'error'
+                span.set('error', str(e))
+                # 使用备用链
+                return ValueError(f"信息提取失败: {e}")
+                # return self._fallback_extraction(text)
     
+    def _stream_extraction(self, record_type: str, text: str, record_field_specs: Dict[str, any],
+                           tags: list) -> Iterator[Dict[str, Any]]:
+        """
+        流式提取结构化信息
+
+        边接收 token 边解析，每个字段结束即校验并产出 field 事件；
+        输出不是合法 JSON 时立即中断本次生成并重试。生成器的返回值为完整的提取结果。
+        """
+        max_retries = getattr(settings, 'LLM_STREAM_MAX_RETRIES', 1)
+        for attempt in range(max_retries + 1):
+            with stage_span('extraction', record_type=record_type, streaming=True, attempt=attempt) as span:
+                prompt_stats = {}
+                schema_class = record_field_specs[record_type]
+
+                def build_chain(backend):
+                    span.set('backend', backend.name)
+                    chain, _ = self.chain_factory.create_streaming_extraction_chain(
+                        record_type, record_field_specs, tags, text=text, prompt_stats=prompt_stats, llm=backend.llm
+                    )
+                    return chain
+
+                parser = IncrementalJSONParser()
+                start = time.perf_counter()
+                try:
+                    for chunk in self.chain_factory.router.stream(
+                        TASK_EXTRACTION, build_chain, {"input": text},
+                        config={'callbacks': [TokenUsageHandler(span)]}
+                    ):
+                        if 'first_token_ms' not in span.attributes:
+                            self._record_prompt_stats(span, prompt_stats)
+                            span.set('first_token_ms', round((time.perf_counter() - start) * 1000, 2))
+                        for name, value in parser.feed(chunk.content):
+                            try:
+                                value = validate_field(schema_class, name, value)
+                                yield {'event': 'field', 'data': {'name': name, 'value': value}}
+                            except ValueError as e:
+                                yield {'event': 'field_error', 'data': {'name': name, 'error': str(e)}}
+                    return schema_class.parse_obj(parser.close()).dict()
+                except (MalformedOutputError, ValueError) as e:
+                    # pydantic 的 ValidationError 也是 ValueError 的子类
+                    print(f"流式信息提取失败: {e}")
+                    span.status = 'error'
+                    span.set('error', str(e))
+                    if attempt >= max_retries:
+                        raise
+                    yield {'event': 'retry', 'data': {'attempt': attempt + 1, 'error': str(e)}}
+
+    def _record_prompt_stats(self, span, prompt_stats: dict):
+        for key, value in prompt_stats.items():
+            span.set(key, value)
+        if 'prompt_tokens_estimate' in prompt_stats:
+            PROMPT_TOKENS.labels(stage='extraction').observe(prompt_stats['prompt_tokens_estimate'])
+
     def _fallback_extraction(self, text: str) -> Dict[str, Any]:
         """备用信息提取方法"""
         try:
-            chain = self.chain_factory.create_fallback_chain()
-            response = chain.invoke({"input": text})
+            response = self.chain_factory.router.invoke(
+                TASK_EXTRACTION, lambda backend: self.chain_factory.create_fallback_chain(backend.llm), {"input": text}
+            )
             return {"extracted_info": response.content, "raw_text": text}
         except Exception as e:
             print(f"备用提取失败: {e}")
@@ -0,0 +1,12 @@
+from langchain.callbacks.base import BaseCallbackHandler
+
+
+class TokenUsageHandler(BaseCallbackHandler):
+    """把 LLM 返回的 token 用量写入当前阶段的 span"""
+
+    def __init__(self, span):
+        self.span = span
+
+    def on_llm_end(self, response, **kwargs):
+        usage = (response.llm_output or {}).get('token_usage') or {}
+        self.span.record_llm_usage(usage)
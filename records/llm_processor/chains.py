@@ -10,7 +10,10 @@ from langchain.output_parsers import (
 )
 import os
 from dotenv import load_dotenv
+from django.conf import settings
 from .schemas import SCHEMA_MAPPING, RecordType
+from .prompt_budget import ExtractionPromptBuilder
+from .router import TASK_CLASSIFICATION, TASK_EXTRACTION, get_router
 
 load_dotenv()
 
@@ -19,16 +22,14 @@ class LLMChainFactory:
     """LLM链工厂"""
 
     def __init__(self):
-        self.llm = ChatOpenAI(
-            model=os.getenv("OPENAI_MODEL", "deepseek-chat"),
-            base_url="https://api.deepseek.com/v1",
-            temperature=0.1,
-            api_key=os.getenv("OPENAI_API_KEY"),  # 显式指定API密钥
-            max_tokens=int(os.getenv("DEFAULT_MAX_TOKENS", 1500)),
-        )
+        # 按任务选择 LLM 后端，超时、熔断和对冲由各后端的网关处理
+        self.router = get_router()
+        self.prompt_builder = ExtractionPromptBuilder()
 
+    def _default_llm(self, task: str) -> ChatOpenAI:
+        return self.router.select(task).llm
 
-    def create_type_detection_chain(self, record_types_description: str):
+    def create_type_detection_chain(self, record_types_description: str, llm: ChatOpenAI = None):
 
         content = f"""你是一个智能类型分类器。请分析用户输入的内容，判断它属于哪种类型。可选的类型有：{record_types_description}。请只返回类型名称，不要返回其他内容。不要解释。"""
 
@@ -42,12 +43,13 @@ class LLMChainFactory:
             ]
         )
 
-        return prompt | self.llm
+        return prompt | (llm or self._default_llm(TASK_CLASSIFICATION))
 
-    def create_extraction_chain(
-        self, record_type: str, record_field_specs: dict[str, any], tags: list = []
+    def _build_extraction_prompt(
+        self, record_type: str, record_field_specs: dict[str, any], tags: list,
+        text: str, prompt_stats: dict = None
     ):
-        """创建信息提取链 - 优化版本"""
+        """构建信息提取的提示词，返回 (prompt, schema_class)"""
         schema_class = record_field_specs[record_type]
         schema_info = {}
         for field_name, field_info in schema_class.schema()["properties"].items():
@@ -55,30 +57,12 @@ class LLMChainFactory:
                 "type": field_info.get("type", "string"),
                 "description": field_info.get("description", "")
             }
-        parser = PydanticOutputParser(pydantic_object=schema_class)
-        # format_instructions = parser.get_format_instructions()
-        # 优化后  
-        simplified_instructions = "请输出JSON格式，包含所有字段。不存在的信息用null。"
-        # 优化标签提示 - 更简洁
-        tags_prompt = ""
-        if tags:
-            # 只显示标签名称，不显示描述（除非描述特别重要）
-            
-            tag_names = [ f'{tag.name}({tag.description})' for tag in tags]
-            tags_prompt = (
-                f"可用标签：{','.join(tag_names)}。选1-2个相关标签,如果可用标签都不相关,则生成1个新标签。"
-            )
-        else:
-            tags_prompt = "生成1个合适的新标签。"
-
-        # 优化系统消息 - 更简洁直接
-        system_message = SystemMessage(
-            content=f"""提取结构化信息并添加标签。
-    字段定义：{json.dumps(schema_info, ensure_ascii=False)}
-    {tags_prompt}
-    输出格式：{simplified_instructions}
-    只需返回JSON，不要解释。"""
-        )
+
+        content, stats = self.prompt_builder.build(schema_info, tags, text)
+        if prompt_stats is not None:
+            prompt_stats.update(stats)
+
+        system_message = SystemMessage(content=content)
 
         prompt = ChatPromptTemplate.from_messages(
             [
@@ -86,10 +70,39 @@ class LLMChainFactory:
                 HumanMessagePromptTemplate.from_template("输入：{input}"),
             ]
         )
+        return prompt, schema_class
 
-        return prompt | self.llm | parser
+    def create_extraction_chain(
+        self, record_type: str, record_field_specs: dict[str, any], tags: list = [],
+        text: str = "", prompt_stats: dict = None, llm: ChatOpenAI = None
+    ):
+        """
+        创建信息提取链
+
+        提示词超出 token 预算时只保留与 text 最相关的标签，
+        传入 prompt_stats 时会写入提示词大小等统计信息。
+        """
+        prompt, schema_class = self._build_extraction_prompt(
+            record_type, record_field_specs, tags, text, prompt_stats
+        )
+        parser = PydanticOutputParser(pydantic_object=schema_class)
+        return prompt | (llm or self._default_llm(TASK_EXTRACTION)) | parser
+
+    def create_streaming_extraction_chain(
+        self, record_type: str, record_field_specs: dict[str, any], tags: list = [],
+        text: str = "", prompt_stats: dict = None, llm: ChatOpenAI = None
+    ):
+        """
+        创建流式信息提取链
+
+        不挂输出解析器，由调用方增量解析 token，返回 (chain, schema_class)。
+        """
+        prompt, schema_class = self._build_extraction_prompt(
+            record_type, record_field_specs, tags, text, prompt_stats
+        )
+        return prompt | (llm or self._default_llm(TASK_EXTRACTION)), schema_class
 
-    def create_fallback_chain(self):
+    def create_fallback_chain(self, llm: ChatOpenAI = None):
         """创建备用链（当类型不确定时）"""
         system_message = SystemMessage(
             content="""你是一个通用信息提取器。请从用户输入中提取有用信息并组织成结构化数据。
@@ -103,4 +116,4 @@ class LLMChainFactory:
             ]
         )
 
-        return prompt | self.llm
+        return prompt | (llm or self._default_llm(TASK_EXTRACTION))
@@ -0,0 +1,292 @@
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from typing import Any, Iterator, Optional
+
+from django.conf import settings
+
+from common.utils.instrumentation import (
+    LLM_CIRCUIT_STATE,
+    LLM_HEDGED_REQUESTS,
+    LLM_REQUEST_LATENCY,
+    LLM_REQUESTS,
+)
+
+
+class LLMUnavailableError(Exception):
+    """LLM 服务当前不可用（熔断或超时）"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """熔断器打开，请求被直接拒绝"""
+
+
+class LLMTimeoutError(LLMUnavailableError):
+    """调用超过截止时间"""
+
+
+@lru_cache(maxsize=1)
+def _transport_errors() -> tuple:
+    """连接、超时类异常：标准库、httpx 与 openai SDK（APIConnectionError 包含 APITimeoutError）"""
+    errors = [ConnectionError, TimeoutError]
+    try:
+        import httpx
+        errors.append(httpx.TransportError)
+    except ImportError:
+        pass
+    try:
+        import openai
+        errors.extend([openai.APIConnectionError, openai.InternalServerError])
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """
+    异常是否说明 LLM 服务本身出了问题
+
+    连接失败、超时和 HTTP 5xx 计入熔断；模型输出解析失败（OutputParserException、pydantic 校验错误）、
+    4xx 等请求或输出内容的问题说明服务可以正常响应，不计入熔断。
+    """
+    if isinstance(error, _transport_errors()):
+        return True
+    status_code = getattr(error, 'status_code', None)
+    return isinstance(status_code, int) and status_code >= 500
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    - closed：正常放行，连续失败达到阈值后打开
+    - open：直接拒绝，经过恢复时间后进入 half_open
+    - half_open：只放行一个探测请求，成功则关闭，失败则重新打开
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str, failure_threshold: int, recovery_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.lock = threading.Lock()
+        self._export()
+
+    def _export(self):
+        LLM_CIRCUIT_STATE.labels(provider=self.name).set(self.STATE_VALUES[self.state])
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_seconds:
+                self.state = self.HALF_OPEN
+                self.probing = False
+                self._export()
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def available(self) -> bool:
+        if self.state != self.OPEN:
+            return True
+        return time.monotonic() - self.opened_at >= self.recovery_seconds
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.probing = False
+            if self.state != self.CLOSED:
+                self.state = self.CLOSED
+                self._export()
+
+    def release_probe(self):
+        """不计成功或失败的调用结束时，释放半开状态下的探测名额"""
+        with self.lock:
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._export()
+
+
+class LLMGateway:
+    """
+    LLM 调用网关
+
+    所有对同一个 LLM 服务的调用都经过这里：
+    - 每次调用有截止时间，超时立即返回，不让 worker 被挂住
+    - 连续失败后熔断，熔断期间直接拒绝，由调用方走规则兜底
+    - 可选对冲请求：等待超过历史 p95 仍未返回时再发一次相同请求，取先返回的结果
+    - 导出请求结果、耗时和熔断状态指标
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.deadline = getattr(settings, 'LLM_CALL_DEADLINE', 45)
+        self.hedge_enabled = getattr(settings, 'LLM_HEDGE_ENABLED', False)
+        self.hedge_percentile = getattr(settings, 'LLM_HEDGE_PERCENTILE', 95)
+        self.hedge_min_samples = getattr(settings, 'LLM_HEDGE_MIN_SAMPLES', 20)
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold=getattr(settings, 'LLM_CIRCUIT_FAILURE_THRESHOLD', 5),
+            recovery_seconds=getattr(settings, 'LLM_CIRCUIT_RECOVERY_SECONDS', 30),
+        )
+        # 最近成功调用的耗时（秒），用于计算对冲延迟
+        self.latencies = deque(maxlen=200)
+        self.lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        """未熔断，或熔断已到恢复时间、可以放行探测请求"""
+        return self.breaker.available()
+
+    def recent_latency(self, window: int = 20) -> Optional[float]:
+        """最近 window 次成功调用的平均耗时，没有数据时返回 None"""
+        with self.lock:
+            samples = list(self.latencies)[-window:]
+        return sum(samples) / len(samples) if samples else None
+
+    def latency_percentile(self, pct: float) -> Optional[float]:
+        """最近成功调用耗时的百分位数，样本不足时返回 None"""
+        with self.lock:
+            samples = sorted(self.latencies)
+        if len(samples) < self.hedge_min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+    def _record(self, outcome: str, duration: float = None):
+        LLM_REQUESTS.labels(provider=self.name, outcome=outcome).inc()
+        if duration is not None:
+            LLM_REQUEST_LATENCY.labels(provider=self.name).observe(duration)
+            if outcome == 'success':
+                with self.lock:
+                    self.latencies.append(duration)
+        if outcome == 'success':
+            self.breaker.record_success()
+        elif outcome in ('error', 'timeout'):
+            self.breaker.record_failure()
+        elif outcome == 'invalid':
+            self.breaker.release_probe()
+
+    def _record_exception(self, error: BaseException, duration: float):
+        """服务故障记为 error 并计入熔断，解析失败等其他异常记为 invalid，不影响熔断"""
+        self._record('error' if is_provider_failure(error) else 'invalid', duration)
+
+    def _acquire(self):
+        if not self.breaker.allow():
+            self._record('rejected')
+            raise CircuitOpenError(f"LLM服务{self.name}熔断中，暂停调用")
+
+    def invoke(self, runnable, input: Any, config: dict = None, deadline: float = None) -> Any:
+        """在截止时间内调用 runnable.invoke，必要时发出对冲请求"""
+        self._acquire()
+        deadline = deadline or self.deadline
+        start = time.perf_counter()
+
+        def call():
+            return runnable.invoke(input, config=config)
+
+        futures = [_executor().submit(call)]
+        hedge_delay = self.latency_percentile(self.hedge_percentile) if self.hedge_enabled else None
+        if hedge_delay is not None and hedge_delay < deadline:
+            try:
+                result = futures[0].result(timeout=hedge_delay)
+                self._record('success', time.perf_counter() - start)
+                return result
+            except FutureTimeoutError:
+                futures.append(_executor().submit(call))
+                LLM_HEDGED_REQUESTS.labels(provider=self.name).inc()
+            except Exception as e:
+                self._record_exception(e, time.perf_counter() - start)
+                raise
+
+        remaining = deadline - (time.perf_counter() - start)
+        last_error = None
+        try:
+            # 取第一个成功的结果；落后的请求不会被取消，其结果直接丢弃
+            for future in as_completed(futures, timeout=max(remaining, 0)):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                self._record('success', time.perf_counter() - start)
+                return result
+        except FutureTimeoutError:
+            self._record('timeout', time.perf_counter() - start)
+            raise LLMTimeoutError(f"LLM服务{self.name}调用超过{deadline}秒")
+
+        self._record_exception(last_error, time.perf_counter() - start)
+        raise last_error
+
+    def stream(self, runnable, input: Any, config: dict = None, deadline: float = None) -> Iterator[Any]:
+        """
+        流式调用 runnable.stream
+
+        流式请求不做对冲；单次读取的超时由 HTTP 客户端控制，这里在每个分片之间检查总截止时间。
+        """
+        self._acquire()
+        deadline = deadline or self.deadline
+        start = time.perf_counter()
+        try:
+            for chunk in runnable.stream(input, config=config):
+                if time.perf_counter() - start > deadline:
+                    self._record('timeout', time.perf_counter() - start)
+                    raise LLMTimeoutError(f"LLM服务{self.name}流式调用超过{deadline}秒")
+                yield chunk
+        except LLMTimeoutError:
+            raise
+        except GeneratorExit:
+            # 客户端断开，不计入成功或失败，但要释放半开状态下的探测名额
+            self.breaker.release_probe()
+            raise
+        except Exception as e:
+            self._record_exception(e, time.perf_counter() - start)
+            raise
+        self._record('success', time.perf_counter() - start)
+
+
+_executor_instance = None
+_gateways = {}
+_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    """执行 LLM 调用的线程池，截止时间和对冲都依赖它"""
+    global _executor_instance
+    if _executor_instance is None:
+        with _lock:
+            if _executor_instance is None:
+                _executor_instance = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'LLM_MAX_CONCURRENCY', 32),
+                    thread_name_prefix='llm-gateway',
+                )
+    return _executor_instance
+
+
+def get_gateway(name: str) -> LLMGateway:
+    """按服务名获取进程内共享的网关，熔断状态和耗时统计在同一进程的请求之间共享"""
+    gateway = _gateways.get(name)
+    if gateway is None:
+        with _lock:
+            gateway = _gateways.get(name)
+            if gateway is None:
+                gateway = _gateways[name] = LLMGateway(name)
+    return gateway
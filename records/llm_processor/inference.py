@@ -0,0 +1,195 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from django.conf import settings
+
+from common.ml_models.load_local_model import load_local_model
+from common.ml_models.registry import model_registry
+from .image_normalizer import ImageNormalizer
+from .transcriber import AudioTranscriber
+
+logger = logging.getLogger(__name__)
+
+# 每个进程只持有一份推理引擎
+_engine = None
+
+WHISPER_MODEL_NAME = 'faster-whisper-small'
+
+
+def _load_rapid_ocr():
+    from rapidocr import RapidOCR
+    return RapidOCR()
+
+
+def _load_whisper():
+    from faster_whisper import WhisperModel
+    return WhisperModel(
+        load_local_model(WHISPER_MODEL_NAME).load_model(),
+        device="cpu",
+        compute_type="int8",
+        cpu_threads=getattr(settings, 'INFERENCE_CPU_THREADS', 0),
+    )
+
+
+def _load_batched_whisper():
+    from faster_whisper import BatchedInferencePipeline
+    return BatchedInferencePipeline(model=model_registry.get('whisper'))
+
+
+def _load_opencc_t2s():
+    from opencc import OpenCC
+    return OpenCC('t2s')
+
+
+model_registry.register('rapidocr', _load_rapid_ocr)
+model_registry.register('whisper', _load_whisper)
+model_registry.register('whisper_batched', _load_batched_whisper)
+model_registry.register('opencc_t2s', _load_opencc_t2s)
+
+
+class InferenceEngine:
+    """
+    本地推理引擎，持有OCR与ASR模型
+
+    一个进程一份实例：web 进程在 local 模式下使用，
+    inference 队列的 worker 进程也通过它执行批量任务。
+    模型通过 model_registry 在第一次识别时才加载。
+    """
+
+    def __init__(self):
+        # OCR前的图片归一化（EXIF旋转、缩放、灰度）
+        self.image_normalizer = ImageNormalizer()
+        self._transcriber = None
+        # 最近一次图片识别的耗时指标
+        self.last_image_metrics = {}
+
+    @property
+    def rapid_ocr(self):
+        return model_registry.get('rapidocr')
+
+    @property
+    def whisper_model(self):
+        return model_registry.get('whisper')
+
+    @property
+    def batched_whisper(self):
+        # 批量解码管线，VAD切分后的语音片段按批送入模型
+        return model_registry.get('whisper_batched')
+
+    @property
+    def transcriber(self) -> AudioTranscriber:
+        # 语音转写引擎（VAD、分档解码、长音频分块并行）
+        if self._transcriber is None:
+            self._transcriber = AudioTranscriber(
+                self.whisper_model,
+                load_local_model(WHISPER_MODEL_NAME).load_model(),
+            )
+        return self._transcriber
+
+    def ocr(self, file_path: str) -> List[str]:
+        """识别单张图片，返回文本行列表"""
+        image, metrics = self.image_normalizer.normalize(file_path)
+        return self._recognize(image, metrics)
+
+    def ocr_batch(self, file_paths: List[str]) -> List[object]:
+        """
+        批量识别图片
+
+        图片解码/缩放在线程池中预先完成（Pillow 解码时释放 GIL），与模型推理重叠。
+        单张失败不影响其他图片，失败项以异常对象返回。
+        """
+        def normalize(file_path):
+            try:
+                return self.image_normalizer.normalize(file_path)
+            except Exception as e:
+                return e
+
+        results = []
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            for normalized in pool.map(normalize, file_paths):
+                if isinstance(normalized, Exception):
+                    results.append(normalized)
+                    continue
+                try:
+                    results.append(self._recognize(*normalized))
+                except Exception as e:
+                    results.append(e)
+        return results
+
+    def _recognize(self, image, metrics: dict) -> List[str]:
+        ocr_start = time.perf_counter()
+        result = self.rapid_ocr(image)
+        metrics['ocr_ms'] = round((time.perf_counter() - ocr_start) * 1000, 2)
+        self.last_image_metrics = metrics
+        logger.info(f"OCR图片预处理: {metrics}")
+
+        if not result:
+            return []
+        if hasattr(result, 'txts') and result.txts:
+            return list(result.txts)
+        # 作为后备方案，尝试将结果转换为字符串
+        return [str(result)]
+
+    def transcribe(self, file_path: str, on_partial: Optional[Callable[[str], None]] = None) -> str:
+        """转写单段音频"""
+        return self.transcriber.transcribe(file_path, on_partial=on_partial)
+
+    def transcribe_batch(self, file_paths: List[str]) -> List[object]:
+        """
+        批量转写音频
+
+        与单段转写走同一个 AudioTranscriber（VAD、按时长分档的 beam_size、长音频按停顿分块），
+        未分块的音频的语音片段按 ASR_BATCH_SIZE 成批解码，保证 remote 模式与 local 模式的结果一致。
+        单段失败不影响其他音频，失败项以异常对象返回。
+        """
+        batch_size = getattr(settings, 'ASR_BATCH_SIZE', 8)
+        results = []
+        for file_path in file_paths:
+            try:
+                results.append(self.transcriber.transcribe(
+                    file_path, batched_model=self.batched_whisper, batch_size=batch_size
+                ))
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+class InferenceClient:
+    """
+    推理服务客户端
+
+    把OCR/ASR任务投递到独立的 inference 队列，由专门的 worker 进程执行，
+    web 进程不再加载模型。文件需位于 worker 可访问的同一存储上。
+    """
+
+    def __init__(self, timeout: int = None):
+        self.timeout = timeout if timeout is not None else getattr(settings, 'INFERENCE_TIMEOUT', 300)
+
+    def ocr(self, file_path: str) -> List[str]:
+        from ..tasks import ocr_image
+        return ocr_image.delay(file_path).get(timeout=self.timeout, disable_sync_subtasks=False)
+
+    def transcribe(self, file_path: str, on_partial: Optional[Callable[[str], None]] = None) -> str:
+        from ..tasks import transcribe_audio
+        text = transcribe_audio.delay(file_path).get(timeout=self.timeout, disable_sync_subtasks=False)
+        # 远程转写一次性返回全文
+        if on_partial:
+            on_partial(text)
+        return text
+
+
+def get_engine() -> InferenceEngine:
+    """获取当前进程的推理引擎（懒加载）"""
+    global _engine
+    if _engine is None:
+        _engine = InferenceEngine()
+    return _engine
+
+
+def get_inference_backend():
+    """根据 INFERENCE_MODE 返回本地引擎或远程推理客户端"""
+    if getattr(settings, 'INFERENCE_MODE', 'local') == 'remote':
+        return InferenceClient()
+    return get_engine()
@@ -56,4 +56,20 @@ class TypeDetector:
             if any(keyword in text_lower for keyword in keywords):
                 return record_type
         
-        return RecordType.NOTE  # 默认类型
\ No newline at end of file
+        return RecordType.NOTE  # 默认类型
+
+    def detect_category(self, text: str, record_types: list) -> str:
+        """
+        在用户的分类中做规则兜底（LLM 不可用时使用）
+
+        优先匹配文本中出现的分类名，其次用关键词检测出的内置类型，都不命中时返回第一个分类。
+        """
+        for name in record_types:
+            if name and name.lower() in text.lower():
+                return name
+
+        detected = self.detect_type(text).value
+        if detected in record_types:
+            return detected
+
+        return record_types[0] if record_types else detected
\ No newline at end of file
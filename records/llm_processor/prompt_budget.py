@@ -0,0 +1,163 @@
+import json
+import math
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+
+# 系统自动创建标签的占位描述，不携带语义，拼提示词时省略
+PLACEHOLDER_TAG_DESCRIPTION = '暂无描述,按语义理解'
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """tiktoken 可用时使用 cl100k_base 近似计数，否则返回 None"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding('cl100k_base')
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    估算文本的 token 数
+
+    没有 tiktoken 时按经验值估算：中日韩字符每字约 1 个 token，其余字符约 4 个一个 token。
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    cjk = sum(1 for ch in text if '一' <= ch <= '鿿')
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def _ngrams(text: str) -> Counter:
+    """字符 unigram + bigram，中文不分词也能得到可用的相似度"""
+    text = ''.join(text.lower().split())
+    grams = Counter(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+class TagIndex:
+    """
+    标签的本地相似度索引
+
+    以标签名称和描述的字符 n-gram 构建 TF-IDF 向量，按与输入文本的余弦相似度排序。
+    """
+
+    def __init__(self, tags: list):
+        self.tags = list(tags)
+        docs = [_ngrams(f'{tag.name} {self._description(tag)}') for tag in self.tags]
+        document_frequency = Counter()
+        for doc in docs:
+            document_frequency.update(doc.keys())
+        total = len(docs) + 1
+        self.idf = {gram: math.log(total / (count + 1)) + 1 for gram, count in document_frequency.items()}
+        self.vectors = [self._weigh(doc) for doc in docs]
+
+    @staticmethod
+    def _description(tag) -> str:
+        description = tag.description or ''
+        return '' if description == PLACEHOLDER_TAG_DESCRIPTION else description
+
+    def _weigh(self, grams: Counter) -> Dict[str, float]:
+        vector = {gram: count * self.idf.get(gram, 0.0) for gram, count in grams.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {gram: v / norm for gram, v in vector.items()}
+
+    def top_k(self, text: str, k: int) -> list:
+        """返回与文本最相关的至多 k 个标签，按相关度从高到低，完全不相关的标签不返回"""
+        query = self._weigh(_ngrams(text))
+        scored = []
+        for position, vector in enumerate(self.vectors):
+            score = sum(weight * vector.get(gram, 0.0) for gram, weight in query.items())
+            if score > 0:
+                scored.append((score, position))
+        # 相关度相同按原顺序，保证结果稳定
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [self.tags[position] for _, position in scored[:k]]
+
+
+class ExtractionPromptBuilder:
+    """
+    信息提取的系统提示词构建器
+
+    完整提示词超出 token 预算时，只保留与输入最相关的 top-K 个标签，
+    并在预算内尽可能多地放入标签。标签列表至少保留 tag_min_tokens 的预算，
+    输入文本很长（长录音、长图片识别结果）时仍会提供最相关的已有标签，而不是让模型新建标签。
+    """
+
+    def __init__(self, max_tokens: int = None, top_k: int = None, tag_min_tokens: int = None):
+        self.max_tokens = max_tokens or getattr(settings, 'EXTRACTION_PROMPT_MAX_TOKENS', 1200)
+        self.top_k = top_k or getattr(settings, 'EXTRACTION_TAG_TOP_K', 30)
+        self.tag_min_tokens = tag_min_tokens or getattr(settings, 'EXTRACTION_TAG_MIN_TOKENS', 150)
+
+    @staticmethod
+    def format_tag(tag) -> str:
+        description = TagIndex._description(tag)
+        return f'{tag.name}({description})' if description else tag.name
+
+    @staticmethod
+    def render(schema_info: dict, tag_labels: List[str]) -> str:
+        if tag_labels:
+            tags_prompt = (
+                f"可用标签：{','.join(tag_labels)}。选1-2个相关标签,如果可用标签都不相关,则生成1个新标签。"
+            )
+        else:
+            tags_prompt = "生成1个合适的新标签。"
+
+        simplified_instructions = "请输出JSON格式，包含所有字段。不存在的信息用null。"
+        return f"""提取结构化信息并添加标签。
+    字段定义：{json.dumps(schema_info, ensure_ascii=False)}
+    {tags_prompt}
+    输出格式：{simplified_instructions}
+    只需返回JSON，不要解释。"""
+
+    def build(self, schema_info: dict, tags: list, text: str = '') -> Tuple[str, dict]:
+        """
+        构建系统提示词
+
+        Returns:
+            (提示词, 统计信息)，统计信息包含提示词 token 数、标签总数和实际放入的标签数
+        """
+        tags = list(tags or [])
+        labels = [self.format_tag(tag) for tag in tags]
+        content = self.render(schema_info, labels)
+        tokens = count_tokens(content) + count_tokens(text)
+        stats = {
+            'prompt_tokens_estimate': tokens,
+            'prompt_budget': self.max_tokens,
+            'tags_total': len(tags),
+            'tags_included': len(tags),
+            'tags_trimmed': False,
+        }
+        if tokens <= self.max_tokens or not tags:
+            return content, stats
+
+        # 超出预算：按相关度取 top-K，再从高到低放入直到预算用完
+        candidates = TagIndex(tags).top_k(text, self.top_k)
+        base_tokens = count_tokens(self.render(schema_info, [''])) + count_tokens(text)
+        # 输入文本占满预算时，标签列表仍使用单独保留的预算
+        remaining = max(self.max_tokens - base_tokens, self.tag_min_tokens)
+        selected = []
+        for tag in candidates:
+            label = self.format_tag(tag)
+            # 每个标签额外占用一个逗号分隔符
+            cost = count_tokens(label) + 1
+            if cost > remaining:
+                break
+            selected.append(label)
+            remaining -= cost
+
+        content = self.render(schema_info, selected)
+        stats.update({
+            'prompt_tokens_estimate': count_tokens(content) + count_tokens(text),
+            'tags_included': len(selected),
+            'tags_trimmed': True,
+        })
+        return content, stats
@@ -0,0 +1,163 @@
+import os
+import random
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Iterator, List
+
+from django.conf import settings
+from langchain_openai import ChatOpenAI
+
+from .gateway import LLMGateway, LLMUnavailableError, get_gateway
+
+# 路由的任务类型
+TASK_CLASSIFICATION = 'classification'
+TASK_EXTRACTION = 'extraction'
+
+# 还没有耗时数据的后端按这个耗时（秒）参与选择，保证新后端能分到流量
+DEFAULT_LATENCY = 1.0
+
+
+@lru_cache(maxsize=1)
+def failover_errors() -> tuple:
+    """
+    换下一个后端重试的异常
+
+    熔断/超时，以及连接失败和服务返回的 API 错误（openai.APIError 包含 APIConnectionError、
+    5xx、鉴权失败等状态码错误）；模型输出解析失败等与后端无关的错误不切换。
+    """
+    errors = [LLMUnavailableError, ConnectionError, TimeoutError]
+    try:
+        import httpx
+        errors.append(httpx.TransportError)
+    except ImportError:
+        pass
+    try:
+        import openai
+        errors.append(openai.APIError)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+class LLMBackend:
+    """一个 OpenAI 兼容的 LLM 后端（地址 + 模型），拥有独立的网关和熔断状态"""
+
+    def __init__(self, name: str, base_url: str, model: str, api_key: str = None,
+                 api_key_env: str = 'OPENAI_API_KEY', weight: float = 1.0, tasks: List[str] = None,
+                 max_tokens: int = None, temperature: float = 0.1):
+        self.name = name
+        self.base_url = base_url
+        self.model = model
+        self.api_key = api_key or os.getenv(api_key_env)
+        self.weight = float(weight)
+        self.tasks = tasks or [TASK_CLASSIFICATION, TASK_EXTRACTION]
+        self.max_tokens = max_tokens or int(os.getenv("DEFAULT_MAX_TOKENS", 1500))
+        self.temperature = temperature
+        self._llm = None
+        self._lock = threading.Lock()
+
+    @property
+    def llm(self) -> ChatOpenAI:
+        if self._llm is None:
+            with self._lock:
+                if self._llm is None:
+                    self._llm = ChatOpenAI(
+                        model=self.model,
+                        base_url=self.base_url,
+                        temperature=self.temperature,
+                        api_key=self.api_key,
+                        max_tokens=self.max_tokens,
+                        timeout=getattr(settings, "LLM_REQUEST_TIMEOUT", 20),
+                        max_retries=getattr(settings, "LLM_MAX_RETRIES", 1),
+                    )
+        return self._llm
+
+    @property
+    def gateway(self) -> LLMGateway:
+        return get_gateway(self.name)
+
+    def score(self) -> float:
+        """选择权重：配置权重 / 最近平均耗时，越快、权重越高的后端越容易被选中"""
+        latency = self.gateway.recent_latency() or DEFAULT_LATENCY
+        return self.weight / max(latency, 0.01)
+
+
+class LLMRouter:
+    """
+    LLM 后端路由
+
+    - 按任务类型选择后端：分类可以交给便宜、快的小模型，提取交给更强的模型
+    - 同一任务有多个后端时按 权重/最近耗时 加权随机负载均衡
+    - 熔断中的后端排在最后；调用失败（熔断、超时、连接失败、API 错误）时自动换下一个后端
+    """
+
+    def __init__(self, backends: List[LLMBackend]):
+        if not backends:
+            raise ValueError("至少需要配置一个LLM后端")
+        self.backends = backends
+
+    def candidates(self, task: str) -> List[LLMBackend]:
+        """返回承担该任务的后端，按本次的选择顺序排列"""
+        backends = [b for b in self.backends if task in b.tasks] or self.backends
+        available = [b for b in backends if b.gateway.available]
+        unavailable = [b for b in backends if not b.gateway.available]
+
+        # 加权随机排序（Efraimidis-Spirakis）：key = u^(1/w)，按 key 从大到小
+        ordered = sorted(
+            available,
+            key=lambda b: random.random() ** (1.0 / max(b.score(), 1e-6)),
+            reverse=True,
+        )
+        return ordered + unavailable
+
+    def select(self, task: str) -> LLMBackend:
+        return self.candidates(task)[0]
+
+    def invoke(self, task: str, build_chain: Callable[[LLMBackend], Any], input: Any,
+               config: dict = None) -> Any:
+        """
+        选择后端并调用
+
+        build_chain 根据后端构建链；后端不可用或返回 API 错误时换下一个，全部失败时抛出最后一个错误。
+        """
+        last_error = None
+        for backend in self.candidates(task):
+            try:
+                return backend.gateway.invoke(build_chain(backend), input, config=config)
+            except failover_errors() as e:
+                print(f"LLM后端{backend.name}不可用: {e}")
+                last_error = e
+        raise last_error
+
+    def stream(self, task: str, build_chain: Callable[[LLMBackend], Any], input: Any,
+               config: dict = None) -> Iterator[Any]:
+        """流式调用；只在开始输出前因后端不可用或 API 错误换后端，已经开始输出的流不会切换"""
+        last_error = None
+        for backend in self.candidates(task):
+            try:
+                stream = backend.gateway.stream(build_chain(backend), input, config=config)
+                first = next(stream)
+            except StopIteration:
+                return
+            except failover_errors() as e:
+                print(f"LLM后端{backend.name}不可用: {e}")
+                last_error = e
+                continue
+            yield first
+            yield from stream
+            return
+        raise last_error
+
+
+_router = None
+_lock = threading.Lock()
+
+
+def get_router() -> LLMRouter:
+    """按 settings.LLM_BACKENDS 构建进程内共享的路由"""
+    global _router
+    if _router is None:
+        with _lock:
+            if _router is None:
+                _router = LLMRouter([LLMBackend(**config) for config in settings.LLM_BACKENDS])
+    return _router
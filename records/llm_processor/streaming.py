@@ -0,0 +1,122 @@
+import json
+from typing import Any, List, Tuple
+
+# 开始的 '{' 之前最多允许的字符数（如 ```json 代码块标记），超过即视为输出格式错误
+MAX_PREAMBLE_CHARS = 64
+
+
+class MalformedOutputError(ValueError):
+    """LLM 输出不是合法的 JSON 对象"""
+
+
+class IncrementalJSONParser:
+    """
+    增量 JSON 解析器
+
+    逐块喂入 LLM 的流式输出，顶层对象的每个字段一结束就立即解析并返回，
+    不必等待整个 JSON 输出完毕；格式错误会在出错的字段处立刻抛出 MalformedOutputError。
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.position = 0
+        self.started = False
+        self.done = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.member_start = 0
+        self.members = 0
+        self.result = {}
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """喂入一段文本，返回本次新完成的 (字段名, 值) 列表"""
+        if self.done or not chunk:
+            return []
+
+        self.buffer += chunk
+        completed = []
+        while self.position < len(self.buffer):
+            index = self.position
+            ch = self.buffer[index]
+            self.position += 1
+
+            if not self.started:
+                if ch == '{':
+                    self.started = True
+                    self.depth = 1
+                    self.member_start = self.position
+                elif index >= MAX_PREAMBLE_CHARS:
+                    raise MalformedOutputError(f"输出不是JSON对象: {self.buffer[:MAX_PREAMBLE_CHARS]}")
+                continue
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                continue
+
+            if ch == '"':
+                self.in_string = True
+            elif ch in '{[':
+                self.depth += 1
+            elif ch in '}]':
+                self.depth -= 1
+                if self.depth == 0:
+                    if ch != '}':
+                        raise MalformedOutputError(f"JSON对象以{ch}结束")
+                    completed.extend(self._complete_member(index, closing=True))
+                    self.done = True
+                    break
+            elif ch == ',' and self.depth == 1:
+                completed.extend(self._complete_member(index))
+                self.member_start = self.position
+        return completed
+
+    def _complete_member(self, end: int, closing: bool = False) -> List[Tuple[str, Any]]:
+        fragment = self.buffer[self.member_start:end].strip()
+        if not fragment:
+            # 只有空对象 {} 的右括号前允许为空，{"a":1,} 和 {,"a":1} 都是格式错误
+            if closing and not self.members:
+                return []
+            raise MalformedOutputError(f"字段为空: {self.buffer[:end + 1][-100:]}")
+        try:
+            member = json.loads('{' + fragment + '}')
+        except json.JSONDecodeError as e:
+            raise MalformedOutputError(f"字段解析失败: {fragment[:100]} ({e})")
+        self.members += 1
+        self.result.update(member)
+        return list(member.items())
+
+    def close(self) -> dict:
+        """输出结束，返回完整对象；输出被截断时抛出 MalformedOutputError"""
+        if not self.done:
+            raise MalformedOutputError("JSON输出不完整")
+        return self.result
+
+
+def validate_field(schema_class, name: str, value: Any) -> Any:
+    """
+    按动态 schema 校验单个字段，返回转换后的值
+
+    schema 中不存在的字段原样返回；校验失败抛出 ValueError。
+    """
+    # pydantic v2
+    model_fields = getattr(schema_class, 'model_fields', None)
+    if model_fields is not None:
+        if name not in model_fields:
+            return value
+        from pydantic import TypeAdapter
+        return TypeAdapter(model_fields[name].annotation).validate_python(value)
+
+    # pydantic v1
+    field = schema_class.__fields__.get(name)
+    if field is None:
+        return value
+    validated, errors = field.validate(value, {}, loc=name)
+    if errors:
+        raise ValueError(f"字段{name}校验失败: {errors}")
+    return validated
@@ -0,0 +1,143 @@
+import time
+import logging
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from django.conf import settings
+
+from common.ml_models.whisper_pool import get_executor, transcribe_chunk
+
+logger = logging.getLogger(__name__)
+
+# faster-whisper 要求的采样率
+SAMPLE_RATE = 16000
+
+# 默认的按时长分档解码参数，beam_size=1 即贪心解码
+DEFAULT_DECODE_TIERS = [
+    {'max_seconds': 30, 'beam_size': 5},
+    {'max_seconds': 180, 'beam_size': 2},
+    {'max_seconds': None, 'beam_size': 1},
+]
+
+
+def split_audio(audio, chunk_seconds: float, search_seconds: float = 1.0) -> list:
+    """
+    将长音频切成若干块
+
+    在每个目标切点前后 search_seconds 内找能量最低的 20ms 帧作为切点，
+    尽量落在停顿处，避免把一个字切成两半。
+    """
+    import numpy as np
+
+    chunk = int(chunk_seconds * SAMPLE_RATE)
+    search = int(search_seconds * SAMPLE_RATE)
+    frame = int(0.02 * SAMPLE_RATE)
+    total = len(audio)
+
+    chunks = []
+    start = 0
+    while total - start > chunk:
+        target = start + chunk
+        low = max(start + frame, target - search)
+        high = min(total - frame, target + search)
+        window = audio[low:high]
+        frames = len(window) // frame
+        if frames > 0:
+            energy = np.square(window[:frames * frame].reshape(frames, frame)).mean(axis=1)
+            cut = low + int(np.argmin(energy)) * frame
+        else:
+            cut = target
+        chunks.append(audio[start:cut])
+        start = cut
+    chunks.append(audio[start:])
+    return chunks
+
+
+class AudioTranscriber:
+    """
+    语音转写引擎
+
+    - 开启 VAD 过滤，跳过静音段
+    - 按音频时长分档选择 beam_size，长音频使用贪心解码
+    - 超过阈值的长音频分块后交给进程池并行转写
+    - 以生成器形式按顺序产出文本，调用方可以边识别边消费
+    """
+
+    def __init__(self, model, model_path: str = None):
+        self.model = model  # 当前进程内的模型，短音频直接使用
+        self.model_path = model_path  # 进程池子进程加载模型所用的路径
+        self.language = getattr(settings, 'ASR_LANGUAGE', 'zh')
+        self.vad_filter = getattr(settings, 'ASR_VAD_FILTER', True)
+        self.decode_tiers = getattr(settings, 'ASR_DECODE_TIERS', DEFAULT_DECODE_TIERS)
+        self.chunk_seconds = getattr(settings, 'ASR_CHUNK_SECONDS', 60)
+        self.parallel_min_seconds = getattr(settings, 'ASR_PARALLEL_MIN_SECONDS', 180)
+        self.workers = getattr(settings, 'ASR_WORKERS', 2)
+        # 最近一次转写的指标
+        self.last_metrics = {}
+
+    def decode_options(self, duration: float) -> Dict[str, Any]:
+        """根据音频时长选择解码参数"""
+        beam_size = 1
+        for tier in self.decode_tiers:
+            if tier['max_seconds'] is None or duration <= tier['max_seconds']:
+                beam_size = tier['beam_size']
+                break
+        return {
+            'language': self.language,
+            'beam_size': beam_size,
+            'vad_filter': self.vad_filter,
+        }
+
+    def transcribe_stream(self, file_path: str, batched_model=None, batch_size: int = 8) -> Iterator[str]:
+        """
+        流式转写，按时间顺序逐段产出文本
+
+        batched_model 为 BatchedInferencePipeline 时，未分块的音频由它按 batch_size 成批解码，
+        VAD、分档的 beam_size 与长音频分块的处理方式不变。
+        """
+        from faster_whisper import decode_audio
+
+        start = time.perf_counter()
+        audio = decode_audio(file_path, sampling_rate=SAMPLE_RATE)
+        duration = len(audio) / SAMPLE_RATE
+        options = self.decode_options(duration)
+        self.last_metrics = {
+            'duration_s': round(duration, 2),
+            'beam_size': options['beam_size'],
+            'chunks': 1,
+            'decode_ms': round((time.perf_counter() - start) * 1000, 2),
+        }
+
+        if duration <= self.parallel_min_seconds or self.workers <= 1 or not self.model_path:
+            if batched_model is not None:
+                segments, _ = batched_model.transcribe(audio, batch_size=batch_size, **options)
+            else:
+                segments, _ = self.model.transcribe(audio, **options)
+            for segment in segments:
+                yield segment.text
+        else:
+            chunks = split_audio(audio, self.chunk_seconds)
+            self.last_metrics['chunks'] = len(chunks)
+            executor = get_executor(self.model_path, self.workers)
+            futures = [executor.submit(transcribe_chunk, chunk, options) for chunk in chunks]
+            # 按提交顺序取结果，保证文本顺序与音频一致
+            for future in futures:
+                yield future.result()
+
+        self.last_metrics['total_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        logger.info(f"语音转写完成: {self.last_metrics}")
+
+    def transcribe(self, file_path: str, on_partial: Optional[Callable[[str], None]] = None, **stream_options) -> str:
+        """
+        转写整段音频
+
+        Args:
+            file_path: 音频文件路径
+            on_partial: 每得到一段新文本时回调，参数为目前为止的累计文本
+            stream_options: 传给 transcribe_stream 的参数（batched_model、batch_size）
+        """
+        parts = []
+        for text in self.transcribe_stream(file_path, **stream_options):
+            parts.append(text)
+            if on_partial:
+                on_partial(''.join(parts))
+        return ''.join(parts)
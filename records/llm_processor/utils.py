@@ -1,14 +1,50 @@
 
 import os
-from typing import Optional
-from tenacity import retry, stop_after_attempt, wait_exponential
-from rapidocr import RapidOCR
-from faster_whisper import WhisperModel
+import re
+from typing import Callable, Optional
+from django.conf import settings
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_exponential
 from sovo.settings import BASE_DIR
 from common.utils.exception_handler import CustomException, ErrorCode
 from rest_framework import status
-from opencc import OpenCC # 转简体
-from common.ml_models.load_local_model import load_local_model
+from common.ml_models.registry import model_registry
+from common.utils.instrumentation import traced
+from .inference import WHISPER_MODEL_NAME, get_inference_backend
+
+# 拼接给 LLM 的文本中，OCR/ASR 结果前的提示语；持久化的 extracted_text 不带提示语
+OCR_TEXT_PROMPT = '这是图片ocr识别出的内容(最好先清理数据（去除干扰字符、纠正明显错误），再进行其他操作。):'
+ASR_TEXT_PROMPT = '这是通过语音识别出的内容:'
+
+_CONTROL_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]')
+_BLANK_LINES = re.compile(r'\n\s*\n+')
+_SPACES = re.compile(r'[ \t\u3000]+')
+
+
+def normalize_text(text: str) -> str:
+    """去掉控制字符，合并多余的空白和空行"""
+    text = _CONTROL_CHARS.sub('', text or '')
+    text = _SPACES.sub(' ', text.replace('\r\n', '\n'))
+    return _BLANK_LINES.sub('\n', text).strip()
+
+
+class PreprocessCancelled(Exception):
+    """调用方已不再需要预处理结果（如流式请求的客户端断开），由 on_partial 回调抛出以中止识别"""
+
+
+def extraction_engine_version(input_type: str) -> str:
+    """
+    文本提取引擎版本
+
+    由识别模型和影响识别结果的预处理参数组成，任何一项变化都会让已保存的
+    extracted_text 失效并重新识别；模型本身升级时调大 TEXT_EXTRACTION_VERSION。
+    """
+    revision = getattr(settings, 'TEXT_EXTRACTION_VERSION', '1')
+    if input_type == 'image':
+        return (f"rapidocr/side={getattr(settings, 'OCR_IMAGE_MAX_SIDE', 0)}"
+                f"/gray={int(getattr(settings, 'OCR_IMAGE_GRAYSCALE', False))}/v{revision}")
+    if input_type == 'audio':
+        return f"{WHISPER_MODEL_NAME}/{getattr(settings, 'ASR_LANGUAGE', '')}/t2s/v{revision}"
+    return f"text/v{revision}"
 
 
 class MultiModalPreprocessor:
@@ -16,16 +52,19 @@ class MultiModalPreprocessor:
 
     def __init__(self):
        
-        self.rapid_ocr = RapidOCR()
-        self.whisper_model = WhisperModel(load_local_model('faster-whisper-small').load_model(), device="cpu", compute_type="int8")
-        # 转换为简体中文
-        self.cc = OpenCC('t2s')
+        # OCR/ASR推理：local 模式为进程内共享的引擎，remote 模式投递到 inference 队列
+        self.inference = get_inference_backend()
+
+    @property
+    def cc(self):
+        """繁体转简体（OpenCC，首次使用时加载）"""
+        return model_registry.get('opencc_t2s')
 
     
+    @traced('ocr')
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     def extract_text_from_image(self, file_path: str) -> Optional[str]:
         """从图片中提取文本（使用OCR API）"""
-        import time
         try:
             # 确保文件路径正确
             if not os.path.isabs(file_path):
@@ -38,21 +77,8 @@ class MultiModalPreprocessor:
                 print(f"文件不存在: {full_path}")
                 return None
 
-            with open(full_path, 'rb') as f:
-                image_data = f.read()
-            
-            result = self.rapid_ocr(image_data)
-            all_texts = '这是图片ocr识别出的内容(最好先清理数据（去除干扰字符、纠正明显错误），再进行其他操作。):'
-            if result:
-                if hasattr(result, 'txts') and result.txts:
-                    # 如果有texts属性，使用它
-                    all_texts += '|'.join(result.txts)
-                else:
-                    # 作为后备方案，尝试将结果转换为字符串
-                    all_texts += f"这是图片ocr识别出的内容:{str(result)}"
-
-                return all_texts
-            return ""
+            texts = self.inference.ocr(full_path)
+            return '|'.join(texts) if texts else ""
             
         except Exception as e:
             print(f"OCR处理失败: {e}")
@@ -62,9 +88,29 @@ class MultiModalPreprocessor:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    def extract_text_from_audio(self, file_path: str) -> Optional[str]:
-        """从音频中提取文本（使用Whisper API）"""
+    @traced('asr')
+    def extract_text_from_audio(self, file_path: str, on_partial: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """
+        从音频中提取文本（使用Whisper API）
+
+        Args:
+            file_path: 音频文件路径
+            on_partial: 识别过程中的回调，参数为目前为止识别出的简体文本；
+                        失败重试时不再回调，避免重复推送已经发出的部分文本
+        """
+        attempts = []
+        partial_callback = None
+        if on_partial:
+            def partial_callback(text):
+                if len(attempts) == 1:
+                    on_partial(self.cc.convert(text))
+        return self._transcribe_audio(file_path, partial_callback, attempts)
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10),
+           retry=retry_if_not_exception_type(PreprocessCancelled))
+    def _transcribe_audio(self, file_path: str, on_partial: Optional[Callable[[str], None]], attempts: list) -> Optional[str]:
+        """语音识别，attempts 记录已尝试的次数"""
+        attempts.append(1)
         try:
             # 确保文件路径正确
             if not os.path.isabs(file_path):
@@ -78,17 +124,13 @@ class MultiModalPreprocessor:
                 print(f"文件不存在: {full_path}")
                 return None
 
-            # 进行语音识别
-            # 注意：直接传递文件路径给transcribe方法，而不是文件内容
-            segments, info = self.whisper_model.transcribe(full_path, language="zh", beam_size=5)
-            
-            # 提取识别结果
-            recognized_text = ''.join([segment.text for segment in segments])
+            # 进行语音识别，部分结果转成简体后回调给调用方
+            recognized_text = self.inference.transcribe(full_path, on_partial=on_partial)
             # 转换为简体中文
-            simplified_text = "这是通过语音识别出的内容:"+ self.cc.convert(recognized_text)
-            
-            return simplified_text
-            
+            return self.cc.convert(recognized_text)
+
+        except PreprocessCancelled:
+            raise
         except Exception as e:
             raise CustomException(
                 error_code=ErrorCode.UNKNOWN_ERROR,
@@ -96,21 +138,51 @@ class MultiModalPreprocessor:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
-    def preprocess_inputs(self, raw_inputs: list) -> str:
-        """预处理多模态输入，提取文本内容"""
+    def extract_input_text(self, input_data, on_partial: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """
+        提取单个输入的文本
+
+        图片和语音的识别结果连同引擎版本一起保存在 RawInput 上，版本没变时直接复用，
+        重新处理记录时不再重复 OCR/ASR。文件不存在时返回 None，不写入结果。
+        """
+        if input_data.type == 'text':
+            return normalize_text(input_data.content)
+        if input_data.type not in ('image', 'audio'):
+            return None
+
+        version = extraction_engine_version(input_data.type)
+        if input_data.extracted_text is not None and input_data.engine_version == version:
+            return input_data.extracted_text
+
+        if input_data.type == 'image':
+            text = self.extract_text_from_image(input_data.file_path)
+        else:
+            text = self.extract_text_from_audio(input_data.file_path, on_partial=on_partial)
+        if text is None:
+            return None
+
+        input_data.extracted_text = normalize_text(text)
+        input_data.engine_version = version
+        return input_data.extracted_text
+
+    @traced('preprocess')
+    def preprocess_inputs(self, raw_inputs: list, on_partial: Optional[Callable[[str], None]] = None) -> str:
+        """
+        预处理多模态输入，提取文本内容；on_partial 用于接收语音识别的中间结果
+
+        识别结果会写回传入的 RawInput（extracted_text / engine_version），随记录一起保存。
+        """
         combined_text = []
-        
+
         for input_data in raw_inputs:
+            text = self.extract_input_text(input_data, on_partial=on_partial)
+            if not text:
+                continue
             if input_data.type == 'text':
-                combined_text.append(input_data.content)
+                combined_text.append(text)
             elif input_data.type == 'image':
-                text = self.extract_text_from_image(input_data.file_path)
-                if text:
-                    combined_text.append(f"[图片内容] {text}")
+                combined_text.append(f"[图片内容] {OCR_TEXT_PROMPT}{text}")
             elif input_data.type == 'audio':
-                print('=== in this audio ====')
-                text = self.extract_text_from_audio(input_data.file_path)
-                if text:
-                    combined_text.append(f"[语音内容] {text}")
-        
-        return " ".join(combined_text)
\ No newline at end of file
+                combined_text.append(f"[语音内容] {ASR_TEXT_PROMPT}{text}")
+
+        return " ".join(combined_text)
@@ -0,0 +1,62 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from records.services.import_service import (
+    ENRICH_CHOICES,
+    IMPORT_FORMATS,
+    RecordImporter,
+    guess_format,
+    open_import_file,
+    read_rows,
+)
+
+
+class Command(BaseCommand):
+    help = '从 NDJSON/CSV 文件（可 gzip 压缩）批量导入记录：按分类字段校验、insert_many 分批写入，可选加入 LLM 处理队列'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='导入文件路径')
+        parser.add_argument('--user', required=True, help='导入到该用户（用户ID）')
+        parser.add_argument('--category', default='', help='行中未指定分类时使用的分类ID')
+        parser.add_argument('--format', dest='input_format', choices=IMPORT_FORMATS,
+                            help='文件格式，默认按扩展名判断')
+        parser.add_argument('--enrich', choices=ENRICH_CHOICES, default='none',
+                            help='none 不调用 LLM；missing 没有字段值的行加入处理队列；all 全部加入处理队列')
+        parser.add_argument('--batch-size', type=int, default=500, help='每批写入的记录数')
+
+    def handle(self, *args, **options):
+        input_format = options['input_format'] or guess_format(options['path'])
+        if input_format is None:
+            raise CommandError('无法从扩展名判断文件格式，请用 --format 指定')
+
+        try:
+            user = User.objects.get(id=options['user'])
+        except Exception as e:
+            raise CommandError(f'用户不存在: {e}')
+
+        start = time.perf_counter()
+
+        def report(stats):
+            elapsed = time.perf_counter() - start
+            rate = stats['imported'] / elapsed if elapsed else 0
+            self.stdout.write(
+                f"批次 {stats['batches']}: 读取 {stats['read']}，导入 {stats['imported']}，"
+                f"失败 {stats['failed']}，入队 {stats['queued']}，{rate:.0f} 条/秒"
+            )
+
+        try:
+            importer = RecordImporter(user, category_id=options['category'], enrich=options['enrich'],
+                                      batch_size=options['batch_size'], on_progress=report)
+        except ValueError as e:
+            raise CommandError(f'参数错误: {e}')
+
+        with open_import_file(options['path']) as stream:
+            result = importer.run(read_rows(stream, input_format))
+
+        for error in result.pop('errors'):
+            self.stdout.write(self.style.WARNING(f"  第 {error['line']} 行: {error['error']}"))
+        result['elapsed_s'] = round(time.perf_counter() - start, 2)
+        self.stdout.write(self.style.SUCCESS(f"导入完成: {json.dumps(result, ensure_ascii=False)}"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from bson import ObjectId
+
+from records.services.analytics_service import RollupService
+
+
+class Command(BaseCommand):
+    help = '从记录重新计算按天汇总（DailyRollup），用于首次上线或修改分类的 number 字段之后'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='只重建该用户的汇总（用户ID）')
+        parser.add_argument('--category', help='只重建该分类的汇总（分类ID）')
+
+    def handle(self, *args, **options):
+        for key in ('user', 'category'):
+            if options[key] and not ObjectId.is_valid(options[key]):
+                raise CommandError(f'无效的ID: {options[key]}')
+
+        total = RollupService().rebuild(
+            user=ObjectId(options['user']) if options['user'] else None,
+            category_id=options['category'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"汇总重建完成，共写入 {total} 条"))
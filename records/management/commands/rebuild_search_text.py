@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from records.models import Record
+from records.utils.search_utils import record_search_text
+
+
+class Command(BaseCommand):
+    help = '为已有记录重新生成分词后的检索文本（search_text），用于首次上线检索或调整分词后回填'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每批写回的记录数')
+        parser.add_argument('--missing-only', action='store_true', help='只处理还没有检索文本的记录')
+
+    def handle(self, *args, **options):
+        queryset = Record.objects.only('id', 'title', 'raw_inputs', 'content')
+        if options['missing_only']:
+            queryset = queryset.filter(search_text__in=['', None])
+
+        collection = Record._get_collection()
+        batch_size = options['batch_size']
+        operations = []
+        total = 0
+        for record in queryset.no_cache().batch_size(batch_size):
+            operations.append(UpdateOne({'_id': record.id}, {'$set': {'search_text': record_search_text(record)}}))
+            if len(operations) >= batch_size:
+                collection.bulk_write(operations, ordered=False)
+                total += len(operations)
+                operations = []
+                self.stdout.write(f"已处理 {total} 条")
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+            total += len(operations)
+
+        self.stdout.write(self.style.SUCCESS(f"检索文本生成完成，共 {total} 条"))
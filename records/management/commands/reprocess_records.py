@@ -0,0 +1,90 @@
+import datetime
+import json
+import time
+
+from bson import ObjectId
+from django.core.management.base import BaseCommand, CommandError
+
+
+def build_filters(options: dict) -> dict:
+    """把命令行参数转换为 Record 查询条件"""
+    filters = {}
+    if options.get('user'):
+        filters['user'] = ObjectId(options['user'])
+    if options.get('category'):
+        filters['category'] = ObjectId(options['category'])
+    if options.get('type'):
+        filters['type'] = options['type']
+    if options.get('status'):
+        filters['status'] = options['status']
+    if options.get('since'):
+        filters['created_at__gte'] = datetime.datetime.fromisoformat(options['since'])
+    return filters
+
+
+class Command(BaseCommand):
+    help = '批量重新处理记录：游标流式读取、分块并行调用 LLM、限速、bulk_write 写回，支持断点续跑'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--job', default='default', help='任务名，同名任务共用一个检查点')
+        parser.add_argument('--user', help='只处理该用户的记录（用户ID）')
+        parser.add_argument('--category', help='只处理该分类的记录（分类ID）')
+        parser.add_argument('--type', help='只处理该类型的记录')
+        parser.add_argument('--status', choices=['pending', 'processing', 'done', 'failed'],
+                            help='只处理该处理状态的记录，如 failed')
+        parser.add_argument('--since', help='只处理该时间之后创建的记录，ISO 格式，如 2025-01-01')
+        parser.add_argument('--limit', type=int, default=0, help='本次最多处理多少条，0 表示不限')
+        parser.add_argument('--chunk-size', type=int, default=50, help='每个分块的记录数')
+        parser.add_argument('--workers', type=int, default=4, help='分块内并行处理的线程数')
+        parser.add_argument('--rate', type=float, default=2.0, help='每秒最多处理的记录数，0 表示不限速')
+        parser.add_argument('--reclassify', action='store_true', help='在用户全部分类中重新判定类型')
+        parser.add_argument('--reset', action='store_true', help='清除检查点，从头开始')
+        parser.add_argument('--dry-run', action='store_true', help='只处理不写回，也不更新检查点')
+        parser.add_argument('--async', action='store_true', dest='run_async',
+                            help='投递到 Celery 的 batch 队列在后台执行')
+
+    def handle(self, *args, **options):
+        try:
+            filters = build_filters(options)
+        except Exception as e:
+            raise CommandError(f'参数错误: {e}')
+
+        job_options = {
+            'job': options['job'],
+            'chunk_size': options['chunk_size'],
+            'workers': options['workers'],
+            'rate': options['rate'],
+            'reclassify': options['reclassify'],
+            'limit': options['limit'],
+            'dry_run': options['dry_run'],
+        }
+
+        if options['run_async']:
+            from records.tasks import reprocess_records
+            serializable = {key: str(value) if isinstance(value, (ObjectId, datetime.datetime)) else value
+                            for key, value in filters.items()}
+            result = reprocess_records.delay(serializable, job_options, reset=options['reset'])
+            self.stdout.write(self.style.SUCCESS(f"已投递批量处理任务: {result.id}"))
+            return
+
+        from records.services.reprocess_service import RecordReprocessor
+
+        start = time.perf_counter()
+
+        def report(stats):
+            elapsed = time.perf_counter() - start
+            rate = stats['processed'] / elapsed if elapsed else 0
+            self.stdout.write(
+                f"分块 {stats['chunks']}: 成功 {stats['processed']}，失败 {stats['failed']}，"
+                f"{rate:.2f} 条/秒，检查点 {stats['checkpoint']}"
+            )
+
+        reprocessor = RecordReprocessor(filters=filters, on_progress=report, **job_options)
+        if options['reset']:
+            reprocessor.reset_checkpoint()
+        elif reprocessor.get_checkpoint():
+            self.stdout.write(f"从检查点 {reprocessor.get_checkpoint()} 之后继续")
+
+        stats = reprocessor.run()
+        stats['elapsed_s'] = round(time.perf_counter() - start, 2)
+        self.stdout.write(self.style.SUCCESS(f"处理完成: {json.dumps(stats, ensure_ascii=False)}"))
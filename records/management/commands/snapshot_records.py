@@ -0,0 +1,38 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from records.services.snapshot_service import RecordSnapshotService, SnapshotQuery
+
+
+class Command(BaseCommand):
+    help = ('生成记录的 Parquet 分析快照（默认增量），或用 DuckDB 查询某个用户的快照；'
+            '修改分类字段类型后用 --rebuild 重建')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='从 MongoDB 重建快照（指定 --user 时只重建该用户）')
+        parser.add_argument('--user', help='用户ID')
+        parser.add_argument('--query', help='对该用户的快照执行 SQL，表名为 records，如 '
+                                            '"SELECT type, count(*) FROM records GROUP BY type"')
+
+    def handle(self, *args, **options):
+        if options['query']:
+            if not options['user']:
+                raise CommandError('--query 需要同时指定 --user')
+            try:
+                rows = SnapshotQuery(options['user']).query(options['query'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            for row in rows:
+                self.stdout.write(json.dumps(row, ensure_ascii=False, default=str))
+            return
+
+        service = RecordSnapshotService()
+        try:
+            if options['rebuild']:
+                result = service.rebuild(options['user'])
+            else:
+                result = service.run()
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"快照完成: {json.dumps(result, ensure_ascii=False)}"))
@@ -1,13 +1,18 @@
 
-from .record_model import Record, InputType, RawInput
+from .record_model import Record, InputType, RawInput, ProcessingStatus
 from .category_model import Category, FieldSpec
 from .tag_model import Tag
+from .rollup_model import DailyRollup
+from .job_model import ReprocessCheckpoint
 
 __all__ = [
     'Record', 
     'InputType',
     'RawInput',
+    'ProcessingStatus',
     'Category',
     'FieldSpec',
-    'Tag'
+    'Tag',
+    'DailyRollup',
+    'ReprocessCheckpoint'
 ]
@@ -17,7 +17,11 @@ class Category(Document):
     meta = {
         'collection': 'categories',
         'indexes': [
+            # 用户的分类列表、同名校验
+            {'fields': ['user', 'name']},
+            # 按名称取 schema
             'name',
-            'user'
+            # 用户分类 + 系统默认分类（$or 的每个分支都需要索引）
+            'is_default',
         ]
     }
@@ -0,0 +1,18 @@
+from mongoengine import Document, fields
+import datetime
+
+
+class ReprocessCheckpoint(Document):
+    """
+    批量重新处理任务的检查点
+
+    每个任务名一条文档，保存已处理完的最后一个记录 _id。放在 MongoDB 而不是缓存中，
+    缓存淘汰、清空或进程重启都不会让长时间运行的任务从头开始。
+    """
+    job = fields.StringField(required=True, unique=True, help_text='任务名')
+    last_id = fields.ObjectIdField(null=True, help_text='已处理完的最后一个记录 _id')
+    updated_at = fields.DateTimeField(default=datetime.datetime.now, help_text='更新时间')
+
+    meta = {
+        'collection': 'record_reprocess_checkpoints',
+    }
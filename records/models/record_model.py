@@ -27,6 +27,16 @@ class RawInput(EmbeddedDocument):
     file_path = fields.StringField(null=False)
     file_size = fields.IntField(null=False)
     uploaded_at = fields.DateTimeField(default=datetime.datetime.now)
+    # 图片/语音的识别文本（已规范化，不含提示语），engine_version 与当前引擎一致时重新处理直接复用
+    extracted_text = fields.StringField(null=True, help_text="OCR/ASR 识别出的文本")
+    engine_version = fields.StringField(null=True, help_text="识别文本时的引擎版本")
+
+
+class ProcessingStatus(Enum):
+    PENDING = "pending"  # 等待处理
+    PROCESSING = "processing"  # 处理中
+    DONE = "done"  # 处理完成
+    FAILED = "failed"  # 处理失败，可重试
 
 
 class Record(Document):
@@ -39,38 +49,53 @@ class Record(Document):
     raw_inputs = fields.ListField(fields.EmbeddedDocumentField(RawInput))
     content = fields.DictField(default={})
     is_processed = fields.BooleanField(default=False)
+    # 处理状态机：pending -> processing -> done / failed，failed 可重新入队
+    # 历史记录没有该字段，均为同步处理完成的记录，默认视为 done
+    status = fields.StringField(
+        choices=[st.value for st in ProcessingStatus], default=ProcessingStatus.DONE.value, help_text="处理状态"
+    )
+    error = fields.StringField(null=True, help_text="最近一次处理失败的原因")
+    attempts = fields.IntField(default=0, help_text="处理次数")
+    # 领取处理的时间，超过 RECORD_PROCESSING_TIMEOUT 仍为 processing 的记录可以被重新领取
+    processing_started_at = fields.DateTimeField(null=True, help_text="开始处理的时间")
     processed_at = fields.DateTimeField(null=True)
     created_at = fields.DateTimeField(default=datetime.datetime.now)
     updated_at = fields.DateTimeField(default=datetime.datetime.now)
     file_data = fields.DictField(required=False, default=None)
+    # 预处理后送给 LLM 的完整文本（文本输入 + OCR/ASR 结果）
+    raw_text = fields.StringField(default="", help_text="预处理后的文本")
+    # 分好词的检索文本（标题、输入文本、提取结果），由 records.utils.search_utils 生成
+    search_text = fields.StringField(default="", help_text="检索文本")
 
     meta = {
         "collection": "records",
-        "indexes": ["user", "type", "is_processed", "category"],
+        "indexes": [
+            # 列表、检索默认按创建时间倒序，时间范围过滤也走这个索引
+            {"fields": ["user", "-created_at"]},
+            # 按分类过滤（列表、检索、统计）
+            {"fields": ["user", "category", "-created_at"]},
+            # 重试失败记录：按状态（可再加用户）
+            {"fields": ["status", "user"]},
+            # 按分类重建统计汇总、批量重新处理
+            "category",
+            # 分析快照按 updated_at 高水位增量读取
+            "updated_at",
+            # 清理孤儿文件时判断上传的文件是否仍被记录引用
+            "raw_inputs.file_path",
+            # 文本索引以 user 为前缀，检索只扫描当前用户的数据；分词在写入前完成，关闭语言相关的词干处理
+            {
+                "fields": ["user", "$search_text"],
+                "default_language": "none",
+                "language_override": "search_language",
+            },
+        ],
     }
 
     def clean(self):
-        if self.raw_inputs and not self.is_processed:
-            self._auto_process()
-        super(Record, self).clean()
+        # 只做本地分词，不涉及任何模型或网络调用
+        from ..utils.search_utils import record_search_text
 
-    def _auto_process(self):
-        """使用LLM处理器替代原来的规则处理器"""
-        from ..llm_processor import LLMProcessor
-
-        try:
-            processor = LLMProcessor()
-            result = processor.process_inputs(self.raw_inputs)
-
-            self.type = result["type"]
-            self.content = result["content"]
-            self.is_processed = True
-            self.processed_at = datetime.datetime.now()
-
-        except Exception as e:
-            # 处理失败时设置默认值
-            self.type = RecordType.UNKNOWN.value
-            self.content = {"error": str(e), "raw_inputs": len(self.raw_inputs)}
-            # self.confidence = 0.0
-            self.is_processed = True
-            self.processed_at = datetime.datetime.now()
+        self.search_text = record_search_text(self)
+        # 每次保存都刷新更新时间，分析快照依赖它做增量
+        self.updated_at = datetime.datetime.now()
+        super(Record, self).clean()
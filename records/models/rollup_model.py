@@ -0,0 +1,28 @@
+from mongoengine import Document, fields
+import datetime
+
+
+class DailyRollup(Document):
+    """
+    记录按天汇总
+
+    每个 (用户, 日期, 分类, 标签) 一条文档，tag 为 None 的是整个分类当天的合计。
+    sums 保存分类中 number 类型字段的合计，记录写入、重新处理、删除时由
+    records.services.analytics_service.RollupService 以 $inc 增量维护。
+    """
+    user = fields.ReferenceField('User', required=True, help_text='用户')
+    day = fields.DateTimeField(required=True, help_text='日期（按记录创建时间，当天零点）')
+    category = fields.ReferenceField('Category', required=True, help_text='分类')
+    tag = fields.StringField(null=True, help_text='标签，None 表示分类合计')
+    count = fields.IntField(default=0, help_text='记录数')
+    sums = fields.DictField(default={}, help_text='数值字段合计 {字段名: 合计}')
+    updated_at = fields.DateTimeField(default=datetime.datetime.now, help_text='更新时间')
+
+    meta = {
+        'collection': 'record_daily_rollups',
+        'indexes': [
+            # 增量更新的定位条件，同时覆盖按用户、时间范围的查询
+            {'fields': ['user', 'day', 'category', 'tag'], 'unique': True},
+            ['user', 'tag', 'day'],
+        ]
+    }
@@ -12,9 +12,9 @@ class Tag(Document):
     meta = {
         'collection': 'tags',
         'indexes': [
-            'name',
-            'category',
-            'description',
-            {'fields': ['user', 'name'], 'unique': True}
+            # 同时服务于用户的标签列表
+            {'fields': ['user', 'name'], 'unique': True},
+            # 提取时按分类取用户的标签
+            {'fields': ['category', 'user']},
         ]
     }
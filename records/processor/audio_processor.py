@@ -4,7 +4,6 @@ import base64
 import tempfile
 import os
 from ..models import EventType
-from faster_whisper import WhisperModel
 
 class AudioProcessor:
     def __init__(self):
@@ -14,6 +13,7 @@ class AudioProcessor:
     def _get_model(self):
         """懒加载模型"""
         if self.model is None:
+            from faster_whisper import WhisperModel
             # 使用 base 模型，CPU 运行，int8 量化以节省内存
             self.model = WhisperModel("base", device="cpu", compute_type="int8")
         return self.model
@@ -1,16 +1,17 @@
 from sched import Event
 from typing import Dict, Any
-from rapidocr import RapidOCR
-from PIL import Image
 import io
-import numpy as np
-import cv2
 import base64
 from ..models import EventType
 
 class ImageProcessor:
     def process(self, image_data: str) -> Dict[str, Any]:
         """处理图片输入"""
+        # OCR与图像库只在处理图片时导入
+        import numpy as np
+        import cv2
+        from rapidocr import RapidOCR
+
         ocr = RapidOCR()
         try:
             # 如果是base64编码的图片
@@ -2,11 +2,15 @@ from .record_serializer import RecordSerializer
 from .category_serializer import CategorySerializer
 from .field_spec_serializer import FieldSpecSerializer
 from .tag_serializer import TagSerializer
+from .fast_serializers import RecordListSerializer, TagListSerializer, CategoryListSerializer
 
 
 __all__ = [
     'RecordSerializer', 
     'CategorySerializer',
     'FieldSpecSerializer',
-    'TagSerializer'
+    'TagSerializer',
+    'RecordListSerializer',
+    'TagListSerializer',
+    'CategoryListSerializer'
 ]
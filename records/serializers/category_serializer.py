@@ -1,10 +1,13 @@
 from rest_framework import serializers
 from rest_framework_mongoengine.serializers import DocumentSerializer
 from ..models import Category, FieldSpec
+from common.serializers.fields import ReferenceIdField
 
 
 
 class CategorySerializer(DocumentSerializer):
+    # user 只输出ID，不逐条解引用
+    serializer_reference_base_field = ReferenceIdField
 
     class Meta:
         model = Category
@@ -0,0 +1,28 @@
+from common.serializers.fast import FastDocumentSerializer
+from ..models import Category, Record, Tag
+
+
+class RecordListSerializer(FastDocumentSerializer):
+    """记录列表的只读序列化，输出与 RecordSerializer 相同"""
+    document = Record
+    exclude = ('search_text',)
+
+    def extra(self, raw, data):
+        # 与 RecordSerializer.get_processing_result 一致，content 保持原始值交给渲染器
+        data['processing_result'] = {
+            'type': raw.get('type', ''),
+            'content': raw.get('content', {}),
+        }
+        # RecordSerializer 中只用于写入的字段，读取时为默认值
+        data['category_id'] = ''
+        return data
+
+
+class TagListSerializer(FastDocumentSerializer):
+    """标签列表的只读序列化，输出与 TagSerializer 相同"""
+    document = Tag
+
+
+class CategoryListSerializer(FastDocumentSerializer):
+    """分类列表的只读序列化，输出与 CategorySerializer 相同"""
+    document = Category
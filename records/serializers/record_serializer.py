@@ -2,30 +2,57 @@ from rest_framework import serializers
 from rest_framework_mongoengine.serializers import DocumentSerializer
 from ..models import Record, RawInput
 from ..services.record_service import RecordService
+from common.serializers.fields import ReferenceIdField, ReferenceExpansionMixin
 
+# 只能由 OCR/ASR 预处理写入的 RawInput 字段
+RAW_INPUT_ENGINE_FIELDS = ('extracted_text', 'engine_version')
+
+
+class RecordSerializer(ReferenceExpansionMixin, DocumentSerializer):
+    # user、category 只输出ID，不逐条解引用；?expand=category 时输出分类名称
+    serializer_reference_base_field = ReferenceIdField
+    expandable_fields = {'category': ('name',)}
 
-class RecordSerializer(DocumentSerializer):
-    
     processing_result = serializers.SerializerMethodField(read_only=True)
     title = serializers.CharField(required=False, allow_blank=True, default='')
     category_id = serializers.CharField(required=False, allow_blank=True, default='')
      
     class Meta:
         model = Record
-        fields = '__all__'
+        exclude = ['search_text']
         read_only_fields = [
             'id', 
             'user', 
             'type', 
             'content', 
+            'raw_text',
             'category',
             'is_processed', 
+            'status',
+            'error',
+            'attempts',
+            'processing_started_at',
             'processed_at', 
             'created_at', 
             'updated_at'
         ]
 
     
+    def validate_raw_inputs(self, value):
+        """
+        丢弃客户端传入的识别结果（extracted_text / engine_version）
+
+        识别结果只能由 OCR/ASR 预处理写入，否则引擎版本相同时会把客户端文本当作识别结果复用。
+        创建和修改（PATCH raw_inputs）都经过这里。
+        """
+        for item in value or []:
+            for key in RAW_INPUT_ENGINE_FIELDS:
+                if isinstance(item, dict):
+                    item.pop(key, None)
+                else:
+                    setattr(item, key, None)
+        return value
+
     def get_processing_result(self, obj):
         """返回处理结果"""
         return {
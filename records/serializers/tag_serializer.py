@@ -1,7 +1,12 @@
 from rest_framework_mongoengine.serializers import DocumentSerializer
 from ..models import Tag
+from common.serializers.fields import ReferenceIdField, ReferenceExpansionMixin
+
+class TagSerializer(ReferenceExpansionMixin, DocumentSerializer):
+    # user、category 只输出ID，不逐条解引用；?expand=category 时输出分类名称
+    serializer_reference_base_field = ReferenceIdField
+    expandable_fields = {'category': ('name',)}
 
-class TagSerializer(DocumentSerializer):
     class Meta:
         model = Tag
         fields = '__all__'
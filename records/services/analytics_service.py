@@ -0,0 +1,285 @@
+import datetime
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from mongoengine.queryset.visitor import Q
+from pymongo import UpdateOne
+
+from ..models import Category, DailyRollup, Record
+from ..utils.query_utils import parse_date, parse_date_range
+
+GROUP_BY_CHOICES = ('category', 'tag', 'day', 'month')
+
+
+def numeric_fields(category) -> List[str]:
+    """分类中声明为 number 的字段；含 . 或以 $ 开头的字段名不能作为 Mongo 键，跳过"""
+    return [
+        spec.name for spec in (category.field_specs or [])
+        if spec.field_type == 'number' and '.' not in spec.name and not spec.name.startswith('$')
+    ]
+
+
+def to_number(value) -> Optional[float]:
+    """LLM 提取的数值可能是字符串（如 "1,200.5"），无法转换时返回 None"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.replace(',', '').strip())
+        except ValueError:
+            return None
+    return None
+
+
+def record_tags(content: dict) -> List[str]:
+    """提取结果中的标签，兼容逗号分隔的字符串"""
+    tags = content.get('tags') or []
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    return sorted({str(tag).strip() for tag in tags if str(tag).strip()})
+
+
+def day_of(value: datetime.datetime) -> datetime.datetime:
+    return datetime.datetime(value.year, value.month, value.day)
+
+
+class RollupService:
+    """
+    按天汇总的增量维护
+
+    一条记录对汇总的"贡献"由用户、创建日期、分类、标签和数值字段决定。
+    记录写入前后各取一次贡献，差值以 $inc upsert 到 DailyRollup，
+    新建时只有写入后的贡献，删除时只有写入前的贡献。
+    只有 is_processed 的记录计入汇总，待处理和处理失败的记录不计入。
+    """
+
+    def __init__(self):
+        # 分类ID -> 数值字段，同一次批量维护内只查一次分类
+        self._fields = {}
+
+    def fields_for(self, category_id) -> List[str]:
+        if category_id not in self._fields:
+            category = Category.objects(id=category_id).only('field_specs').first()
+            self._fields[category_id] = numeric_fields(category) if category else []
+        return self._fields[category_id]
+
+    def snapshot(self, record: Record, updates: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        记录当前（或叠加 updates 之后）的汇总贡献，不计入汇总时返回 None
+
+        updates 为 RecordService.process_record 返回的原始字段，用于 $set 写回、尚未应用到对象上的场景。
+        """
+        try:
+            return self._snapshot(record, updates)
+        except Exception as e:
+            print(f"计算记录{record.id}的汇总失败: {e}")
+            return None
+
+    def _snapshot(self, record: Record, updates: Optional[Dict]) -> Optional[Dict]:
+        return self.contribution(record.to_mongo(), updates)
+
+    def contribution(self, data: Dict, updates: Optional[Dict] = None) -> Optional[Dict]:
+        """原始文档（to_mongo() 或 pymongo 查询结果）对汇总的贡献，增量维护和 rebuild 共用"""
+        data = {
+            'user': data.get('user'),
+            'category': data.get('category'),
+            'created_at': data.get('created_at') or datetime.datetime.now(),
+            'content': data.get('content') or {},
+            'is_processed': data.get('is_processed', False),
+        }
+        for key in ('category', 'content', 'is_processed'):
+            if updates and key in updates:
+                data[key] = updates[key]
+
+        if not data['is_processed'] or not data['user'] or not data['category']:
+            return None
+
+        category_id = ObjectId(str(data['category']))
+        sums = {}
+        for name in self.fields_for(category_id):
+            value = to_number(data['content'].get(name))
+            if value is not None:
+                sums[name] = value
+
+        return {
+            'user': data['user'],
+            'day': day_of(data['created_at']),
+            'category': category_id,
+            'tags': record_tags(data['content']),
+            'sums': sums,
+        }
+
+    def _add(self, deltas: Dict, snapshot: Optional[Dict], sign: int):
+        if snapshot is None:
+            return
+        for tag in [None] + snapshot['tags']:
+            key = (snapshot['user'], snapshot['day'], snapshot['category'], tag)
+            deltas[key]['count'] += sign
+            for name, value in snapshot['sums'].items():
+                deltas[key][f'sums.{name}'] += sign * value
+
+    def apply(self, changes: Iterable[Tuple[Optional[Dict], Optional[Dict]]]) -> int:
+        """
+        把 (写入前贡献, 写入后贡献) 的变化批量写入汇总，返回更新的汇总文档数
+
+        汇总只是读优化，写入失败不影响记录本身，可以用 rebuild_rollups 命令重建。
+        """
+        deltas = defaultdict(lambda: defaultdict(float))
+        for before, after in changes:
+            self._add(deltas, before, -1)
+            self._add(deltas, after, 1)
+
+        now = datetime.datetime.now()
+        operations = []
+        for (user, day, category, tag), increments in deltas.items():
+            increments = {field: value for field, value in increments.items() if value}
+            if not increments:
+                continue
+            if 'count' in increments:
+                increments['count'] = int(increments['count'])
+            operations.append(UpdateOne(
+                {'user': user, 'day': day, 'category': category, 'tag': tag},
+                {'$inc': increments, '$set': {'updated_at': now}},
+                upsert=True,
+            ))
+
+        if not operations:
+            return 0
+        try:
+            DailyRollup._get_collection().bulk_write(operations, ordered=False)
+        except Exception as e:
+            print(f"更新记录汇总失败: {e}")
+            return 0
+        return len(operations)
+
+    def record_changed(self, before: Optional[Dict], record: Optional[Record] = None) -> int:
+        """单条记录写入后调用，before 为写入前的 snapshot（新建时为 None），删除时 record 为 None"""
+        after = self.snapshot(record) if record is not None else None
+        return self.apply([(before, after)])
+
+    def rebuild(self, user=None, category_id=None) -> int:
+        """
+        从记录重新计算汇总，返回写入的汇总文档数
+
+        按分类用游标读取记录，逐条用与增量维护相同的 contribution()（to_number、record_tags）
+        计算贡献后累加，保证重建结果与增量维护的结果一致。
+        """
+        categories = Category.objects.only('id', 'field_specs')
+        if category_id:
+            categories = categories.filter(id=category_id)
+
+        rollups = DailyRollup._get_collection()
+        records = Record._get_collection()
+        now = datetime.datetime.now()
+        total = 0
+        for category in categories:
+            match = {'category': category.id, 'is_processed': True}
+            if user is not None:
+                match['user'] = user.id if hasattr(user, 'id') else ObjectId(str(user))
+            rollups.delete_many({key: value for key, value in match.items() if key != 'is_processed'})
+
+            fields = numeric_fields(category)
+            self._fields[category.id] = fields
+            projection = {'user': 1, 'category': 1, 'created_at': 1, 'is_processed': 1, 'content.tags': 1}
+            projection.update({f'content.{name}': 1 for name in fields})
+
+            deltas = defaultdict(lambda: defaultdict(float))
+            for raw in records.find(match, projection, batch_size=1000):
+                self._add(deltas, self.contribution(raw), 1)
+
+            documents = [
+                {
+                    'user': user_id,
+                    'day': day,
+                    'category': category.id,
+                    'tag': tag,
+                    'count': int(values['count']),
+                    'sums': {name: values.get(f'sums.{name}', 0.0) for name in fields},
+                    'updated_at': now,
+                }
+                for (user_id, day, _, tag), values in deltas.items()
+            ]
+            if documents:
+                rollups.insert_many(documents, ordered=False)
+                total += len(documents)
+        return total
+
+
+class AnalyticsService:
+    """
+    记录统计
+
+    只读 DailyRollup，不扫描记录本身，查询量与天数 × 分类 × 标签数成正比，与记录数无关。
+    """
+
+    def summary(self, user, params) -> Dict:
+        group_by = params.get('group_by') or 'category'
+        if group_by not in GROUP_BY_CHOICES:
+            raise ValueError(f"group_by 只支持 {', '.join(GROUP_BY_CHOICES)}")
+
+        match = {'user': user.id, 'tag': {'$ne': None} if group_by == 'tag' else None}
+
+        categories = Category.objects(Q(user=user) | Q(is_default=True)).only('id', 'name', 'field_specs')
+        if category_id := params.get('category'):
+            if not ObjectId.is_valid(category_id):
+                raise ValueError(f"无效的分类ID: {category_id}")
+            match['category'] = ObjectId(category_id)
+            categories = categories.filter(id=category_id)
+        categories = list(categories)
+
+        if tags := params.get('tags'):
+            match['tag'] = {'$in': [tag.strip() for tag in tags.split(',') if tag.strip()]}
+
+        start, end = parse_date_range(params['date_range']) if params.get('date_range') else (None, None)
+        if params.get('date_from'):
+            start = parse_date(params['date_from'])
+        if params.get('date_to'):
+            end = parse_date(params['date_to'], end_of_day=True)
+        if start or end:
+            match['day'] = {}
+            if start:
+                match['day']['$gte'] = day_of(start)
+            if end:
+                match['day']['$lte'] = end
+
+        # 需要汇总的字段：指定的字段，或者涉及分类中全部 number 字段
+        fields = sorted({name for category in categories for name in numeric_fields(category)})
+        if requested := params.get('fields'):
+            fields = [name for name in requested.split(',') if name in fields]
+
+        group_key = {
+            'category': '$category',
+            'tag': '$tag',
+            'day': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$day'}},
+            'month': {'$dateToString': {'format': '%Y-%m', 'date': '$day'}},
+        }[group_by]
+        group = {'_id': group_key, 'count': {'$sum': '$count'}}
+        for i, name in enumerate(fields):
+            group[f'sum_{i}'] = {'$sum': f'$sums.{name}'}
+
+        rows = DailyRollup._get_collection().aggregate([
+            {'$match': match},
+            {'$group': group},
+            {'$sort': {'_id': 1}},
+        ])
+
+        names = {category.id: category.name for category in categories}
+        data = []
+        for row in rows:
+            item = {
+                'key': str(row['_id']) if group_by == 'category' else row['_id'],
+                'count': row['count'],
+                'sums': {name: round(row[f'sum_{i}'], 6) for i, name in enumerate(fields)},
+            }
+            if group_by == 'category':
+                item['category_name'] = names.get(row['_id'])
+            data.append(item)
+
+        return {
+            'group_by': group_by,
+            'fields': fields,
+            'data': data,
+        }
@@ -0,0 +1,146 @@
+import csv
+import zlib
+from typing import Dict, Iterator, List
+
+from mongoengine.queryset.visitor import Q
+
+from common.serializers.fast import represent_datetime, represent_generic
+from common.utils.renderers import ORJSONRenderer
+from ..models import Category, Record
+from ..utils.query_utils import build_record_query
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+# 记录本身的列，分类的动态字段列排在之后
+BASE_COLUMNS = ['id', 'title', 'type', 'category_id', 'category_name', 'status', 'created_at', 'updated_at']
+
+# 每次从游标取回的文档数，也是写出一个数据块的行数
+BATCH_SIZE = 500
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+_renderer = ORJSONRenderer()
+
+
+class _Echo:
+    """csv.writer 需要一个文件对象，write 直接返回写入的行，不做缓冲"""
+
+    def write(self, value):
+        return value
+
+
+def _cell(value) -> str:
+    """CSV 单元格：列表用逗号连接，字典输出 JSON"""
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return ','.join(_cell(item) for item in value)
+    if isinstance(value, dict):
+        return _renderer.render(value).decode('utf-8')
+    return str(value)
+
+
+class RecordExportService:
+    """
+    记录导出
+
+    用服务端游标按批取回 as_pymongo() 的原始文档，逐行转换后分块输出，
+    不构造 Document、不把结果集放进内存，导出的行数不影响内存占用。
+    列为记录本身的字段、分类 field_specs 中的字段和标签；未指定分类时为用户可用分类字段的并集。
+    过滤条件与记录检索相同（category、type、tags、date_range、date_from、date_to），
+    参数错误在构造时抛出 ValueError，开始输出之后不会再因为参数失败。
+    """
+
+    def __init__(self, user, params):
+        self.query = build_record_query(params, user)
+
+        categories = Category.objects(Q(user=user) | Q(is_default=True)).only('id', 'name', 'field_specs')
+        if category_id := params.get('category'):
+            categories = categories.filter(id=category_id)
+        categories = list(categories.order_by('id'))
+        self.category_names = {category.id: category.name for category in categories}
+
+        # 分类字段名 -> 列名；与记录本身的列重名时加 content. 前缀
+        self.fields: Dict[str, str] = {}
+        for category in categories:
+            for spec in category.field_specs or []:
+                if spec.name not in self.fields:
+                    self.fields[spec.name] = f'content.{spec.name}' if spec.name in BASE_COLUMNS else spec.name
+        # 标签是每个分类提取时都有的固定字段
+        self.fields.setdefault('tags', 'tags')
+
+    @property
+    def columns(self) -> List[str]:
+        return BASE_COLUMNS + list(self.fields.values())
+
+    def records(self):
+        queryset = (
+            Record.objects(self.query)
+            .only('id', 'title', 'type', 'category', 'status', 'created_at', 'updated_at', 'content')
+            .order_by('-created_at')
+            .no_cache()
+            .batch_size(BATCH_SIZE)
+        )
+        return queryset.as_pymongo()
+
+    def row(self, raw: Dict) -> Dict:
+        """一行导出数据，日期、ObjectId 的格式与列表接口的输出相同"""
+        category_id = raw.get('category')
+        content = raw.get('content') or {}
+        row = {
+            'id': str(raw['_id']),
+            'title': raw.get('title', ''),
+            'type': raw.get('type', ''),
+            'category_id': str(category_id) if category_id else None,
+            'category_name': self.category_names.get(category_id),
+            'status': raw.get('status'),
+            'created_at': represent_datetime(raw.get('created_at')),
+            'updated_at': represent_datetime(raw.get('updated_at')),
+        }
+        for name, column in self.fields.items():
+            row[column] = represent_generic(content.get(name))
+        return row
+
+    def lines(self, output_format: str) -> Iterator[bytes]:
+        """逐批输出编码后的数据块，每块 BATCH_SIZE 行"""
+        if output_format == 'csv':
+            writer = csv.writer(_Echo())
+            columns = self.columns
+            # 带 BOM，Excel 打开时按 UTF-8 识别中文
+            yield ('\ufeff' + writer.writerow(columns)).encode('utf-8')
+
+            def encode(row):
+                return writer.writerow([_cell(row[column]) for column in columns]).encode('utf-8')
+        else:
+            def encode(row):
+                return _renderer.render(row) + b'\n'
+
+        chunk = []
+        for raw in self.records():
+            chunk.append(encode(self.row(raw)))
+            if len(chunk) >= BATCH_SIZE:
+                yield b''.join(chunk)
+                chunk = []
+        if chunk:
+            yield b''.join(chunk)
+
+    def stream(self, output_format: str, compress: bool = False) -> Iterator[bytes]:
+        """导出内容，compress=True 时边生成边 gzip 压缩"""
+        try:
+            if not compress:
+                yield from self.lines(output_format)
+                return
+
+            compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+            for chunk in self.lines(output_format):
+                data = compressor.compress(chunk)
+                if data:
+                    yield data
+            yield compressor.flush()
+        except Exception as e:
+            # 响应头已经发出，只能中断输出；客户端会收到不完整的文件（gzip 校验失败）
+            print(f"导出记录失败: {e}")
+            raise
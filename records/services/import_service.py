@@ -0,0 +1,274 @@
+import csv
+import datetime
+import gzip
+import io
+import json
+from typing import Callable, Dict, IO, Iterator, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.utils import timezone
+from mongoengine.errors import ValidationError as DocumentValidationError
+from mongoengine.queryset.visitor import Q
+from pymongo.errors import BulkWriteError
+
+from ..models import Category, ProcessingStatus, RawInput, Record
+from ..utils.search_utils import build_search_text
+from .analytics_service import RollupService
+from .record_service import RecordService
+
+IMPORT_FORMATS = ('ndjson', 'csv')
+
+# none：不调用 LLM；missing：只处理没有任何字段值的行；all：全部重新提取
+ENRICH_CHOICES = ('none', 'missing', 'all')
+
+PROGRESS_KEY = 'a:records:import:{user}:{job}'
+PROGRESS_TIMEOUT = 24 * 3600
+
+# 导入结果中最多保留的错误行数
+MAX_ERRORS = 100
+
+
+def guess_format(filename: str) -> Optional[str]:
+    """按文件扩展名判断格式，支持 .gz 压缩"""
+    name = filename.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl', '.json')):
+        return 'ndjson'
+    return None
+
+
+def open_import_file(path: str) -> IO[bytes]:
+    """以二进制方式打开导入文件，.gz 文件边读边解压"""
+    return gzip.open(path, 'rb') if path.lower().endswith('.gz') else open(path, 'rb')
+
+
+def read_rows(stream: IO[bytes], input_format: str) -> Iterator[Tuple[int, object]]:
+    """
+    逐行读取导入文件，产出 (行号, 行数据)
+
+    行数据为 dict，无法解析的行为 ValueError，由调用方计入失败；文件不会整体读入内存。
+    utf-8-sig 兼容导出 CSV 时写入的 BOM。
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if input_format == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, ValueError(f"JSON 解析失败: {e}")
+            continue
+        yield line_number, row if isinstance(row, dict) else ValueError('每行必须是 JSON 对象')
+
+
+def parse_datetime(value) -> Optional[datetime.datetime]:
+    """导入的时间转为本地时区的 naive 时间，与记录中保存的格式一致"""
+    if not value:
+        return None
+    parsed = datetime.datetime.fromisoformat(str(value).strip())
+    if timezone.is_aware(parsed):
+        parsed = timezone.make_naive(parsed)
+    return parsed
+
+
+class RecordImporter:
+    """
+    批量导入记录
+
+    - 每行按所属分类的 schema（RecordService.create_dynamic_schema 生成的 pydantic 模型）校验并规整字段值，
+      分类的 schema 在一次导入内只生成一次
+    - 通过校验的行攒满 batch_size 后用 insert_many 一次写入，同时维护统计汇总；检索文本在写入前生成
+    - enrich 不为 none 时，对应的行保存为 pending 并投递 process_record，由 worker 调用 LLM 补全
+    - 每写入一批调用 on_progress(stats)；指定 job 时进度同时写入缓存，供导入进度接口查询
+
+    行的格式与记录导出相同：title、text（原始文本）、category_id / category_name、created_at，
+    分类字段可以放在 content 对象里（NDJSON），也可以作为同名列（CSV，导出时重名的列带 content. 前缀）。
+    """
+
+    def __init__(self, user, category_id: str = '', enrich: str = 'none', batch_size: int = 500,
+                 job: Optional[str] = None, on_progress: Optional[Callable[[Dict], None]] = None):
+        if enrich not in ENRICH_CHOICES:
+            raise ValueError(f"enrich 只支持 {', '.join(ENRICH_CHOICES)}")
+
+        self.user = user
+        self.enrich = enrich
+        self.batch_size = batch_size
+        self.job = job
+        self.on_progress = on_progress
+        self.record_service = RecordService()
+        self.rollups = RollupService()
+
+        categories = list(Category.objects(Q(user=user) | Q(is_default=True)))
+        self._categories_by_id = {str(category.id): category for category in categories}
+        self._categories_by_name = {category.name: category for category in categories}
+        self.default_category = None
+        if category_id:
+            self.default_category = self._categories_by_id.get(str(category_id))
+            if self.default_category is None:
+                raise ValueError(f"分类不存在: {category_id}")
+
+        # 分类ID -> 编译好的 pydantic 模型，或编译失败的原因
+        self._schemas = {}
+        self.stats = {'read': 0, 'imported': 0, 'failed': 0, 'queued': 0, 'batches': 0, 'status': 'running'}
+        self.errors: List[Dict] = []
+
+    def schema(self, category: Category):
+        if category.id not in self._schemas:
+            try:
+                self._schemas[category.id] = self.record_service.create_dynamic_schema(category.field_specs)
+            except ValueError as e:
+                self._schemas[category.id] = ValueError(f"分类{category.name}的字段无法校验: {e}")
+        schema = self._schemas[category.id]
+        if isinstance(schema, Exception):
+            raise schema
+        return schema
+
+    def category_for(self, row: Dict) -> Category:
+        if category_id := row.get('category_id'):
+            category = self._categories_by_id.get(str(category_id))
+        elif category_name := row.get('category_name'):
+            category = self._categories_by_name.get(category_name)
+        else:
+            category = self.default_category
+        if category is None:
+            raise ValueError('分类不存在或未指定分类')
+        return category
+
+    def content_for(self, row: Dict, category: Category, text: str) -> Dict:
+        """取出分类字段并按 schema 校验，返回规整后的 content"""
+        if isinstance(row.get('content'), dict):
+            values = dict(row['content'])
+        else:
+            values = {}
+            for name in [spec.name for spec in category.field_specs or []] + ['tags']:
+                value = row.get(f'content.{name}', row.get(name))
+                # CSV 的空单元格视为未填写
+                if value is not None and value != '':
+                    values[name] = value
+
+        if isinstance(values.get('tags'), str):
+            values['tags'] = [tag.strip() for tag in values['tags'].split(',') if tag.strip()]
+
+        values['raw_text'] = text
+        # pydantic 的 ValidationError 是 ValueError 的子类
+        validated = self.schema(category)(**values)
+        return validated.dict(exclude={'raw_text'}, exclude_none=True)
+
+    def build(self, row: Dict) -> Record:
+        category = self.category_for(row)
+        text = str(row.get('text') or row.get('raw_text') or '')
+        title = str(row.get('title') or '')
+        content = self.content_for(row, category, text)
+
+        enrich = self.enrich == 'all' or (
+            self.enrich == 'missing' and not any(key != 'tags' for key in content)
+        )
+        if enrich and not text:
+            raise ValueError('需要 LLM 补全的行必须有 text')
+
+        now = datetime.datetime.now()
+        raw_inputs = [RawInput(type='text', content=text)] if text else []
+        record = Record(
+            title=title,
+            user=self.user,
+            category=category.id,
+            type=category.name,
+            raw_inputs=raw_inputs,
+            content=content,
+            raw_text=text,
+            search_text=build_search_text(title, [text], content),
+            is_processed=not enrich,
+            status=ProcessingStatus.PENDING.value if enrich else ProcessingStatus.DONE.value,
+            processed_at=None if enrich else now,
+            created_at=parse_datetime(row.get('created_at')) or now,
+            updated_at=now,
+        )
+        record.validate()
+        return record
+
+    def run(self, rows: Iterator[Tuple[int, object]]) -> Dict:
+        batch: List[Record] = []
+        for line_number, row in rows:
+            self.stats['read'] += 1
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                batch.append(self.build(row))
+            except (ValueError, TypeError, DocumentValidationError) as e:
+                self._fail(line_number, e)
+
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        if batch:
+            self.flush(batch)
+
+        self.stats['status'] = 'done'
+        if self.job:
+            self.set_progress(self.user, self.job, self.result())
+        return self.result()
+
+    def flush(self, batch: List[Record]):
+        documents = [record.to_mongo() for record in batch]
+        failed = set()
+        try:
+            Record._get_collection().insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                failed.add(error['index'])
+                self._fail(None, error.get('errmsg', '写入失败'))
+
+        inserted = []
+        for index, (record, document) in enumerate(zip(batch, documents)):
+            if index not in failed:
+                # insert_many 会把生成的 _id 写回文档
+                record.id = document['_id']
+                inserted.append(record)
+
+        self.rollups.apply([(None, self.rollups.snapshot(record)) for record in inserted if record.is_processed])
+        self._enqueue([record for record in inserted if not record.is_processed])
+
+        self.stats['imported'] += len(inserted)
+        self.stats['batches'] += 1
+        self._report()
+
+    def _enqueue(self, records: List[Record]):
+        if not records:
+            return
+        from ..tasks import process_record
+
+        for record in records:
+            process_record.delay(str(record.id))
+        self.stats['queued'] += len(records)
+
+    def _fail(self, line_number: Optional[int], error):
+        self.stats['failed'] += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({'line': line_number, 'error': str(error)[:500]})
+
+    def _report(self):
+        if self.job:
+            self.set_progress(self.user, self.job, self.result())
+        if self.on_progress:
+            self.on_progress(self.stats)
+
+    def result(self) -> Dict:
+        return {**self.stats, 'errors': self.errors}
+
+    @staticmethod
+    def set_progress(user, job: str, result: Dict):
+        cache.set(PROGRESS_KEY.format(user=user.id, job=job), result, timeout=PROGRESS_TIMEOUT)
+
+    @staticmethod
+    def get_progress(user, job: str) -> Optional[Dict]:
+        """进度按用户区分，只能查到自己的导入任务"""
+        return cache.get(PROGRESS_KEY.format(user=user.id, job=job))
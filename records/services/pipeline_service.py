@@ -0,0 +1,150 @@
+import datetime
+from typing import Dict, Optional
+
+from django.conf import settings
+from mongoengine.queryset.visitor import Q
+
+from ..cache.keys import record_key
+from ..cache.utils import safe_delete
+from ..models import ProcessingStatus, Record
+from .analytics_service import RollupService
+from .record_service import RecordService
+
+# 可以被领取处理的状态
+CLAIMABLE_STATUSES = [ProcessingStatus.PENDING.value, ProcessingStatus.FAILED.value]
+
+
+def stale_processing_cutoff() -> datetime.datetime:
+    """processing_started_at 早于该时间的 processing 记录视为 worker 已崩溃、可以重新领取"""
+    return datetime.datetime.now() - datetime.timedelta(seconds=getattr(settings, 'RECORD_PROCESSING_TIMEOUT', 600))
+
+
+def stale_processing_query(cutoff: datetime.datetime) -> Q:
+    """超时的 processing 记录；没有 processing_started_at 的是加字段之前卡住的记录，同样视为超时"""
+    return Q(status=ProcessingStatus.PROCESSING.value) & (
+        Q(processing_started_at__lt=cutoff) | Q(processing_started_at=None)
+    )
+
+
+class RecordPipeline:
+    """
+    记录处理流水线
+
+    保存记录不再触发任何处理，处理只在这里显式执行：
+    enqueue() 把记录置为 pending 并投递 Celery 任务，worker 调用 run() 完成
+    pending -> processing -> done / failed 的状态流转。
+
+    processing 状态带有领取时间，超过 RECORD_PROCESSING_TIMEOUT 仍未结束的记录视为 worker 崩溃，
+    可以被重新领取（requeue_stale 定时把它们重新入队）。处理结果只在领取时间未变时写回，
+    被重新领取后，原来的 worker 即使稍后完成也不会再写入结果和统计汇总。
+    """
+
+    def __init__(self):
+        self.record_service = RecordService()
+
+    def enqueue(self, record: Record) -> Record:
+        """
+        把记录置为 pending 并加入处理队列
+
+        正在处理中（且未超时）的记录不重复入队，避免两个 worker 同时处理同一条记录。
+        """
+        from ..tasks import process_record
+
+        queryable = Q(id=record.id) & (
+            Q(status__ne=ProcessingStatus.PROCESSING.value) | stale_processing_query(stale_processing_cutoff())
+        )
+        updated = Record.objects(queryable).update_one(
+            set__status=ProcessingStatus.PENDING.value,
+            set__error=None,
+            unset__processing_started_at=True,
+            set__updated_at=datetime.datetime.now(),
+        )
+        if not updated:
+            record.status = ProcessingStatus.PROCESSING.value
+            return record
+
+        record.status = ProcessingStatus.PENDING.value
+        record.error = None
+        safe_delete(record_key(record.id))
+        process_record.delay(str(record.id))
+        return record
+
+    def claim(self, record_id: str) -> Optional[Record]:
+        """
+        原子地把 pending/failed（或处理超时）的记录置为 processing，并记下领取时间
+
+        正在处理中或已完成的记录返回 None，避免同一条记录被重复处理。
+        """
+        now = datetime.datetime.now()
+        claimable = Q(id=record_id) & (
+            Q(status__in=CLAIMABLE_STATUSES) | stale_processing_query(stale_processing_cutoff())
+        )
+        return Record.objects(claimable).modify(
+            new=True,
+            set__status=ProcessingStatus.PROCESSING.value,
+            set__processing_started_at=now,
+            inc__attempts=1,
+            set__updated_at=now,
+        )
+
+    def _finish(self, record: Record, updates: Dict) -> bool:
+        """只在记录仍由本次领取持有时写回，返回是否写入"""
+        result = Record._get_collection().update_one(
+            {
+                '_id': record.id,
+                'status': ProcessingStatus.PROCESSING.value,
+                'processing_started_at': record.processing_started_at,
+            },
+            {'$set': updates, '$unset': {'processing_started_at': ''}},
+        )
+        safe_delete(record_key(record.id))
+        return result.matched_count > 0
+
+    def run(self, record_id: str) -> Dict:
+        """处理一条记录，返回最终状态"""
+        record = self.claim(record_id)
+        if record is None:
+            return {'record_id': record_id, 'status': 'skipped'}
+
+        rollups = RollupService()
+        before = rollups.snapshot(record)
+        try:
+            updates = self.record_service.process_record(record)
+        except Exception as e:
+            print(f"处理记录{record_id}失败: {e}")
+            self._finish(record, {
+                'status': ProcessingStatus.FAILED.value,
+                'error': str(e)[:500],
+                'updated_at': datetime.datetime.now(),
+            })
+            return {'record_id': record_id, 'status': ProcessingStatus.FAILED.value, 'error': str(e)}
+
+        if not self._finish(record, updates):
+            # 处理超时后已被重新领取或重新入队，结果交给新的处理，不再更新统计汇总
+            return {'record_id': record_id, 'status': 'superseded'}
+        rollups.apply([(before, rollups.snapshot(record, updates))])
+        return {'record_id': record_id, 'status': ProcessingStatus.DONE.value}
+
+    def requeue_stale(self) -> int:
+        """把处理超时（worker 崩溃）的记录重新入队，返回入队数量"""
+        count = 0
+        for record in Record.objects(stale_processing_query(stale_processing_cutoff())).only('id'):
+            self.enqueue(record)
+            count += 1
+        return count
+
+    def retry_failed(self, user=None, record_ids: list = None, max_attempts: int = 0) -> int:
+        """把处理失败的记录重新入队，返回入队数量"""
+        filters = {'status': ProcessingStatus.FAILED.value}
+        if user is not None:
+            filters['user'] = user
+        if record_ids:
+            filters['id__in'] = record_ids
+        if max_attempts:
+            filters['attempts__lt'] = max_attempts
+
+        count = 0
+        for record in Record.objects(**filters).only('id'):
+            self.enqueue(record)
+            count += 1
+        return count
@@ -1,6 +1,7 @@
 
 from typing import Dict, Any, Union, List
-from ..models import Record, Category
+from ..models import Record, Category, ProcessingStatus
+from django.conf import settings
 from accounts.models import User
 from ..llm_processor import LLMProcessor
 import datetime
@@ -8,10 +9,14 @@ from typing import Dict, Optional, List
 from mongoengine.queryset.visitor import Q 
 from pydantic import Field, BaseModel
 from ..models import RawInput
-from ..cache.utils import get_cached_or_fetch, serialize_model, deserialize_dict
+from ..cache.utils import get_cached_or_fetch, serialize_model, deserialize_dict, safe_delete
 from ..cache.keys import record_key, records_list_key
+from ..utils.search_utils import build_search_text, input_texts
+from .analytics_service import RollupService
 from django.core.paginator import Paginator
+from common.utils.instrumentation import stage_span
 import json
+from bson import ObjectId
 
 
 class RecordService:
@@ -24,10 +29,10 @@ class RecordService:
         """使用LLM创建记录，支持文件上传"""
 
         # 创建RawInput对象
-        raw_inputs = []
-        for input_data in raw_inputs_data:
-            raw_input = RawInput(**input_data)
-            raw_inputs.append(raw_input)
+        raw_inputs = self._build_raw_inputs(raw_inputs_data)
+
+        if getattr(settings, 'RECORD_PROCESSING_MODE', 'sync') == 'queued':
+            return self._create_pending_record(title, raw_inputs, user, category_id)
 
         # 从数据库中拿到LLM需要的分类数据，并处理成对应的格式      
         category_schema = self.getCategorySchema(user, category_id)
@@ -42,18 +47,113 @@ class RecordService:
             raw_inputs=raw_inputs,
             type=processing_result['type'],
             content=processing_result['content'],
+            raw_text=processing_result['raw_text'],
             is_processed=True,
             category=processing_result['category'],
             processed_at=datetime.datetime.now()
         )
 
-        record.save()
+        with stage_span('mongo_write'):
+            record.save()
+        RollupService().record_changed(None, record)
         return record
     
+    def _build_raw_inputs(self, raw_inputs_data: list) -> List[RawInput]:
+        """创建RawInput对象；识别结果只能由预处理写入，忽略客户端传入的值"""
+        return [
+            RawInput(**{key: value for key, value in input_data.items()
+                        if key not in ('extracted_text', 'engine_version')})
+            for input_data in raw_inputs_data
+        ]
+
+    def _create_pending_record(self, title: str, raw_inputs: list, user: User, category_id: str) -> Record:
+        """保存待处理的记录并投递到处理队列，由 worker 完成 LLM 处理"""
+        from ..tasks import process_record
+
+        record = Record(
+            title=title,
+            user=user,
+            raw_inputs=raw_inputs,
+            category=ObjectId(category_id) if category_id else None,
+            is_processed=False,
+            status=ProcessingStatus.PENDING.value,
+        )
+        with stage_span('mongo_write'):
+            record.save()
+        process_record.delay(str(record.id))
+        return record
+
+    def create_record_with_llm_stream(self, title: str, raw_inputs_data: list, user: User, category_id: str):
+        """
+        流式创建记录
+
+        转发 LLM 处理过程中的事件，处理完成后保存记录并产出 {'event': 'record', 'data': record}。
+        """
+        raw_inputs = self._build_raw_inputs(raw_inputs_data)
+        category_schema = self.getCategorySchema(user, category_id)
+
+        for event in self.llm_processor.process_inputs_stream(raw_inputs, category_schema, user=user):
+            if event['event'] != 'result':
+                yield event
+                continue
+
+            processing_result = event['data']
+            record = Record(
+                title=title,
+                user=user,
+                raw_inputs=raw_inputs,
+                type=processing_result['type'],
+                content=processing_result['content'],
+                raw_text=processing_result['raw_text'],
+                is_processed=True,
+                category=processing_result['category'],
+                processed_at=datetime.datetime.now()
+            )
+            with stage_span('mongo_write'):
+                record.save()
+            RollupService().record_changed(None, record)
+            yield {'event': 'record', 'data': record}
+
+    def process_record(self, record: Record, category_schema: Optional[Dict] = None,
+                       reclassify: bool = False) -> Dict[str, Any]:
+        """
+        用 LLM 重新处理一条已有记录，返回需要 $set 的原始字段（不保存）
+
+        默认沿用记录当前的分类，只重新提取；reclassify=True 时在用户全部分类中重新判定类型。
+        """
+        category_id = record.to_mongo().get('category')
+        if category_schema is None:
+            category_schema = self.getCategorySchema(
+                record.user, '' if reclassify or not category_id else str(category_id)
+            )
+
+        # 图片/语音的识别结果保存在 raw_inputs 上，引擎版本未变时预处理直接复用，不再重复 OCR/ASR
+        result = self.llm_processor.process_inputs(record.raw_inputs, category_schema, user=record.user)
+        now = datetime.datetime.now()
+        return {
+            'raw_inputs': [raw_input.to_mongo() for raw_input in record.raw_inputs],
+            'raw_text': result['raw_text'],
+            'search_text': build_search_text(record.title, input_texts(record.raw_inputs), result['content']),
+            'type': result['type'],
+            'content': result['content'],
+            'category': result.get('category', category_id),
+            'is_processed': True,
+            'status': ProcessingStatus.DONE.value,
+            'error': None,
+            'processed_at': now,
+            'updated_at': now,
+        }
+
     def reprocess_record(self, record: Record) -> Record:
         """重新处理记录"""
-        record.is_processed = False
-        record.save()  # 会触发clean方法中的自动处理
+        rollups = RollupService()
+        before = rollups.snapshot(record)
+        updates = self.process_record(record)
+        with stage_span('mongo_write'):
+            Record._get_collection().update_one({'_id': record.id}, {'$set': updates})
+        record.reload()
+        rollups.record_changed(before, record)
+        safe_delete(record_key(record.id))
         return record
 
 
@@ -0,0 +1,156 @@
+import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from ..cache.keys import record_key
+from ..cache.utils import safe_delete
+from ..models import Record, ReprocessCheckpoint
+from .analytics_service import RollupService
+from .record_service import RecordService
+
+class RateLimiter:
+    """令牌桶限速，多个线程共享；rate <= 0 表示不限速"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RecordReprocessor:
+    """
+    批量重新处理记录
+
+    - 按 _id 升序用游标流式读取匹配的记录，只取 _id，不一次性载入内存
+    - 每个分块内用线程池并行调用 LLM，令牌桶限制整体速率，避免挤占线上流量
+    - 每个分块处理完后用 bulk_write 一次写回，并把分块最后一个 _id 记为检查点（保存在 MongoDB）
+    - 同名任务再次运行时从检查点之后继续
+    """
+
+    def __init__(self, job: str, filters: Optional[Dict] = None, chunk_size: int = 50, workers: int = 4,
+                 rate: float = 2.0, reclassify: bool = False, limit: int = 0, dry_run: bool = False,
+                 on_progress: Optional[Callable[[Dict], None]] = None):
+        self.job = job
+        self.filters = filters or {}
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.limiter = RateLimiter(rate, burst=workers)
+        self.reclassify = reclassify
+        self.limit = limit
+        self.dry_run = dry_run
+        self.on_progress = on_progress
+        self.record_service = RecordService()
+        self.rollups = RollupService()
+        # 同一个 (用户, 分类) 的 schema 在任务内复用，避免每条记录都查库并重新生成 pydantic 模型
+        self._schemas = {}
+        self._schemas_lock = threading.Lock()
+        self.stats = {'processed': 0, 'failed': 0, 'chunks': 0, 'checkpoint': None}
+
+    def get_checkpoint(self) -> Optional[ObjectId]:
+        checkpoint = ReprocessCheckpoint.objects(job=self.job).only('last_id').first()
+        return checkpoint.last_id if checkpoint else None
+
+    def save_checkpoint(self, last_id: ObjectId):
+        ReprocessCheckpoint.objects(job=self.job).update_one(
+            set__last_id=last_id, set__updated_at=datetime.datetime.now(), upsert=True
+        )
+        self.stats['checkpoint'] = str(last_id)
+
+    def reset_checkpoint(self):
+        ReprocessCheckpoint.objects(job=self.job).delete()
+
+    def iter_chunks(self) -> Iterator[List[ObjectId]]:
+        """从检查点之后按 _id 升序分块产出记录 id"""
+        query = Record.objects(**self.filters)._query
+        checkpoint = self.get_checkpoint()
+        if checkpoint:
+            query = {'$and': [query, {'_id': {'$gt': checkpoint}}]}
+
+        cursor = Record._get_collection().find(
+            query, projection={'_id': 1}, sort=[('_id', 1)], batch_size=self.chunk_size * 4
+        )
+        if self.limit:
+            cursor = cursor.limit(self.limit)
+
+        chunk = []
+        for doc in cursor:
+            chunk.append(doc['_id'])
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _schema_for(self, record: Record) -> Dict:
+        category_id = record.to_mongo().get('category')
+        key = (record.to_mongo().get('user'), None if self.reclassify else category_id)
+        with self._schemas_lock:
+            schema = self._schemas.get(key)
+        if schema is None:
+            schema = self.record_service.getCategorySchema(
+                record.user, '' if self.reclassify or not category_id else str(category_id)
+            )
+            with self._schemas_lock:
+                self._schemas[key] = schema
+        return schema
+
+    def _process_one(self, record: Record) -> Optional[Tuple[Record, Dict]]:
+        self.limiter.acquire()
+        try:
+            updates = self.record_service.process_record(
+                record, category_schema=self._schema_for(record), reclassify=self.reclassify
+            )
+        except Exception as e:
+            print(f"重新处理记录{record.id}失败: {e}")
+            return None
+        return record, updates
+
+    def run(self) -> Dict:
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for ids in self.iter_chunks():
+                records = list(Record.objects(id__in=ids).select_related(max_depth=1))
+                results = list(executor.map(self._process_one, records))
+                succeeded = [result for result in results if result is not None]
+
+                if succeeded and not self.dry_run:
+                    Record._get_collection().bulk_write(
+                        [UpdateOne({'_id': record.id}, {'$set': updates}) for record, updates in succeeded],
+                        ordered=False,
+                    )
+                    for record in records:
+                        safe_delete(record_key(record.id))
+                    # 提取结果只写在 updates 里，record 对象上仍是处理前的内容
+                    self.rollups.apply([
+                        (self.rollups.snapshot(record), self.rollups.snapshot(record, updates))
+                        for record, updates in succeeded
+                    ])
+
+                self.stats['processed'] += len(succeeded)
+                self.stats['failed'] += len(results) - len(succeeded)
+                self.stats['chunks'] += 1
+                if not self.dry_run:
+                    self.save_checkpoint(ids[-1])
+                if self.on_progress:
+                    self.on_progress(dict(self.stats))
+        return self.stats
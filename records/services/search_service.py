@@ -0,0 +1,46 @@
+from typing import Dict
+
+from ..models import Record
+from ..utils.query_utils import build_record_query
+from ..utils.search_utils import tokenize
+
+MAX_PAGE_SIZE = 100
+
+
+class RecordSearchService:
+    """
+    记录检索
+
+    关键词通过 (user, search_text) 复合文本索引检索，search_text 是写入时用 jieba 分好词的文本，
+    按 Mongo textScore 排序；分类、标签、类型、时间等结构化条件与关键词组合过滤。
+    不带关键词时只做结构化过滤，按创建时间倒序。
+    """
+
+    def search(self, user, params) -> Dict:
+        page = max(int(params.get('page', 1)), 1)
+        page_size = min(max(int(params.get('page_size', 20)), 1), MAX_PAGE_SIZE)
+
+        queryset = Record.objects(build_record_query(params, user)).exclude('search_text')
+
+        keyword = (params.get('q') or '').strip()
+        tokens = tokenize(keyword)
+        if tokens:
+            # 多个词之间是"或"关系，命中词越多、词频越高 textScore 越高
+            queryset = queryset.search_text(' '.join(tokens)).order_by('$text_score', '-created_at')
+        else:
+            queryset = queryset.order_by('-created_at')
+
+        total_count = queryset.count()
+        skip = (page - 1) * page_size
+        records = list(queryset.skip(skip).limit(page_size))
+
+        return {
+            'records': records,
+            'scores': [record.get_text_score() if tokens else None for record in records],
+            'pagination': {
+                'page': page,
+                'page_size': page_size,
+                'total_count': total_count,
+                'total_pages': (total_count + page_size - 1) // page_size,
+            },
+        }
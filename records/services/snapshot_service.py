@@ -0,0 +1,412 @@
+import datetime
+import json
+import os
+import shutil
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from ..models import Category, Record
+from .analytics_service import to_number
+
+LOCK_KEY = 'a:records:snapshot:lock'
+LOCK_TIMEOUT = 6 * 3600
+
+# 内存中累积的行数达到该值时写出一批 Parquet 文件
+FLUSH_ROWS = 50_000
+
+# 记录本身的列，分类字段列排在之后；与之重名的分类字段加 content_ 前缀
+BASE_COLUMNS = ['id', 'title', 'type', 'status', 'is_processed', 'created_at', 'updated_at', 'tags']
+
+STATE_FILE = '_state.json'
+
+
+def _arrow():
+    """pyarrow 只在生成快照时导入，线上 web 进程不需要安装"""
+    import pyarrow
+    import pyarrow.parquet
+    return pyarrow
+
+
+def _text(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return str(value)
+
+
+def _bool(value) -> Optional[bool]:
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in ('true', '1', 'yes', '是'):
+            return True
+        if lowered in ('false', '0', 'no', '否'):
+            return False
+    return None
+
+
+def _timestamp(value) -> Optional[datetime.datetime]:
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.datetime.fromisoformat(value.strip())
+        except ValueError:
+            return None
+    return None
+
+
+def _list(value) -> Optional[List[str]]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, (list, tuple)):
+        value = [value]
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def _tz_naive(value):
+    """带时区的时间转为本地时区的 naive 时间，与 created_at 等字段一致"""
+    if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        return timezone.make_naive(value)
+    return value
+
+
+# field_type -> (Arrow 类型名, 转换函数)；LLM 提取的值类型不可靠，转换失败时为空值
+FIELD_TYPES = {
+    'number': ('float64', to_number),
+    'boolean': ('bool', _bool),
+    'date': ('timestamp', lambda value: _tz_naive(_timestamp(value))),
+    'array': ('list', _list),
+    'string': ('string', _text),
+    'reference': ('string', _text),
+}
+
+
+class CategoryLayout:
+    """一个分类的列布局：分类字段 -> (列名, Arrow 类型名, 转换函数)，同一分类的所有文件使用相同的 schema"""
+
+    def __init__(self, category: Optional[Category]):
+        self.fields: List[Tuple[str, str, str, Callable]] = []
+        for spec in (category.field_specs if category else None) or []:
+            if spec.name == 'tags' or any(spec.name == name for name, *_ in self.fields):
+                continue
+            column = f'content_{spec.name}' if spec.name in BASE_COLUMNS else spec.name
+            type_name, convert = FIELD_TYPES.get(spec.field_type, FIELD_TYPES['string'])
+            self.fields.append((spec.name, column, type_name, convert))
+
+    def schema(self):
+        pa = _arrow()
+        types = {
+            'float64': pa.float64(),
+            'bool': pa.bool_(),
+            'timestamp': pa.timestamp('ms'),
+            'list': pa.list_(pa.string()),
+            'string': pa.string(),
+        }
+        return pa.schema(
+            [
+                ('id', pa.string()),
+                ('title', pa.string()),
+                ('type', pa.string()),
+                ('status', pa.string()),
+                ('is_processed', pa.bool_()),
+                ('created_at', pa.timestamp('ms')),
+                ('updated_at', pa.timestamp('ms')),
+                ('tags', pa.list_(pa.string())),
+            ]
+            + [(column, types[type_name]) for _, column, type_name, _ in self.fields]
+        )
+
+    def row(self, raw: Dict) -> Dict:
+        content = raw.get('content') or {}
+        row = {
+            'id': str(raw['_id']),
+            'title': raw.get('title') or '',
+            'type': raw.get('type') or '',
+            'status': raw.get('status'),
+            'is_processed': bool(raw.get('is_processed')),
+            'created_at': raw.get('created_at'),
+            'updated_at': raw.get('updated_at'),
+            'tags': _list(content.get('tags')),
+        }
+        for name, column, _, convert in self.fields:
+            try:
+                row[column] = convert(content.get(name))
+            except (TypeError, ValueError):
+                row[column] = None
+        return row
+
+
+class RecordSnapshotService:
+    """
+    记录的列式分析快照
+
+    把记录按 user=<用户ID>/category=<分类ID> 分区写成 Parquet 文件（Hive 分区目录），content 按分类的
+    field_specs 展开为有类型的列，供 DuckDB 等在本地做重型统计，不查询线上 MongoDB。
+
+    增量：按 updated_at 的高水位只读取上次之后更新的记录，追加为新的文件；同一条记录的多个版本在查询时
+    按 updated_at 取最新（见 SnapshotQuery）。高水位取当前时间减去 ANALYTICS_SNAPSHOT_LAG_SECONDS，
+    避免漏掉正在写入的记录。
+
+    删除记录不会更新 updated_at，增量写入无法感知，由整体重建（压缩）去掉：某个用户的分类分区文件数超过
+    ANALYTICS_SNAPSHOT_MAX_PARTS，或距上次重建超过 ANALYTICS_SNAPSHOT_COMPACT_HOURS 时，从 MongoDB
+    整体重建该用户的快照，同时合并小文件。定期重建每次最多 ANALYTICS_SNAPSHOT_COMPACT_PER_RUN 个用户，
+    按上次重建时间从早到晚轮转，不活跃的用户也会被定期清理。
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = os.path.join(root or settings.ANALYTICS_SNAPSHOT_ROOT, 'records')
+        self.lag = datetime.timedelta(seconds=getattr(settings, 'ANALYTICS_SNAPSHOT_LAG_SECONDS', 60))
+        self.max_parts = getattr(settings, 'ANALYTICS_SNAPSHOT_MAX_PARTS', 48)
+        self.compact_interval = datetime.timedelta(hours=getattr(settings, 'ANALYTICS_SNAPSHOT_COMPACT_HOURS', 24))
+        self.compact_per_run = getattr(settings, 'ANALYTICS_SNAPSHOT_COMPACT_PER_RUN', 20)
+        self._layouts: Dict[Optional[ObjectId], CategoryLayout] = {}
+
+    # ---- 状态：高水位和各用户上次重建的时间 ----
+
+    @property
+    def state_path(self) -> str:
+        return os.path.join(self.root, STATE_FILE)
+
+    def _read_state(self) -> Dict:
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_state(self, state: Dict):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def get_watermark(self) -> Optional[datetime.datetime]:
+        value = self._read_state().get('watermark')
+        return datetime.datetime.fromisoformat(value) if value else None
+
+    def set_watermark(self, value: datetime.datetime):
+        state = self._read_state()
+        state['watermark'] = value.isoformat()
+        self._write_state(state)
+
+    def mark_compacted(self, user_ids: Iterable):
+        """记下用户的重建时间；快照目录已不存在的用户一并从状态中去掉"""
+        state = self._read_state()
+        compacted = state.get('compacted') or {}
+        now = datetime.datetime.now().isoformat()
+        for user_id in user_ids:
+            compacted[str(user_id)] = now
+        state['compacted'] = {
+            user_id: value for user_id, value in compacted.items()
+            if os.path.isdir(os.path.join(self.root, f'user={user_id}'))
+        }
+        self._write_state(state)
+
+    def compaction_due(self) -> List[str]:
+        """距上次重建超过 compact_interval 的用户，从最久没有重建的开始，最多 compact_per_run 个"""
+        if not os.path.isdir(self.root):
+            return []
+        compacted = self._read_state().get('compacted') or {}
+        cutoff = (datetime.datetime.now() - self.compact_interval).isoformat()
+        due = []
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if not entry.is_dir() or not entry.name.startswith('user='):
+                    continue
+                user_id = entry.name[len('user='):]
+                last = compacted.get(user_id, '')
+                if last < cutoff:
+                    due.append((last, user_id))
+        due.sort()
+        return [user_id for _, user_id in due[:self.compact_per_run]]
+
+    # ---- 写入 ----
+
+    def layout(self, category_id) -> CategoryLayout:
+        if category_id not in self._layouts:
+            category = Category.objects(id=category_id).only('field_specs').first() if category_id else None
+            self._layouts[category_id] = CategoryLayout(category)
+        return self._layouts[category_id]
+
+    def partition_dir(self, user_id, category_id, root: Optional[str] = None) -> str:
+        return os.path.join(root or self.root, f'user={user_id}', f'category={category_id or "none"}')
+
+    def write(self, rows: Iterable[Dict], user_root: Optional[Dict] = None) -> Dict[str, int]:
+        """
+        把 as_pymongo() 的原始文档按 (用户, 分类) 分组写成 Parquet 文件，返回 {用户ID: 行数}
+
+        user_root 可以把某些用户的文件写到别的目录（重建时写入临时目录）。
+        """
+        pa = _arrow()
+        # 文件名带时间和随机串，多次运行、重建写入同一分区时不会覆盖已有文件
+        tag = f"{datetime.datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+        buffers = defaultdict(list)
+        buffered = 0
+        sequence = 0
+        counts = defaultdict(int)
+
+        def flush():
+            nonlocal sequence
+            for (user_id, category_id), items in buffers.items():
+                layout = self.layout(category_id)
+                directory = self.partition_dir(user_id, category_id, (user_root or {}).get(user_id))
+                os.makedirs(directory, exist_ok=True)
+                path = os.path.join(directory, f'part-{tag}-{sequence:05d}.parquet')
+                table = pa.Table.from_pylist(items, schema=layout.schema())
+                # 先写临时文件再改名，查询时不会读到写了一半的文件
+                pa.parquet.write_table(table, path + '.tmp', compression='zstd')
+                os.replace(path + '.tmp', path)
+                sequence += 1
+            buffers.clear()
+
+        for raw in rows:
+            user_id, category_id = raw.get('user'), raw.get('category')
+            buffers[(user_id, category_id)].append(self.layout(category_id).row(raw))
+            counts[str(user_id)] += 1
+            buffered += 1
+            if buffered >= FLUSH_ROWS:
+                flush()
+                buffered = 0
+        flush()
+        return dict(counts)
+
+    def _records(self, query: Dict):
+        return (
+            Record.objects(__raw__=query)
+            .exclude('raw_inputs', 'raw_text', 'search_text', 'file_data')
+            .no_cache()
+            .batch_size(1000)
+            .as_pymongo()
+        )
+
+    @contextmanager
+    def _lock(self):
+        if not cache.add(LOCK_KEY, 1, timeout=LOCK_TIMEOUT):
+            raise RuntimeError('已有快照任务在运行')
+        try:
+            yield
+        finally:
+            cache.delete(LOCK_KEY)
+
+    def run(self) -> Dict:
+        """增量快照：写入上次高水位之后更新的记录，并重建文件过多或到期需要压缩的用户分区"""
+        with self._lock():
+            watermark = self.get_watermark()
+            upper = datetime.datetime.now() - self.lag
+            query = {'updated_at': {'$lt': upper}}
+            if watermark:
+                # 与上次边界相同时间更新的记录可能重复写入，查询时按 id 去重
+                query['updated_at']['$gte'] = watermark
+
+            counts = self.write(self._records(query))
+            self.set_watermark(upper)
+
+            rebuilt = [user_id for user_id in counts if self.part_count(user_id) > self.max_parts]
+            rebuilt += [user_id for user_id in self.compaction_due() if user_id not in rebuilt]
+            for user_id in rebuilt:
+                self._rebuild_user(user_id)
+
+        return {
+            'watermark': upper.isoformat(),
+            'records': sum(counts.values()),
+            'users': len(counts),
+            'rebuilt': rebuilt,
+        }
+
+    def part_count(self, user_id) -> int:
+        """用户下文件最多的分类分区的文件数"""
+        count = 0
+        for _, _, files in os.walk(os.path.join(self.root, f'user={user_id}')):
+            count = max(count, sum(1 for name in files if name.endswith('.parquet')))
+        return count
+
+    def rebuild(self, user_id=None) -> Dict:
+        """从 MongoDB 重新生成某个用户（或全部）的快照"""
+        with self._lock():
+            if user_id is not None:
+                return {'records': self._rebuild_user(user_id), 'users': 1}
+
+            upper = datetime.datetime.now() - self.lag
+            shutil.rmtree(self.root, ignore_errors=True)
+            counts = self.write(self._records({'updated_at': {'$lt': upper}}))
+            self.set_watermark(upper)
+            self.mark_compacted(counts)
+            return {'records': sum(counts.values()), 'users': len(counts)}
+
+    def _rebuild_user(self, user_id) -> int:
+        """写到临时目录后替换原分区，重建期间查询仍能读到旧文件"""
+        user_dir = os.path.join(self.root, f'user={user_id}')
+        tmp_root = os.path.join(self.root, f'.rebuild-{user_id}')
+        shutil.rmtree(tmp_root, ignore_errors=True)
+
+        counts = self.write(self._records({'user': ObjectId(str(user_id))}),
+                            user_root={ObjectId(str(user_id)): tmp_root})
+
+        shutil.rmtree(user_dir, ignore_errors=True)
+        if os.path.isdir(os.path.join(tmp_root, f'user={user_id}')):
+            os.replace(os.path.join(tmp_root, f'user={user_id}'), user_dir)
+        shutil.rmtree(tmp_root, ignore_errors=True)
+        self.mark_compacted([user_id])
+        return sum(counts.values())
+
+
+class SnapshotQuery:
+    """
+    用 DuckDB 查询快照
+
+        SnapshotQuery(user).query("SELECT type, sum(amount) FROM records GROUP BY type")
+
+    records 视图只包含该用户的分区，同一条记录的多个版本只保留 updated_at 最新的一条；
+    分类的字段列按名称合并，其他分类没有的列为 NULL。快照落后线上数据一个快照周期。
+    SQL 直接交给 DuckDB 执行，只供后台脚本和管理命令使用，不能接收用户输入。
+    """
+
+    def __init__(self, user_id, root: Optional[str] = None):
+        self.user_dir = os.path.join(root or settings.ANALYTICS_SNAPSHOT_ROOT, 'records', f'user={user_id}')
+
+    def connect(self):
+        import duckdb
+
+        connection = duckdb.connect()
+        if not os.path.isdir(self.user_dir):
+            raise ValueError('该用户还没有快照')
+        pattern = os.path.join(self.user_dir, '**', '*.parquet').replace("'", "''")
+        connection.execute(f"""
+            CREATE VIEW records AS
+            SELECT * EXCLUDE (rn) FROM (
+                SELECT *, row_number() OVER (PARTITION BY id ORDER BY updated_at DESC) AS rn
+                FROM read_parquet('{pattern}', hive_partitioning = true,
+                                  hive_types_autocast = false, union_by_name = true)
+            ) WHERE rn = 1
+        """)
+        return connection
+
+    def query(self, sql: str, params: Optional[list] = None) -> List[Dict]:
+        connection = self.connect()
+        try:
+            cursor = connection.execute(sql, params or [])
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            connection.close()
+
+    def arrow(self, sql: str, params: Optional[list] = None):
+        """返回 Arrow 表，便于交给 pandas/polars 继续处理"""
+        connection = self.connect()
+        try:
+            return connection.execute(sql, params or []).arrow()
+        finally:
+            connection.close()
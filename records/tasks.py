@@ -0,0 +1,112 @@
+
+from django.conf import settings
+from celery_batches import Batches
+
+from sovo.celery import app
+
+
+def _mark_results(requests, results):
+    """把批量结果逐个写回各自任务的结果存储"""
+    for request, result in zip(requests, results):
+        if isinstance(result, Exception):
+            app.backend.mark_as_failure(request.id, result, request=request)
+        else:
+            app.backend.mark_as_done(request.id, result, request=request)
+
+
+@app.task(
+    base=Batches,
+    name='records.tasks.ocr_image',
+    flush_every=getattr(settings, 'INFERENCE_BATCH_SIZE', 8),
+    flush_interval=getattr(settings, 'INFERENCE_BATCH_INTERVAL', 0.05),
+)
+def ocr_image(requests):
+    """OCR推理任务（微批）：凑满一批或到达时间间隔后统一识别"""
+    from .llm_processor.inference import get_engine
+
+    file_paths = [request.args[0] for request in requests]
+    _mark_results(requests, get_engine().ocr_batch(file_paths))
+
+
+@app.task(
+    base=Batches,
+    name='records.tasks.transcribe_audio',
+    flush_every=getattr(settings, 'INFERENCE_BATCH_SIZE', 8),
+    flush_interval=getattr(settings, 'INFERENCE_BATCH_INTERVAL', 0.05),
+)
+def transcribe_audio(requests):
+    """ASR推理任务（微批）：语音片段成批解码"""
+    from .llm_processor.inference import get_engine
+
+    file_paths = [request.args[0] for request in requests]
+    _mark_results(requests, get_engine().transcribe_batch(file_paths))
+
+
+@app.task(name='records.tasks.reprocess_records')
+def reprocess_records(filters: dict, job_options: dict, reset: bool = False):
+    """批量重新处理记录（在 batch 队列的 worker 中执行，不占用线上 worker）"""
+    import datetime
+    from bson import ObjectId
+    from .services.reprocess_service import RecordReprocessor
+
+    # 任务参数经过 JSON 序列化，还原 ObjectId 和时间
+    for key in ('user', 'category'):
+        if filters.get(key):
+            filters[key] = ObjectId(filters[key])
+    if filters.get('created_at__gte'):
+        filters['created_at__gte'] = datetime.datetime.fromisoformat(filters['created_at__gte'])
+
+    reprocessor = RecordReprocessor(
+        filters=filters,
+        on_progress=lambda stats: print(f"[reprocess:{job_options.get('job')}] {stats}"),
+        **job_options,
+    )
+    if reset:
+        reprocessor.reset_checkpoint()
+    return reprocessor.run()
+
+
+@app.task(name='records.tasks.import_records')
+def import_records(user_id: str, path: str, input_format: str, options: dict):
+    """批量导入记录（batch 队列），导入文件处理完后删除"""
+    import os
+    from accounts.models import User
+    from .services.import_service import RecordImporter, open_import_file, read_rows
+
+    user = User.objects.get(id=user_id)
+    importer = RecordImporter(user, **options)
+    try:
+        with open_import_file(path) as stream:
+            return importer.run(read_rows(stream, input_format))
+    except Exception as e:
+        print(f"导入记录失败: {e}")
+        importer.stats['status'] = 'failed'
+        importer.set_progress(user, importer.job, {**importer.result(), 'error': str(e)})
+        raise
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@app.task(name='records.tasks.snapshot_records')
+def snapshot_records():
+    """增量更新记录的 Parquet 分析快照（batch 队列）"""
+    from .services.snapshot_service import RecordSnapshotService
+
+    return RecordSnapshotService().run()
+
+
+@app.task(name='records.tasks.process_record')
+def process_record(record_id: str):
+    """处理一条待处理记录（pending/failed -> processing -> done/failed）"""
+    from .services.pipeline_service import RecordPipeline
+
+    return RecordPipeline().run(record_id)
+
+
+@app.task(name='records.tasks.requeue_stale_records')
+def requeue_stale_records():
+    """把处理超时（worker 崩溃后一直停在 processing）的记录重新入队"""
+    from .services.pipeline_service import RecordPipeline
+
+    return RecordPipeline().requeue_stale()
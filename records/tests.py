@@ -1,3 +1,419 @@
-from django.test import TestCase
+import datetime
+import json
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import mongomock
+from bson import ObjectId
+from django.http import QueryDict
+from django.test import SimpleTestCase
+from mongoengine import connect, disconnect
+
+from accounts.models import User
+from common.utils.renderers import ORJSONRenderer
+from .llm_processor.gateway import CircuitBreaker, CircuitOpenError
+from .llm_processor.prompt_budget import ExtractionPromptBuilder, count_tokens
+from .llm_processor.router import LLMBackend, LLMRouter, TASK_CLASSIFICATION, TASK_EXTRACTION
+from .llm_processor.streaming import IncrementalJSONParser, MalformedOutputError
+from .models import Category, DailyRollup, FieldSpec, RawInput, Record
+from .serializers import RecordListSerializer, RecordSerializer
+from .services.analytics_service import RollupService, record_tags, to_number
+from .utils import search_utils
+from .utils.query_utils import build_record_query
+
+NOW = datetime.datetime(2025, 1, 1, 12, 0, 0)
+
+
+class MongoTestCase(SimpleTestCase):
+    """用 mongomock 替换默认连接，每个测试前清空集合"""
+
+    collections = (User, Category, Record, DailyRollup)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        disconnect(alias='default')
+        connect('sovo_test', host='mongodb://localhost', alias='default',
+                mongo_client_class=mongomock.MongoClient)
+
+    @classmethod
+    def tearDownClass(cls):
+        disconnect(alias='default')
+        super().tearDownClass()
+
+    def setUp(self):
+        for document in self.collections:
+            document.drop_collection()
+
+
+class IncrementalJSONParserTests(SimpleTestCase):
+
+    def feed_all(self, text, step=1):
+        parser = IncrementalJSONParser()
+        members = []
+        for i in range(0, len(text), step):
+            members.extend(parser.feed(text[i:i + step]))
+        return members, parser.close()
+
+    def test_members_complete_as_soon_as_they_end(self):
+        parser = IncrementalJSONParser()
+        self.assertEqual(parser.feed('{"amount": 28'), [])
+        self.assertEqual(parser.feed(', "item"'), [('amount', 28)])
+        self.assertEqual(parser.feed(': "面"}'), [('item', '面')])
+        self.assertEqual(parser.close(), {'amount': 28, 'item': '面'})
+
+    def test_nested_values_and_delimiters_inside_strings(self):
+        text = '```json\n{"a": {"b": [1, 2]}, "c": "x,}\\"]", "d": null}\n```'
+        for step in (1, 3, len(text)):
+            members, result = self.feed_all(text, step)
+            self.assertEqual([name for name, _ in members], ['a', 'c', 'd'])
+            self.assertEqual(result, {'a': {'b': [1, 2]}, 'c': 'x,}"]', 'd': None})
+
+    def test_empty_object(self):
+        self.assertEqual(self.feed_all('{}')[1], {})
+        self.assertEqual(self.feed_all(' { } ')[1], {})
+
+    def test_empty_members_are_rejected(self):
+        for text in ('{"a": 1,}', '{,"a": 1}', '{"a": 1,, "b": 2}', '{ , }'):
+            with self.subTest(text=text), self.assertRaises(MalformedOutputError):
+                self.feed_all(text)
+
+    def test_malformed_output(self):
+        for text in ('{"a": tru}', '{"a": 1]', 'x' * 100 + '{"a": 1}'):
+            with self.subTest(text=text), self.assertRaises(MalformedOutputError):
+                self.feed_all(text)
+
+    def test_truncated_output(self):
+        parser = IncrementalJSONParser()
+        parser.feed('{"a": 1, "b": ')
+        with self.assertRaises(MalformedOutputError):
+            parser.close()
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def make_breaker(self):
+        return CircuitBreaker(f'test-{ObjectId()}', failure_threshold=2, recovery_seconds=30)
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = self.make_breaker()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.record_success()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+        self.assertFalse(breaker.available())
+
+    def test_half_open_allows_a_single_probe(self):
+        breaker = self.make_breaker()
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.opened_at -= breaker.recovery_seconds
+        self.assertTrue(breaker.available())
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(breaker.allow())
+
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow())
+
+    def test_failed_probe_reopens(self):
+        breaker = self.make_breaker()
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.opened_at -= breaker.recovery_seconds
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_released_probe_can_be_retried(self):
+        breaker = self.make_breaker()
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.opened_at -= breaker.recovery_seconds
+        self.assertTrue(breaker.allow())
+        breaker.release_probe()
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.allow())
+
+
+class FakeRunnable:
+    """按顺序返回结果或抛出异常的链"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def next_outcome(self):
+        self.calls += 1
+        outcome = self.outcomes[min(self.calls, len(self.outcomes)) - 1]
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    def invoke(self, input, config=None):
+        return self.next_outcome()
+
+    def stream(self, input, config=None):
+        yield from self.next_outcome()
+
+
+class LLMRouterTests(SimpleTestCase):
+
+    def make_backend(self, **kwargs):
+        # 网关按名称在进程内共享，每个测试使用新的名称
+        return LLMBackend(name=f'test-{ObjectId()}', base_url='http://localhost', model='test', api_key='x', **kwargs)
+
+    def test_fails_over_to_next_backend(self):
+        down, up = self.make_backend(), self.make_backend()
+        chains = {down.name: FakeRunnable(ConnectionError('refused')), up.name: FakeRunnable('ok')}
+        router = LLMRouter([down, up])
+        for _ in range(5):
+            self.assertEqual(router.invoke(TASK_EXTRACTION, lambda backend: chains[backend.name], {}), 'ok')
+
+    def test_open_breaker_is_tried_last(self):
+        down, up = self.make_backend(), self.make_backend()
+        for _ in range(down.gateway.breaker.failure_threshold):
+            down.gateway.breaker.record_failure()
+        router = LLMRouter([down, up])
+        self.assertEqual(router.candidates(TASK_EXTRACTION), [up, down])
+        with self.assertRaises(CircuitOpenError):
+            down.gateway.invoke(FakeRunnable('ok'), {})
+
+        # 唯一可用的后端也失败时，熔断中的后端直接拒绝，抛出的是熔断错误
+        with self.assertRaises(CircuitOpenError):
+            router.invoke(TASK_EXTRACTION, lambda backend: FakeRunnable(ConnectionError('refused')), {})
+
+    def test_raises_last_error_when_all_backends_fail(self):
+        backends = [self.make_backend(), self.make_backend()]
+        router = LLMRouter(backends)
+        with self.assertRaises(ConnectionError):
+            router.invoke(TASK_EXTRACTION, lambda backend: FakeRunnable(ConnectionError('refused')), {})
+
+    def test_output_errors_do_not_fail_over(self):
+        chain = FakeRunnable(ValueError('bad output'))
+        router = LLMRouter([self.make_backend(), self.make_backend()])
+        with self.assertRaises(ValueError):
+            router.invoke(TASK_EXTRACTION, lambda backend: chain, {})
+        self.assertEqual(chain.calls, 1)
+
+    def test_routes_by_task(self):
+        small = self.make_backend(tasks=[TASK_CLASSIFICATION])
+        large = self.make_backend(tasks=[TASK_EXTRACTION])
+        router = LLMRouter([small, large])
+        self.assertEqual(router.candidates(TASK_CLASSIFICATION), [small])
+        self.assertEqual(router.candidates(TASK_EXTRACTION), [large])
+
+    def test_stream_fails_over_before_first_chunk(self):
+        down, up = self.make_backend(), self.make_backend()
+        chains = {down.name: FakeRunnable(ConnectionError('refused')), up.name: FakeRunnable(['a', 'b'])}
+        router = LLMRouter([down, up])
+        chunks = list(router.stream(TASK_EXTRACTION, lambda backend: chains[backend.name], {}))
+        self.assertEqual(chunks, ['a', 'b'])
+
+
+class ExtractionPromptBuilderTests(SimpleTestCase):
+    schema_info = {'amount': '金额', 'item': '消费项目'}
+
+    def make_tags(self):
+        tags = [SimpleNamespace(name='餐饮', description='吃饭、外卖、牛肉面'),
+                SimpleNamespace(name='交通', description='地铁、打车')]
+        tags += [SimpleNamespace(name=f'标签{i}', description=f'无关的描述{i}' * 5) for i in range(200)]
+        return tags
+
+    def test_within_budget_keeps_all_tags(self):
+        tags = self.make_tags()[:2]
+        content, stats = ExtractionPromptBuilder(max_tokens=10000).build(self.schema_info, tags, '午饭')
+        self.assertFalse(stats['tags_trimmed'])
+        self.assertEqual(stats['tags_included'], 2)
+        self.assertIn('餐饮(吃饭、外卖、牛肉面)', content)
+
+    def test_trims_to_most_relevant_tags_within_budget(self):
+        builder = ExtractionPromptBuilder(max_tokens=600, top_k=30, tag_min_tokens=50)
+        text = '中午吃了一碗牛肉面'
+        content, stats = builder.build(self.schema_info, self.make_tags(), text)
+        self.assertTrue(stats['tags_trimmed'])
+        self.assertEqual(stats['tags_total'], 202)
+        self.assertLessEqual(stats['tags_included'], 30)
+        self.assertLessEqual(stats['prompt_tokens_estimate'], 600)
+        self.assertIn('餐饮', content)
+        self.assertEqual(stats['prompt_tokens_estimate'], count_tokens(content) + count_tokens(text))
+
+    def test_long_input_still_gets_reserved_tag_budget(self):
+        builder = ExtractionPromptBuilder(max_tokens=300, top_k=30, tag_min_tokens=50)
+        text = '牛肉面' * 500
+        content, stats = builder.build(self.schema_info, self.make_tags(), text)
+        self.assertTrue(stats['tags_trimmed'])
+        self.assertGreaterEqual(stats['tags_included'], 1)
+        self.assertIn('餐饮', content)
+
+
+class SearchQueryTests(MongoTestCase):
+
+    def test_tokenize(self):
+        self.assertEqual(search_utils.tokenize(''), [])
+        self.assertEqual(search_utils.tokenize('Hello WORLD a@b.com'), ['hello', 'world', 'a@b.com'])
+        self.assertIn('牛肉', search_utils.tokenize('牛肉面28元'))
+        self.assertIn('28', search_utils.tokenize('牛肉面28元'))
+
+    def test_tokenize_without_jieba_uses_bigrams(self):
+        with mock.patch.object(search_utils, '_jieba', return_value=None):
+            self.assertEqual(search_utils.tokenize('牛肉面 x 饭'), ['牛肉', '肉面', 'x', '饭'])
+
+    def test_build_record_query(self):
+        user = User(username='query', password='x').save()
+        other = User(username='other', password='x').save()
+        food = Category(name='餐饮', user=user).save()
+        trip = Category(name='出行', user=user).save()
+        a = Record(user=user, category=food, type='expense', content={'tags': ['午饭', '公司']},
+                   created_at=datetime.datetime(2025, 1, 1, 12)).save()
+        b = Record(user=user, category=food, type='expense', content={'tags': ['午饭']},
+                   created_at=datetime.datetime(2025, 1, 2, 23, 59)).save()
+        c = Record(user=user, category=trip, type='note', content={'tags': ['公司']},
+                   created_at=datetime.datetime(2025, 1, 3)).save()
+        Record(user=other, category=food, type='expense', content={'tags': ['午饭']}).save()
+
+        def ids(params):
+            return {record.id for record in Record.objects(build_record_query(QueryDict(params), user))}
+
+        self.assertEqual(ids(''), {a.id, b.id, c.id})
+        self.assertEqual(ids(f'category={food.id}'), {a.id, b.id})
+        self.assertEqual(ids('type=note'), {c.id})
+        self.assertEqual(ids('tags=午饭,公司'), {a.id})
+        self.assertEqual(ids('tags=午饭&tags=公司'), {a.id})
+        self.assertEqual(ids('date_range=2025-01-02,2025-01-02'), {b.id})
+        self.assertEqual(ids('date_from=2025-01-02'), {b.id, c.id})
+        self.assertEqual(ids('date_to=2025-01-01'), {a.id})
+        with self.assertRaises(ValueError):
+            build_record_query(QueryDict('category=nope'), user)
+
+
+class RollupServiceTests(MongoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User(username='rollup', password='x').save()
+        self.category = Category(name='账单', user=self.user, field_specs=[
+            FieldSpec(name='amount', field_type='number'),
+            FieldSpec(name='item', field_type='string'),
+        ]).save()
+
+    def create(self, content, is_processed=True, created_at=NOW):
+        record = Record(user=self.user, category=self.category, content=content,
+                        is_processed=is_processed, created_at=created_at).save()
+        RollupService().record_changed(None, record)
+        return record
+
+    def rollups(self):
+        return sorted(
+            (row['day'], row['tag'] or '', row['count'], round(row.get('sums', {}).get('amount', 0.0), 6))
+            for row in DailyRollup._get_collection().find()
+            if row['count']
+        )
+
+    def assert_rebuild_matches(self):
+        incremental = self.rollups()
+        RollupService().rebuild(user=self.user)
+        self.assertEqual(self.rollups(), incremental)
+        return incremental
+
+    def test_normalization(self):
+        self.assertEqual(to_number('1,200.5'), 1200.5)
+        self.assertEqual(to_number(3), 3.0)
+        self.assertIsNone(to_number('abc'))
+        self.assertIsNone(to_number(True))
+        self.assertEqual(record_tags({'tags': 'a, b,a,'}), ['a', 'b'])
+        self.assertEqual(record_tags({'tags': [' a', '', 'c']}), ['a', 'c'])
+
+    def test_create_and_rebuild(self):
+        self.create({'amount': '1,200.5', 'tags': 'a, b,a'})
+        self.create({'amount': 3, 'tags': [' a', '', 'c']})
+        self.create({'amount': 'abc'}, created_at=NOW + datetime.timedelta(days=1))
+        self.create({'amount': 5}, is_processed=False)
+
+        day, next_day = datetime.datetime(2025, 1, 1), datetime.datetime(2025, 1, 2)
+        self.assertEqual(self.assert_rebuild_matches(), [
+            (day, '', 2, 1203.5),
+            (day, 'a', 2, 1203.5),
+            (day, 'b', 1, 1200.5),
+            (day, 'c', 1, 3.0),
+            (next_day, '', 1, 0.0),
+        ])
+
+    def test_update_moves_the_contribution(self):
+        service = RollupService()
+        record = self.create({'amount': 10, 'tags': ['a']})
+        self.create({'amount': 1, 'tags': ['b']})
+
+        before = service.snapshot(record)
+        record.content = {'amount': '2.5', 'tags': ['b']}
+        record.save()
+        service.record_changed(before, record)
+
+        day = datetime.datetime(2025, 1, 1)
+        self.assertEqual(self.assert_rebuild_matches(), [(day, '', 2, 3.5), (day, 'b', 2, 3.5)])
+
+    def test_pending_updates_and_delete(self):
+        service = RollupService()
+        record = Record(user=self.user, category=self.category, content={}, is_processed=False,
+                        created_at=NOW).save()
+        updates = {'is_processed': True, 'content': {'amount': 4, 'tags': ['a']}}
+        service.apply([(service.snapshot(record), service.snapshot(record, updates))])
+        Record.objects(id=record.id).update(set__is_processed=True, set__content=updates['content'])
+        self.assert_rebuild_matches()
+
+        record.reload()
+        before = service.snapshot(record)
+        record.delete()
+        service.record_changed(before)
+        self.assertEqual(self.rollups(), [])
+        RollupService().rebuild(user=self.user)
+        self.assertEqual(self.rollups(), [])
+
+
+class RecordListSerializerTests(MongoTestCase):
+
+    def build_records(self):
+        record = Record(
+            id=ObjectId(),
+            user=ObjectId(),
+            title='记录',
+            category=ObjectId(),
+            type='expense',
+            raw_inputs=[
+                RawInput(type='text', content='牛肉面28元', file_path='', file_size=0, uploaded_at=NOW),
+                RawInput(type='image', file_path='image/1.jpg', file_size=1024, uploaded_at=NOW,
+                         extracted_text='牛肉面 28.00', engine_version='ocr/v1'),
+            ],
+            content={'amount': 28.0, 'paid_at': NOW, 'ref': ObjectId(), 'tags': ['餐饮']},
+            raw_text='牛肉面28元',
+            is_processed=True,
+            processed_at=NOW,
+            created_at=NOW,
+            updated_at=NOW,
+        )
+        # 历史记录：没有状态机字段和分类
+        legacy = record.to_mongo().to_dict()
+        legacy['_id'] = ObjectId()
+        for key in ('status', 'attempts', 'category', 'raw_text', 'processed_at'):
+            legacy.pop(key, None)
+        return [record.to_mongo().to_dict(), legacy]
+
+    def render(self, data):
+        # 与接口一样经渲染器输出，content 中的 ObjectId、日期由渲染器转换
+        return json.loads(ORJSONRenderer().render(data))
+
+    def test_same_output_as_record_serializer(self):
+        rows = self.build_records()
+        expected = RecordSerializer([Record._from_son(row) for row in rows], many=True).data
+        self.assertEqual(self.render(RecordListSerializer(rows, many=True).data), self.render(expected))
+
+    def test_search_text_is_not_exposed(self):
+        row = self.build_records()[0]
+        row['search_text'] = '牛肉 面'
+        self.assertNotIn('search_text', RecordListSerializer(row).data)
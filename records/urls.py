@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import RecordViewSet, CategoryViewSet, SchemaViewSet, TagViewSet
+from .views import RecordViewSet, CategoryViewSet, SchemaViewSet, TagViewSet, AnalyticsView
 
 router = DefaultRouter()
 router.register(r'records', RecordViewSet, basename='record')
@@ -10,4 +10,5 @@ router.register(r'tags', TagViewSet, basename='tag')
 urlpatterns = [
     path('', include(router.urls)),
     path('schema-info/', SchemaViewSet.as_view(), name='schema-info'),
+    path('analytics/', AnalyticsView.as_view(), name='analytics'),
 ]
@@ -1,17 +1,60 @@
-from django.db.models import Q
+import datetime
 
-def build_record_query(params, user):
-    """构建复杂查询条件"""
+from bson import ObjectId
+from mongoengine.queryset.visitor import Q
+
+
+def parse_date(value: str, end_of_day: bool = False) -> datetime.datetime:
+    """解析 YYYY-MM-DD 或 ISO 格式时间；只有日期时，end_of_day=True 取当天最后一刻"""
+    parsed = datetime.datetime.fromisoformat(value.strip())
+    if end_of_day and len(value.strip()) == 10:
+        parsed = parsed + datetime.timedelta(days=1) - datetime.timedelta(microseconds=1)
+    return parsed
+
+
+def parse_date_range(date_range: str):
+    """解析 "开始,结束" 格式的时间范围，任意一端可以为空"""
+    start, _, end = date_range.partition(',')
+    return (
+        parse_date(start) if start.strip() else None,
+        parse_date(end, end_of_day=True) if end.strip() else None,
+    )
+
+
+def build_record_query(params, user) -> Q:
+    """
+    构建记录过滤条件
+
+    支持 category、type、tags（可多次传入或逗号分隔，需全部命中）、
+    date_range（开始,结束）以及 date_from / date_to。
+    """
     query = Q(user=user)
-    
+
     if category_id := params.get('category'):
-        query &= Q(category=category_id)
-    
-    if tags := params.getlist('tags'):
-        query &= Q(tags__all=tags)
-    
+        if not ObjectId.is_valid(category_id):
+            raise ValueError(f"无效的分类ID: {category_id}")
+        query &= Q(category=ObjectId(category_id))
+
+    if record_type := params.get('type'):
+        query &= Q(type=record_type)
+
+    tags = params.getlist('tags') if hasattr(params, 'getlist') else params.get('tags') or []
+    if isinstance(tags, str):
+        tags = [tags]
+    tags = [tag.strip() for value in tags for tag in value.split(',') if tag.strip()]
+    if tags:
+        query &= Q(content__tags__all=tags)
+
+    start, end = None, None
     if date_range := params.get('date_range'):
         start, end = parse_date_range(date_range)
-        query &= Q(created_at__gte=start, created_at__lte=end)
-    
-    return query
\ No newline at end of file
+    if date_from := params.get('date_from'):
+        start = parse_date(date_from)
+    if date_to := params.get('date_to'):
+        end = parse_date(date_to, end_of_day=True)
+    if start:
+        query &= Q(created_at__gte=start)
+    if end:
+        query &= Q(created_at__lte=end)
+
+    return query
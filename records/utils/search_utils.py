@@ -0,0 +1,80 @@
+import re
+from typing import Iterable, List
+
+# 写入 search_text 的最大词数，防止超长记录撑大文本索引
+MAX_SEARCH_TOKENS = 2000
+
+_WORD_PATTERN = re.compile(r'[一-鿿]+|[a-zA-Z0-9_.@]+')
+
+
+def _jieba():
+    """jieba 首次使用时才导入并加载词典"""
+    try:
+        import jieba
+    except ImportError:
+        return None
+    return jieba
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    中文分词
+
+    Mongo 文本索引按空白切词，不认识中文，所以写入和查询前都先分词再用空格连接。
+    有 jieba 时使用搜索引擎模式（同时产出长词和其中的短词），没有时退化为中文二元组。
+    """
+    if not text:
+        return []
+
+    jieba = _jieba()
+    tokens = []
+    for word in _WORD_PATTERN.findall(text.lower()):
+        if not '一' <= word[0] <= '鿿':
+            tokens.append(word)
+        elif jieba is not None:
+            tokens.extend(t for t in jieba.cut_for_search(word) if t.strip())
+        elif len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def _flatten(value) -> Iterable[str]:
+    """展开 content 中的值，只取可检索的文本和数字"""
+    if value is None or isinstance(value, bool):
+        return
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from _flatten(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _flatten(item)
+    elif isinstance(value, (str, int, float)):
+        yield str(value)
+
+
+def build_search_text(title: str = '', texts: Iterable[str] = (), content: dict = None) -> str:
+    """把标题、原始输入文本和提取结果拼成分好词的检索文本"""
+    parts = [title or '']
+    parts.extend(text for text in texts if text)
+    parts.extend(_flatten(content or {}))
+
+    tokens = tokenize(' '.join(parts))
+    return ' '.join(tokens[:MAX_SEARCH_TOKENS])
+
+
+def input_texts(raw_inputs) -> List[str]:
+    """原始输入中可检索的文本：文本输入的内容，以及图片/语音已保存的识别结果"""
+    texts = []
+    for raw_input in raw_inputs or []:
+        if raw_input.type == 'text':
+            texts.append(raw_input.content)
+        elif raw_input.extracted_text:
+            texts.append(raw_input.extracted_text)
+    return texts
+
+
+def record_search_text(record) -> str:
+    """按记录当前内容生成检索文本"""
+    return build_search_text(record.title, input_texts(record.raw_inputs), record.content)
@@ -2,10 +2,12 @@ from .record_view import RecordViewSet
 from .category_view import CategoryViewSet
 from .schema_view import SchemaViewSet
 from .tag_view import TagViewSet
+from .analytics_view import AnalyticsView
 
 __all__ = [
     'RecordViewSet', 
     'CategoryViewSet',
     'SchemaViewSet',
-    'TagViewSet'
+    'TagViewSet',
+    'AnalyticsView'
 ]
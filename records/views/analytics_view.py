@@ -0,0 +1,46 @@
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from drf_spectacular.types import OpenApiTypes
+
+from ..services.analytics_service import AnalyticsService, GROUP_BY_CHOICES
+
+
+class AnalyticsView(APIView):
+    """记录统计：按分类、标签、天、月汇总 number 类型字段"""
+
+    @extend_schema(
+        tags=['记录统计'],
+        summary='记录统计汇总',
+        description='基于按天增量维护的汇总数据，统计记录数和分类中 number 类型字段（如金额）的合计。'
+                    '按标签统计时，一条记录有多个标签会分别计入每个标签',
+        parameters=[
+            OpenApiParameter(name='group_by', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='汇总维度，默认 category', enum=list(GROUP_BY_CHOICES)),
+            OpenApiParameter(name='category', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='分类ID'),
+            OpenApiParameter(name='tags', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='只统计带这些标签的记录，逗号分隔'),
+            OpenApiParameter(name='fields', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='需要合计的字段，逗号分隔，默认为涉及分类的全部 number 字段'),
+            OpenApiParameter(name='date_from', type=OpenApiTypes.DATE, location=OpenApiParameter.QUERY,
+                             description='开始日期（含）'),
+            OpenApiParameter(name='date_to', type=OpenApiTypes.DATE, location=OpenApiParameter.QUERY,
+                             description='结束日期（含）'),
+        ],
+    )
+    def get(self, request):
+        try:
+            result = AnalyticsService().summary(request.user, request.query_params)
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'error': str(e),
+                'message': '统计参数错误'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'success': True,
+            **result,
+        })
@@ -4,7 +4,7 @@ from rest_framework.exceptions import ValidationError
 from rest_framework import serializers
 from ..models import Category
 from accounts.models.user_model import User
-from ..serializers import CategorySerializer
+from ..serializers import CategorySerializer, CategoryListSerializer
 from rest_framework.decorators import action
 from django.db.models import Q
 from drf_spectacular.utils import (
@@ -91,7 +91,12 @@ class CategoryViewSet(viewsets.ModelViewSet):
         ],
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        # 只读列表直接取原始文档，用预编译的字段表序列化，不构造 Document
+        queryset = self.filter_queryset(self.get_queryset()).as_pymongo()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(CategoryListSerializer(page, many=True).data)
+        return Response(CategoryListSerializer(queryset, many=True).data)
   
 
     @extend_schema(
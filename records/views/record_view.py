@@ -1,17 +1,78 @@
+from bson import ObjectId
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.settings import api_settings
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 from drf_spectacular.types import  OpenApiTypes
 
 from ..models import Record
-from ..serializers import RecordSerializer
+from ..serializers import RecordSerializer, RecordListSerializer
 from ..services.record_service import RecordService
+from ..services.pipeline_service import RecordPipeline
+from ..services.search_service import RecordSearchService
+from ..services.analytics_service import RollupService
+from ..services.export_service import CONTENT_TYPES, EXPORT_FORMATS, RecordExportService
+from ..services.import_service import ENRICH_CHOICES, IMPORT_FORMATS, RecordImporter, guess_format
+from common.models.storage import file_storage
 from common.models.upload_model import UploadedFile
 from common.services.upload_service import UploadFileService
+from common.utils.instrumentation import traced
+from common.utils.renderers import EventStreamRenderer
+from common.utils.references import ReferenceResolver
+from common.serializers.fields import parse_expand
 
 import json
+import uuid
+
+
+# 创建记录的 form-data 请求体
+RECORD_CREATE_REQUEST = {
+    'multipart/form-data': {
+        'type': 'object',
+        'properties': {
+            'title': {
+                'type': 'string',
+                'description': '记录标题',
+                'nullable': True
+            },
+            'files': {
+                'type': 'array',
+                'items': {
+                    'type': 'string',
+                    'format': 'binary'
+                },
+                'description': '上传的文件数组',
+            },
+            'raw_inputs': {
+                'type': 'string',           # ← 明确写 string，不是 array
+                'description': '原始输入数组（JSON 字符串格式）',
+                'example': '[{"type": "text", "content": "1111"}]'
+            },
+            'category_id': {
+                'type': 'string',
+                'description': '分类ID',
+                'nullable': True
+            }
+        }
+    }
+}
+
+
+EXPAND_PARAMETER = OpenApiParameter(
+    name='expand', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+    description='需要展开的引用字段，目前支持 category（输出分类ID和名称），默认只返回引用ID',
+)
+
+
+def _sse(event: str, data) -> str:
+    """格式化一条 Server-Sent Events 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
 
 class RecordViewSet(viewsets.ModelViewSet):
     serializer_class = RecordSerializer
@@ -22,78 +83,55 @@ class RecordViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Record.objects.filter(user=self.request.user)
     
+    def _prepare_request_data(self, request) -> dict:
+        """解析 form-data 中 JSON 字符串形式的 raw_inputs，并把上传的文件追加为原始输入"""
+        request_data = request.data.dict() if hasattr(request.data, 'dict') else dict(request.data)
+        # form-data 特别处理json字符串
+        raw_inputs_str = request_data.get('raw_inputs', '')
+        raw_inputs = []
+        try:
+            if isinstance(raw_inputs_str, str) and raw_inputs_str.strip():
+                raw_inputs = json.loads(raw_inputs_str)
+
+        except json.JSONDecodeError:
+            print('JSON解析失败，使用空列表')
+
+        # 4. 确保raw_inputs是列表类型
+        if not isinstance(raw_inputs, list):
+            raw_inputs = [raw_inputs] if raw_inputs else []
+        
+        files_list = request.FILES.getlist('files')
+
+        if files_list:
+            upload_file_service = UploadFileService()
+            uploaded_files = upload_file_service.upload_file(files_list, request.user)
+            if len(uploaded_files) > 0:
+                for uploaded_file in uploaded_files:
+                    raw_inputs.append({
+                        'type': uploaded_file.file_type,
+                        'content': '文件描述信息',
+                        'file_path': uploaded_file.file_path,
+                    })
+            del request_data['files']
+
+        request_data['raw_inputs'] = raw_inputs
+        return request_data
+
     @extend_schema(
         tags=['记录'],
         summary='创建新记录',
         description='创建记录并支持每个原始输入项上传文件',
-        request={
-            'multipart/form-data': {
-                'type': 'object',
-                'properties': {
-                    'title': {
-                        'type': 'string',
-                        'description': '记录标题',
-                        'nullable': True
-                    },
-                    'files': {
-                        'type': 'array',
-                        'items': {
-                            'type': 'string',
-                            'format': 'binary'
-                        },
-                        'description': '上传的文件数组',
-                    },
-                    'raw_inputs': {
-                        'type': 'string',           # ← 明确写 string，不是 array
-                        'description': '原始输入数组（JSON 字符串格式）',
-                        'example': '[{"type": "text", "content": "1111"}]'
-                    },
-                    'category_id': {
-                        'type': 'string',
-                        'description': '分类ID',
-                        'nullable': True
-                    }
-                }
-            }
-        },
+        request=RECORD_CREATE_REQUEST,
         responses={
             201: RecordSerializer,
             400: OpenApiResponse(description="无效输入"),
         }
     )
+    @traced('record.create')
     def create(self, request, *args, **kwargs):
         parser_classes = [MultiPartParser, FormParser]
         try:
-            request_data = request.data.dict() if hasattr(request.data, 'dict') else dict(request.data)
-            # form-data 特别处理json字符串
-            raw_inputs_str = request_data.get('raw_inputs', '')
-            raw_inputs = []
-            try:
-                if isinstance(raw_inputs_str, str) and raw_inputs_str.strip():
-                    raw_inputs = json.loads(raw_inputs_str)
-
-            except json.JSONDecodeError:
-                print('JSON解析失败，使用空列表')
-
-            # 4. 确保raw_inputs是列表类型
-            if not isinstance(raw_inputs, list):
-                raw_inputs = [raw_inputs] if raw_inputs else []
-            
-            files_list = request.FILES.getlist('files')
-
-            if files_list:
-                upload_file_service = UploadFileService()
-                uploaded_files = upload_file_service.upload_file(files_list, request.user)
-                if len(uploaded_files) > 0:
-                    for uploaded_file in uploaded_files:
-                        raw_inputs.append({
-                            'type': uploaded_file.file_type,
-                            'content': '文件描述信息',
-                            'file_path': uploaded_file.file_path,
-                        })
-                del request_data['files']
-
-            request_data['raw_inputs'] = raw_inputs
+            request_data = self._prepare_request_data(request)
             serializer = RecordSerializer(data=request_data, context={'request': request})
             
             if serializer.is_valid():
@@ -129,16 +167,275 @@ class RecordViewSet(viewsets.ModelViewSet):
                 'message': '创建记录时发生异常'
             }, status=status.HTTP_400_BAD_REQUEST)
     
+    @extend_schema(
+        tags=['记录'],
+        summary='流式创建记录',
+        description=(
+            '与创建记录参数相同，以 Server-Sent Events 推送处理进度：'
+            'text(语音识别过程中的部分文本 partial_text，以及最终识别出的文本 raw_text)、type(记录类型)、field(逐个提取出的字段)、field_error、retry，'
+            '最后推送 record(创建好的记录) 或 error'
+        ),
+        request=RECORD_CREATE_REQUEST,
+        responses={
+            (200, 'text/event-stream'): OpenApiTypes.STR,
+            400: OpenApiResponse(description="无效输入"),
+        }
+    )
+    @action(detail=False, methods=['post'], url_path='stream',
+            renderer_classes=[*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer])
+    def create_stream(self, request):
+        try:
+            request_data = self._prepare_request_data(request)
+        except Exception as e:
+            return Response({
+                'success': False,
+                'error': str(e),
+                'message': '创建记录时发生异常'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = RecordSerializer(data=request_data, context={'request': request})
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'error': serializer.errors,
+                'message': '创建记录失败，输入验证错误'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        validated_data = serializer.validated_data
+        if not validated_data.get('raw_inputs'):
+            return Response({
+                'success': False,
+                'error': 'raw_inputs 不能为空',
+                'message': '创建记录失败，输入验证错误'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        events = RecordService().create_record_with_llm_stream(
+            title=validated_data.get('title', ''),
+            raw_inputs_data=validated_data['raw_inputs'],
+            user=request.user,
+            category_id=validated_data.get('category_id', ''),
+        )
+        response = StreamingHttpResponse(self._stream_events(events), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # 关闭 nginx 缓冲，事件立即下发
+        return response
+
+    def _stream_events(self, events):
+        """把处理事件转换为 SSE 消息"""
+        try:
+            for event in events:
+                data = event['data']
+                if event['event'] == 'record':
+                    data = RecordSerializer(data).data
+                yield _sse(event['event'], data)
+        except Exception as e:
+            print(f"流式创建记录失败: {e}")
+            yield _sse('error', {'message': '创建记录时发生异常', 'error': str(e)})
+
     @extend_schema(
         tags=['记录'],
         summary='查询记录列表',
         description='查询用户记录列表',
+        parameters=[EXPAND_PARAMETER],
     )
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.serializer_class(queryset, many=True)
+        if not parse_expand(request.query_params, RecordSerializer.expandable_fields):
+            # 只读列表直接取原始文档，用预编译的字段表序列化，不构造 Document
+            records = self.get_queryset().exclude('search_text').as_pymongo()
+            return Response(RecordListSerializer(records, many=True).data)
+
+        records = list(self.get_queryset())
+        serializer = self.serializer_class(records, many=True, context=self._expand_context(request, records))
         return Response(serializer.data)
 
+    def _expand_context(self, request, records: list) -> dict:
+        """解析 ?expand=，需要展开的引用先批量取回，避免序列化时逐条查询"""
+        expand = parse_expand(request.query_params, RecordSerializer.expandable_fields)
+        if expand:
+            ReferenceResolver().resolve(records, expand)
+        return {'expand': expand}
+
+    @extend_schema(
+        tags=['记录'],
+        summary='检索记录',
+        description='按关键词检索标题、输入文本和提取结果（按相关度排序），可组合分类、标签、类型和时间过滤',
+        parameters=[
+            OpenApiParameter(name='q', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='关键词，为空时只做过滤并按创建时间倒序'),
+            OpenApiParameter(name='category', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='分类ID'),
+            OpenApiParameter(name='type', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='记录类型'),
+            OpenApiParameter(name='tags', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='标签，可多次传入或逗号分隔，需全部命中'),
+            OpenApiParameter(name='date_from', type=OpenApiTypes.DATE, location=OpenApiParameter.QUERY,
+                             description='创建时间起（含）'),
+            OpenApiParameter(name='date_to', type=OpenApiTypes.DATE, location=OpenApiParameter.QUERY,
+                             description='创建时间止（含）'),
+            OpenApiParameter(name='page', type=OpenApiTypes.INT, location=OpenApiParameter.QUERY,
+                             description='页码，默认为1', default=1),
+            OpenApiParameter(name='page_size', type=OpenApiTypes.INT, location=OpenApiParameter.QUERY,
+                             description='每页数量，默认为20，最大100', default=20),
+            EXPAND_PARAMETER,
+        ],
+    )
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """检索记录"""
+        try:
+            result = RecordSearchService().search(request.user, request.query_params)
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'error': str(e),
+                'message': '检索参数错误'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        records = result['records']
+        data = RecordSerializer(records, many=True, context=self._expand_context(request, records)).data
+        for item, score in zip(data, result['scores']):
+            item['score'] = score
+        return Response({
+            'success': True,
+            'data': data,
+            'pagination': result['pagination'],
+        })
+
+    @extend_schema(
+        tags=['记录'],
+        summary='导出记录',
+        description='以 NDJSON 或 CSV 流式导出当前用户的记录，列为记录字段加分类 field_specs 中的字段，'
+                    '过滤条件与检索相同；数据边查询边输出，可选 gzip 压缩',
+        parameters=[
+            OpenApiParameter(name='output_format', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='导出格式，默认 ndjson', enum=list(EXPORT_FORMATS)),
+            OpenApiParameter(name='gzip', type=OpenApiTypes.BOOL, location=OpenApiParameter.QUERY,
+                             description='是否 gzip 压缩，默认 false'),
+            OpenApiParameter(name='category', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='分类ID，指定时只输出该分类的字段列'),
+            OpenApiParameter(name='type', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='记录类型'),
+            OpenApiParameter(name='tags', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='标签，可多次传入或逗号分隔，需全部命中'),
+            OpenApiParameter(name='date_from', type=OpenApiTypes.DATE, location=OpenApiParameter.QUERY,
+                             description='创建时间起（含）'),
+            OpenApiParameter(name='date_to', type=OpenApiTypes.DATE, location=OpenApiParameter.QUERY,
+                             description='创建时间止（含）'),
+        ],
+        responses={
+            (200, 'application/x-ndjson'): OpenApiTypes.STR,
+            (200, 'text/csv'): OpenApiTypes.STR,
+            400: OpenApiResponse(description="参数错误"),
+        }
+    )
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """导出记录"""
+        # format 是 DRF 内容协商保留的参数名，这里用 output_format
+        output_format = request.query_params.get('output_format') or 'ndjson'
+        compress = request.query_params.get('gzip', '').lower() in ('1', 'true', 'yes')
+        try:
+            if output_format not in EXPORT_FORMATS:
+                raise ValueError(f"导出格式只支持 {', '.join(EXPORT_FORMATS)}")
+            export = RecordExportService(request.user, request.query_params)
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'error': str(e),
+                'message': '导出参数错误'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        filename = f"records_{timezone.localtime():%Y%m%d_%H%M%S}.{output_format}"
+        if compress:
+            filename += '.gz'
+        response = StreamingHttpResponse(
+            export.stream(output_format, compress),
+            content_type='application/gzip' if compress else CONTENT_TYPES[output_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    @extend_schema(
+        tags=['记录'],
+        summary='批量导入记录',
+        description='上传 NDJSON 或 CSV（可 gzip 压缩）文件，在后台按分类字段校验后分批写入，'
+                    '返回任务ID，通过 records/import/{job}/ 查询进度。行的格式与记录导出相同',
+        request={
+            'multipart/form-data': {
+                'type': 'object',
+                'properties': {
+                    'file': {'type': 'string', 'format': 'binary', 'description': '导入文件'},
+                    'input_format': {'type': 'string', 'enum': list(IMPORT_FORMATS),
+                                     'description': '文件格式，默认按扩展名判断'},
+                    'category_id': {'type': 'string', 'description': '行中未指定分类时使用的分类ID'},
+                    'enrich': {'type': 'string', 'enum': list(ENRICH_CHOICES),
+                               'description': '导入后是否加入 LLM 处理队列补全字段，默认 none'},
+                },
+                'required': ['file'],
+            }
+        },
+        responses={
+            202: OpenApiResponse(description="已加入导入队列"),
+            400: OpenApiResponse(description="无效输入"),
+        }
+    )
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser, FormParser])
+    def import_records(self, request):
+        """批量导入记录"""
+        from ..tasks import import_records
+
+        upload = request.FILES.get('file')
+        try:
+            if upload is None:
+                raise ValueError('请上传导入文件')
+            input_format = request.data.get('input_format') or guess_format(upload.name)
+            if input_format not in IMPORT_FORMATS:
+                raise ValueError(f"导入格式只支持 {', '.join(IMPORT_FORMATS)}")
+            options = {
+                'category_id': request.data.get('category_id') or '',
+                'enrich': request.data.get('enrich') or 'none',
+            }
+            # 在投递前检查分类和参数，错误直接返回
+            RecordImporter(request.user, **options)
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'error': str(e),
+                'message': '导入参数错误'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        job = uuid.uuid4().hex
+        suffix = '.gz' if upload.name.lower().endswith('.gz') else ''
+        path = file_storage.path(file_storage.save(f'imports/{job}.{input_format}{suffix}', upload))
+        RecordImporter.set_progress(request.user, job, {'status': 'queued'})
+        import_records.delay(str(request.user.id), path, input_format, {**options, 'job': job})
+        return Response({
+            'success': True,
+            'message': '已加入导入队列',
+            'job': job,
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @extend_schema(
+        tags=['记录'],
+        summary='查询导入进度',
+        description='返回已读取、已导入、失败、加入处理队列的行数，status 为 queued/running/done/failed，'
+                    'errors 为前 100 个失败行的行号和原因',
+    )
+    @action(detail=False, methods=['get'], url_path=r'import/(?P<job>[0-9a-f]+)')
+    def import_progress(self, request, job=None):
+        """查询导入进度"""
+        progress = RecordImporter.get_progress(request.user, job)
+        if progress is None:
+            return Response({
+                'success': False,
+                'message': '导入任务不存在或已过期'
+            }, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'success': True,
+            'data': progress,
+        })
+
     @extend_schema(
         tags=['记录'],
         summary='查询记录详情',
@@ -174,10 +471,17 @@ class RecordViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         serializer = self.serializer_class(instance, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            self.perform_update(serializer)
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def perform_update(self, serializer):
+        """保存修改，content、分类变化时同步更新统计汇总"""
+        rollups = RollupService()
+        before = rollups.snapshot(serializer.instance)
+        instance = serializer.save()
+        rollups.record_changed(before, instance)
+
     @extend_schema(
         tags=['记录'],
         summary='重新处理记录',
@@ -187,6 +491,14 @@ class RecordViewSet(viewsets.ModelViewSet):
     def reprocess(self, request, pk=None):
         """重新处理记录"""
         record = self.get_object()
+
+        if getattr(settings, 'RECORD_PROCESSING_MODE', 'sync') == 'queued':
+            RecordPipeline().enqueue(record)
+            return Response({
+                'message': '记录正在处理中' if record.status == 'processing' else '记录已加入处理队列',
+                'status': record.status,
+            }, status=status.HTTP_202_ACCEPTED)
+
         record_service = RecordService()
         updated_record = record_service.reprocess_record(record)
         
@@ -197,6 +509,42 @@ class RecordViewSet(viewsets.ModelViewSet):
             'content': updated_record.content
         })
 
+    @extend_schema(
+        tags=['记录'],
+        summary='重试处理失败的记录',
+        description='把当前用户处理失败（status=failed）的记录重新加入处理队列，可通过 ids 只重试指定记录',
+        request={
+            'application/json': {
+                'type': 'object',
+                'properties': {
+                    'ids': {
+                        'type': 'array',
+                        'items': {'type': 'string'},
+                        'description': '要重试的记录ID，不传则重试全部失败记录',
+                    },
+                },
+            }
+        },
+    )
+    @action(detail=False, methods=['post'], url_path='retry_failed')
+    def retry_failed(self, request):
+        """重试处理失败的记录"""
+        ids = request.data.get('ids') or None
+        if ids is not None and (not isinstance(ids, list)
+                                or not all(isinstance(i, str) and ObjectId.is_valid(i) for i in ids)):
+            return Response({
+                'success': False,
+                'error': 'ids 必须是记录ID数组',
+                'message': '重试失败，输入验证错误'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        count = RecordPipeline().retry_failed(user=request.user, record_ids=ids)
+        return Response({
+            'success': True,
+            'message': f'已重新加入处理队列 {count} 条记录',
+            'count': count,
+        }, status=status.HTTP_202_ACCEPTED)
+
     @extend_schema(
         tags=['记录'],
         summary='删除记录',
@@ -205,7 +553,10 @@ class RecordViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         """删除记录"""
         instance = self.get_object()
+        rollups = RollupService()
+        before = rollups.snapshot(instance)
         self.perform_destroy(instance)
+        rollups.record_changed(before)
         return Response(status=status.HTTP_204_NO_CONTENT)
     
     @extend_schema(
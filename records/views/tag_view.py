@@ -3,8 +3,10 @@ from rest_framework import viewsets, status
 from rest_framework.response import Response
 import datetime
 from ..models import Tag, Category
-from ..serializers import TagSerializer
+from ..serializers import TagSerializer, TagListSerializer
 from drf_spectacular.utils import extend_schema, OpenApiParameter
+from common.utils.references import ReferenceResolver
+from common.serializers.fields import parse_expand
 
 
 class TagViewSet(viewsets.ModelViewSet):
@@ -23,6 +25,9 @@ class TagViewSet(viewsets.ModelViewSet):
             OpenApiParameter(
                 name="name", description="标签名称", required=False, type=str
             ),
+            OpenApiParameter(
+                name="expand", description="需要展开的引用字段，目前支持 category，默认只返回引用ID", required=False, type=str
+            ),
         ],
     )
     def list(self, request, *args, **kwargs):
@@ -40,9 +45,19 @@ class TagViewSet(viewsets.ModelViewSet):
 
         # 执行查询并序列化数据
         queryset = self.filter_queryset(self.get_queryset())
+        expand = self.get_serializer_context()['expand']
+        if not expand:
+            # 只读列表直接取原始文档，用预编译的字段表序列化，不构造 Document
+            queryset = queryset.as_pymongo()
         page = self.paginate_queryset(queryset)
+        if expand:
+            # 需要展开的分类一次 $in 取回
+            if page is not None:
+                ReferenceResolver().resolve(page, expand)
+            else:
+                queryset = ReferenceResolver().resolve(queryset, expand)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
+            serializer = self._list_serializer(page, expand)
             return self.get_paginated_response({
                 'code': status.HTTP_200_OK,
                 'message': '获取标签列表成功',
@@ -50,7 +65,7 @@ class TagViewSet(viewsets.ModelViewSet):
                 'timestamp': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             })
 
-        serializer = self.get_serializer(queryset, many=True)
+        serializer = self._list_serializer(queryset, expand)
         return Response({
             'code': status.HTTP_200_OK,
             'message': '获取标签列表成功',
@@ -198,4 +213,14 @@ class TagViewSet(viewsets.ModelViewSet):
         
     def get_queryset(self):
         return Tag.objects.filter(user=self.request.user)
+
+    def _list_serializer(self, items, expand):
+        if expand:
+            return self.get_serializer(items, many=True)
+        return TagListSerializer(items, many=True)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['expand'] = parse_expand(self.request.query_params, TagSerializer.expandable_fields)
+        return context
         
\ No newline at end of file
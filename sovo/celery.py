@@ -3,6 +3,9 @@ import sys
 # 将项目根目录添加到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Celery worker 中的任务会读取 Django 配置
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sovo.settings')
+
 from celery import Celery
 
 from celery.schedules import crontab
@@ -19,8 +22,30 @@ app.conf.beat_schedule = {
         'task': 'sovo.tasks.cleanup_temp_files',
         'schedule': crontab(hour=23, minute=59),  
     },
+    # 每小时增量更新一次记录的分析快照
+    'snapshot-records': {
+        'task': 'records.tasks.snapshot_records',
+        'schedule': crontab(minute=15),
+    },
+    # 每 10 分钟把处理超时的记录重新入队
+    'requeue-stale-records': {
+        'task': 'records.tasks.requeue_stale_records',
+        'schedule': crontab(minute='*/10'),
+    },
 }
 app.conf.timezone = 'Asia/Shanghai'
 app.conf.enable_utc = False
 
-app.autodiscover_tasks(['sovo.tasks'])
+# OCR/ASR 推理任务走独立队列，由专门的 worker 消费：
+# celery -A sovo worker -Q inference --concurrency=<CPU核数> --prefetch-multiplier=16
+app.conf.task_routes = {
+    'records.tasks.ocr_image': {'queue': 'inference'},
+    'records.tasks.transcribe_audio': {'queue': 'inference'},
+    # 批量重新处理走 batch 队列，避免占用处理线上请求的 worker
+    'records.tasks.reprocess_records': {'queue': 'batch'},
+    'records.tasks.import_records': {'queue': 'batch'},
+    'records.tasks.snapshot_records': {'queue': 'batch'},
+    'sovo.tasks.cleanup_temp_files': {'queue': 'batch'},
+}
+
+app.autodiscover_tasks(['sovo.tasks', 'records'])
@@ -16,9 +16,11 @@ from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
 import os
+import json
 
 # mongodb 
 from mongoengine import connect
+from common.utils.query_profiler import QueryProfilerListener
 
 # 根据环境加载不同的.env文件
 if os.path.exists('/.dockerenv'):
@@ -73,6 +75,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'common.middleware.query_profiler.QueryProfilerMiddleware',  # MongoDB 查询统计
 ]
 
 
@@ -129,6 +132,11 @@ DATABASES = {
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
 
+# MongoDB 查询统计（pymongo 命令监听 + 请求级统计中间件）
+QUERY_PROFILER_ENABLED = os.getenv('QUERY_PROFILER_ENABLED', 'True').lower() == 'true'
+QUERY_PROFILER_HEADERS = os.getenv('QUERY_PROFILER_HEADERS', str(DEBUG)).lower() == 'true'  # 是否写入 X-Mongo-* 响应头
+QUERY_PROFILER_N_PLUS_ONE_THRESHOLD = int(os.getenv('QUERY_PROFILER_N_PLUS_ONE_THRESHOLD', 5))  # 同一形态查询重复多少次视为 N+1
+
 # mongodb connect 
 connect(
     db='sovo',
@@ -141,6 +149,7 @@ connect(
     maxPoolSize=50,                     # 连接池大小
     tls=False,                           # 启用 TLS
     # tlsCAFile='/app/certs/ca.crt'  # 需将证书挂载到Django容器
+    event_listeners=[QueryProfilerListener()] if QUERY_PROFILER_ENABLED else [],
 )
 
 
@@ -219,7 +228,17 @@ REST_FRAMEWORK = {
         'common.permissions.public_paths_permission.PublicPathsPermission',
     ],
     # 配置自定义异常处理器
-    'EXCEPTION_HANDLER': 'common.utils.exception_handler.custom_exception_handler'
+    'EXCEPTION_HANDLER': 'common.utils.exception_handler.custom_exception_handler',
+    # JSON 的编码、解析使用 orjson，输出格式与 DRF 默认的 JSONRenderer 相同
+    'DEFAULT_RENDERER_CLASSES': [
+        'common.utils.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'common.utils.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 
@@ -330,6 +349,18 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': False,
         },
+        # 疑似 N+1 的请求（结构化JSON）
+        'query_profiler': {
+            'handlers': ['console', 'file'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        # 记录处理流水线各阶段耗时（结构化JSON，DEBUG 级别，排查时设 PIPELINE_LOG_LEVEL=DEBUG 输出）
+        'pipeline': {
+            'handlers': ['console'],
+            'level': os.getenv('PIPELINE_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
     },
 }
 
@@ -351,13 +382,7 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE  # 使用与Django相同的时区
 
-# Celery 定时任务配置
-CELERY_BEAT_SCHEDULE = {
-    'clean_temp_images': {
-        'task': 'accounts.tasks.clean_expired_temp_images',
-        'schedule': 3600,  # 每小时运行一次
-    },
-}
+# Celery 定时任务在 sovo/celery.py 的 app.conf.beat_schedule 中配置（celery 不读取这里的 CELERY_* 设置）
 
 
 # 媒体文件配置
@@ -376,6 +401,89 @@ ALLOWED_FILE_TYPES = {
 # 确保媒体目录存在
 os.makedirs(MEDIA_ROOT, exist_ok=True)
 
+# 上传目录孤儿文件清理（sovo.tasks.cleanup_temp_files）
+UPLOAD_CLEANUP_GRACE_SECONDS = int(os.getenv('UPLOAD_CLEANUP_GRACE_SECONDS', 86400))  # 该时间内修改过的文件不清理（上传、导入中）
+UPLOAD_CLEANUP_BATCH_SIZE = int(os.getenv('UPLOAD_CLEANUP_BATCH_SIZE', 500))  # 每批复查、删除的文件数
+UPLOAD_CLEANUP_MAX_SECONDS = int(os.getenv('UPLOAD_CLEANUP_MAX_SECONDS', 600))  # 单次运行时间上限，超时后下次从检查点继续，0 表示不限
+
+# OCR 图片预处理配置
+OCR_IMAGE_MAX_SIDE = int(os.getenv('OCR_IMAGE_MAX_SIDE', 1600))  # 最长边像素，0 表示不缩放
+OCR_IMAGE_GRAYSCALE = os.getenv('OCR_IMAGE_GRAYSCALE', 'False').lower() == 'true'  # 是否转灰度
+# 识别文本版本号，升级 OCR/ASR 模型后调大，已保存的识别结果会在重新处理时失效
+TEXT_EXTRACTION_VERSION = os.getenv('TEXT_EXTRACTION_VERSION', '1')
+
+# 语音识别配置
+ASR_LANGUAGE = 'zh'
+ASR_VAD_FILTER = True  # 开启VAD，跳过静音段
+# 按音频时长分档的解码参数，beam_size=1 为贪心解码
+ASR_DECODE_TIERS = [
+    {'max_seconds': 30, 'beam_size': 5},
+    {'max_seconds': 180, 'beam_size': 2},
+    {'max_seconds': None, 'beam_size': 1},
+]
+ASR_CHUNK_SECONDS = int(os.getenv('ASR_CHUNK_SECONDS', 60))  # 长音频分块时长
+ASR_PARALLEL_MIN_SECONDS = int(os.getenv('ASR_PARALLEL_MIN_SECONDS', 180))  # 超过该时长才分块并行
+ASR_WORKERS = int(os.getenv('ASR_WORKERS', 2))  # 转写进程数
+ASR_BATCH_SIZE = int(os.getenv('ASR_BATCH_SIZE', 8))  # inference worker 中语音片段的批大小
+
+# OCR/ASR 推理服务配置
+# local: 在当前进程内推理；remote: 投递到独立的 inference 队列，由专门的 worker 执行
+INFERENCE_MODE = os.getenv('INFERENCE_MODE', 'local')
+INFERENCE_TIMEOUT = int(os.getenv('INFERENCE_TIMEOUT', 300))  # 等待推理结果的超时（秒）
+INFERENCE_BATCH_SIZE = int(os.getenv('INFERENCE_BATCH_SIZE', 8))  # 微批：凑满多少个任务即执行
+INFERENCE_BATCH_INTERVAL = float(os.getenv('INFERENCE_BATCH_INTERVAL', 0.05))  # 微批：最长等待（秒）
+INFERENCE_CPU_THREADS = int(os.getenv('INFERENCE_CPU_THREADS', 0))  # 每个进程的推理线程数，0 表示自动
+
+# 信息提取提示词的 token 预算；超出时只保留与输入最相关的 top-K 个标签
+EXTRACTION_PROMPT_MAX_TOKENS = int(os.getenv('EXTRACTION_PROMPT_MAX_TOKENS', 1200))
+EXTRACTION_TAG_TOP_K = int(os.getenv('EXTRACTION_TAG_TOP_K', 30))
+EXTRACTION_TAG_MIN_TOKENS = int(os.getenv('EXTRACTION_TAG_MIN_TOKENS', 150))  # 标签列表至少保留的预算，不受输入文本长度影响
+
+# LLM 后端（JSON 数组），每项可配置 name、base_url、model、api_key_env、weight、tasks、max_tokens
+# tasks 为 classification（类型分类）和/或 extraction（信息提取）；同一任务的多个后端按 权重/最近耗时 负载均衡
+# 未配置时使用 OPENAI_API_BASE / OPENAI_MODEL 作为唯一后端
+LLM_BACKENDS = json.loads(os.getenv('LLM_BACKENDS', '[]')) or [{
+    'name': 'default',
+    'base_url': os.getenv('OPENAI_API_BASE', 'https://api.deepseek.com/v1'),
+    'model': os.getenv('OPENAI_MODEL', 'deepseek-chat'),
+    'api_key_env': 'OPENAI_API_KEY',
+    'weight': 1,
+    'tasks': ['classification', 'extraction'],
+}]
+
+# LLM 调用的超时、熔断与对冲
+LLM_REQUEST_TIMEOUT = float(os.getenv('LLM_REQUEST_TIMEOUT', 20))  # 单次 HTTP 请求超时（秒）
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 1))  # HTTP 层重试次数
+LLM_CALL_DEADLINE = float(os.getenv('LLM_CALL_DEADLINE', 45))  # 一次调用（含重试、对冲）的总截止时间（秒）
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 32))  # 每个进程同时进行的 LLM 调用数
+LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('LLM_CIRCUIT_FAILURE_THRESHOLD', 5))  # 连续失败多少次后熔断
+LLM_CIRCUIT_RECOVERY_SECONDS = float(os.getenv('LLM_CIRCUIT_RECOVERY_SECONDS', 30))  # 熔断多久后放行探测请求
+LLM_HEDGE_ENABLED = os.getenv('LLM_HEDGE_ENABLED', 'False').lower() == 'true'  # 超过 p95 仍未返回时发出对冲请求
+LLM_HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', 95))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv('LLM_HEDGE_MIN_SAMPLES', 20))  # 至少积累多少次成功调用才开始对冲
+
+# 记录处理方式：sync 在创建请求内同步处理；queued 先保存为 pending，由 Celery worker 处理
+RECORD_PROCESSING_MODE = os.getenv('RECORD_PROCESSING_MODE', 'sync')
+RECORD_PROCESSING_TIMEOUT = int(os.getenv('RECORD_PROCESSING_TIMEOUT', 600))  # processing 超过该秒数视为 worker 崩溃，可重新领取
+
+# 流式信息提取：输出不是合法 JSON 时的重试次数
+LLM_STREAM_MAX_RETRIES = int(os.getenv('LLM_STREAM_MAX_RETRIES', 1))
+
+# 列式分析快照：按用户、分类分区的 Parquet 文件，供 DuckDB 在本地做统计，不查询线上 MongoDB
+ANALYTICS_SNAPSHOT_ROOT = os.getenv('ANALYTICS_SNAPSHOT_ROOT', os.path.join(BASE_DIR, 'snapshots'))
+ANALYTICS_SNAPSHOT_LAG_SECONDS = int(os.getenv('ANALYTICS_SNAPSHOT_LAG_SECONDS', 60))  # 只快照该时间之前更新的记录
+ANALYTICS_SNAPSHOT_MAX_PARTS = int(os.getenv('ANALYTICS_SNAPSHOT_MAX_PARTS', 48))  # 用户分区文件数超过后整体重建
+ANALYTICS_SNAPSHOT_COMPACT_HOURS = int(os.getenv('ANALYTICS_SNAPSHOT_COMPACT_HOURS', 24))  # 用户快照超过该时间未重建时整体重建，去掉已删除的记录
+ANALYTICS_SNAPSHOT_COMPACT_PER_RUN = int(os.getenv('ANALYTICS_SNAPSHOT_COMPACT_PER_RUN', 20))  # 每次运行最多定期重建的用户数
+
+# 链路追踪：开启后各处理阶段同时生成 OpenTelemetry span（需安装 opentelemetry 并通过 OTEL_* 环境变量配置导出）
+OTEL_TRACING_ENABLED = os.getenv('OTEL_TRACING_ENABLED', 'False').lower() == 'true'
+
+# Prometheus 指标端点 /metrics/：默认关闭；开启后只允许白名单 IP 或携带 Bearer Token 的请求抓取
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False').lower() == 'true'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1').split(',') if ip.strip()]
+
 # 开发环境使用本地存储
 DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
 
@@ -1,9 +1,15 @@
-
 from sovo.celery import app
-# from common.utils.file_storage  import TemporaryFileStorage
+
 
 @app.task
 def cleanup_temp_files():
-    """Celery定时任务清理临时文件"""
-    print('hello...')
-    # TemporaryFileStorage._cleanup_old_files()
\ No newline at end of file
+    """Celery定时任务：删除上传目录中已不被任何上传记录或记录引用的文件"""
+    from common.services.cleanup_service import OrphanFileCleaner
+
+    try:
+        stats = OrphanFileCleaner().run()
+    except RuntimeError as e:
+        print(f"跳过文件清理: {e}")
+        return None
+    print(f"文件清理完成: {stats}")
+    return stats
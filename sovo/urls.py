@@ -9,6 +9,7 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,     # 刷新 Token
 )
 from accounts.views.jwt_views import CustomTokenObtainPairView
+from common.views.metrics_view import metrics_view
 from django.conf.urls.static import static
 from django.conf import settings
 
@@ -27,5 +28,7 @@ urlpatterns = [
     path('api/record/', include('records.urls')),  # records 的路由
      # 
     path('api/common/', include('common.urls')),  # common 的路由
-    path('api-auth/', include('rest_framework.urls', namespace='rest_framework'))
+    path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
+    # Prometheus 指标（默认关闭，见 METRICS_ENABLED / METRICS_TOKEN / METRICS_ALLOWED_IPS）
+    path('metrics/', metrics_view, name='metrics'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT) #static() 仅适用于开发环境，生产环境必须通过 Nginx/Apache 等服务器处理静态文件。此配置仅适用于开发环境（DEBUG=True）。
\ No newline at end of file